@@ -1 +1,5 @@
-# Insurance Claim System Backend
\ No newline at end of file
+# Insurance Claim System Backend
+import time
+
+# Start of the cold start; /health reports the time from here to ready
+IMPORT_STARTED = time.perf_counter()
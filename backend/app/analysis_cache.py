@@ -0,0 +1,76 @@
+"""
+Content-addressed cache of AI results.
+
+Entries are keyed on a hash of the claim fields the workflow reads plus the
+agent's workflow version, so an unchanged claim is a cache hit and any edit or
+workflow change produces a new key. update_claim also evicts the entry for the
+claim's previous contents so dead results do not linger.
+"""
+
+from app.cache import create_cache
+from app.langgraph.claim_agent import ClaimProcessingAgent, CLAIM_INPUT_FIELDS, NodeCallback
+from typing import Any, Dict, Optional
+import hashlib
+import json
+import os
+
+ANALYSIS_CACHE_SIZE = int(os.getenv("ANALYSIS_CACHE_SIZE", "10000"))
+ANALYSIS_CACHE_TTL = int(os.getenv("ANALYSIS_CACHE_TTL", "3600"))
+
+analysis_cache = create_cache("ai_analysis", max_size=ANALYSIS_CACHE_SIZE, ttl=ANALYSIS_CACHE_TTL)
+
+
+def claim_fingerprint(claim_data: Dict[str, Any], version: str, kind: str) -> str:
+    """Stable hash of the workflow inputs for one kind of result"""
+    inputs = {}
+    for field in CLAIM_INPUT_FIELDS:
+        value = claim_data.get(field)
+        # 1000 and 1000.0 are the same amount
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = float(value)
+        inputs[field] = value
+
+    payload = json.dumps({"kind": kind, "version": version, "inputs": inputs}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+async def cached_process_claim(
+    agent: ClaimProcessingAgent,
+    claim_data: Dict[str, Any],
+    on_node: Optional[NodeCallback] = None
+) -> Dict[str, Any]:
+    """agent.process_claim, reusing the result for identical inputs"""
+    key = claim_fingerprint(claim_data, agent.version, "process_claim")
+
+    # Progress callers need every node to actually run
+    if on_node is None:
+        cached = await analysis_cache.get(key)
+        if cached is not None:
+            return cached
+
+    result = await agent.process_claim(claim_data, on_node=on_node)
+    if "error" not in result:
+        # Timings describe this run only, not later cache hits
+        await analysis_cache.set(key, {k: v for k, v in result.items() if k != "timings"})
+    return result
+
+
+async def cached_detect_fraud(agent: ClaimProcessingAgent, claim_data: Dict[str, Any]) -> Dict[str, Any]:
+    """agent.detect_fraud, reusing the result for identical inputs"""
+    key = claim_fingerprint(claim_data, agent.version, "detect_fraud")
+
+    cached = await analysis_cache.get(key)
+    if cached is not None:
+        return cached
+
+    result = await agent.detect_fraud(claim_data)
+    await analysis_cache.set(key, result)
+    return result
+
+
+async def invalidate_claim(agent: ClaimProcessingAgent, claim_data: Dict[str, Any]):
+    """Evict cached results computed from this version of the claim"""
+    await analysis_cache.delete(
+        claim_fingerprint(claim_data, agent.version, "process_claim"),
+        claim_fingerprint(claim_data, agent.version, "detect_fraud")
+    )
@@ -0,0 +1,202 @@
+"""
+Batch AI analysis of many claims.
+
+Shared by POST /ai/process-claims/batch and the backend/batch.py CLI. Claims
+are read a page at a time, run through the shared ClaimProcessingAgent with a
+bounded number in flight, and written back with one bulk update per page;
+their log entries go through the buffered ai_processing_logs writer.
+"""
+
+from app.database import AsyncClient
+from app.langgraph.claim_agent import ClaimProcessingAgent, AI_CLAIM_COLUMNS
+from app.log_writer import ai_log_writer
+from app.entity_cache import invalidate_claims
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+import os
+import uuid
+
+AI_BATCH_CONCURRENCY = int(os.getenv("AI_BATCH_CONCURRENCY", "8"))
+AI_BATCH_PAGE_SIZE = int(os.getenv("AI_BATCH_PAGE_SIZE", "500"))
+
+# Keep `id=in.(...)` filters well below URL length limits
+ID_CHUNK_SIZE = 100
+
+
+async def fetch_claims_page(
+    supabase: AsyncClient,
+    claim_ids: Optional[List[str]] = None,
+    status: Optional[str] = None,
+    claim_type: Optional[str] = None,
+    user_id: Optional[str] = None,
+    after_id: Optional[str] = None,
+    limit: int = AI_BATCH_PAGE_SIZE,
+    columns: str = '*'
+) -> List[Dict[str, Any]]:
+    """Fetch one page of claims in a single query, ordered by id"""
+    query = supabase.table('claims').select(columns)
+
+    if claim_ids:
+        query = query.in_('id', claim_ids)
+    if status:
+        query = query.eq('status', status)
+    if claim_type:
+        query = query.eq('type', claim_type)
+    if user_id:
+        query = query.eq('user_id', user_id)
+    if after_id:
+        query = query.gt('id', after_id)
+
+    response = await query.order('id').limit(limit).execute()
+    return response.data
+
+
+async def analyze_claims(
+    agent: ClaimProcessingAgent,
+    claims: List[Dict[str, Any]],
+    concurrency: int = AI_BATCH_CONCURRENCY
+) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """Run the workflow over claims with at most `concurrency` in flight"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(claim):
+        async with semaphore:
+            return claim, await agent.process_claim(claim)
+
+    return await asyncio.gather(*(run(claim) for claim in claims))
+
+
+def build_log_entries(claim: Dict[str, Any], result: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """ai_processing_logs rows for one run: the full analysis plus one row per
+    node that ran, each with its execution_time in milliseconds"""
+    timings = result.get('timings') or {}
+    total_ms = timings.get('total_ms')
+
+    entries = [{
+        "id": str(uuid.uuid4()),
+        "claim_id": claim['id'],
+        "workflow_name": "claim_processing",
+        "node_name": "full_analysis",
+        "input_data": claim,
+        "output_data": result,
+        "execution_time": round(total_ms) if total_ms is not None else None,
+        "status": "error" if 'error' in result else "success",
+        "error_message": result.get('error'),
+        "processed_at": "now()"
+    }]
+
+    for node_name, node_ms in (timings.get('nodes') or {}).items():
+        entries.append({
+            "id": str(uuid.uuid4()),
+            "claim_id": claim['id'],
+            "workflow_name": "claim_processing",
+            "node_name": node_name,
+            "execution_time": round(node_ms),
+            "status": "success",
+            "processed_at": "now()"
+        })
+
+    return entries
+
+
+async def store_results(
+    supabase: AsyncClient,
+    results: List[Tuple[Dict[str, Any], Dict[str, Any]]]
+):
+    """Write analyses back with one bulk update; logs go to the buffered writer"""
+    analyses = {claim['id']: result for claim, result in results if 'error' not in result}
+
+    # Failed runs keep whatever analysis the claim already had
+    if analyses:
+        await supabase.rpc('bulk_update_ai_analysis', {'results': analyses}).execute()
+        await invalidate_claims(analyses)
+
+    ai_log_writer.write(entry for claim, result in results for entry in build_log_entries(claim, result))
+
+
+def _summarize(claim: Dict[str, Any], result: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "claim_id": claim['id'],
+        "status": "error" if 'error' in result else "success",
+        "next_action": result.get('next_action'),
+        "confidence": result.get('confidence', 0.0),
+        "error": result.get('error')
+    }
+
+
+async def process_claims_batch(
+    supabase: AsyncClient,
+    agent: ClaimProcessingAgent,
+    claim_ids: Optional[List[str]] = None,
+    status: Optional[str] = None,
+    claim_type: Optional[str] = None,
+    user_id: Optional[str] = None,
+    limit: Optional[int] = None,
+    concurrency: int = AI_BATCH_CONCURRENCY,
+    page_size: int = AI_BATCH_PAGE_SIZE,
+    collect_results: bool = True,
+    on_page: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """Analyse every claim selected by ids and/or filters, page by page.
+
+    Returns counts plus (when collect_results is set) a short per-claim summary.
+    """
+    summary = {"processed": 0, "succeeded": 0, "failed": 0, "results": []}
+
+    if claim_ids:
+        # Preserve caller order and drop duplicates
+        unique_ids = list(dict.fromkeys(claim_ids))
+        if limit is not None:
+            unique_ids = unique_ids[:limit]
+        pages = [unique_ids[i:i + ID_CHUNK_SIZE] for i in range(0, len(unique_ids), ID_CHUNK_SIZE)]
+    else:
+        pages = None
+
+    after_id = None
+    page_index = 0
+
+    while True:
+        remaining = None if limit is None else limit - summary["processed"]
+        if remaining is not None and remaining <= 0:
+            break
+
+        if pages is not None:
+            if page_index >= len(pages):
+                break
+            claims = await fetch_claims_page(
+                supabase, claim_ids=pages[page_index], status=status,
+                claim_type=claim_type, user_id=user_id, limit=len(pages[page_index]),
+                columns=AI_CLAIM_COLUMNS
+            )
+            page_index += 1
+        else:
+            page_limit = page_size if remaining is None else min(page_size, remaining)
+            claims = await fetch_claims_page(
+                supabase, status=status, claim_type=claim_type,
+                user_id=user_id, after_id=after_id, limit=page_limit,
+                columns=AI_CLAIM_COLUMNS
+            )
+            if not claims:
+                break
+            after_id = claims[-1]['id']
+
+        if not claims:
+            continue
+
+        results = await analyze_claims(agent, claims, concurrency)
+        await store_results(supabase, results)
+
+        failed = sum(1 for _, result in results if 'error' in result)
+        summary["processed"] += len(results)
+        summary["failed"] += failed
+        summary["succeeded"] += len(results) - failed
+        if collect_results:
+            summary["results"].extend(_summarize(claim, result) for claim, result in results)
+
+        if on_page:
+            on_page(summary)
+
+        if pages is None and len(claims) < page_size:
+            break
+
+    return summary
@@ -0,0 +1,172 @@
+"""
+Small async key-value caches.
+
+MemoryCache is a per-process LRU with TTL and is always available. Setting
+CACHE_BACKEND=redis with REDIS_URL shares entries between workers when the
+optional `redis` package is installed. CACHE_BACKEND=fakeredis runs RedisCache
+against FakeRedis, an in-process stand-in, so the shared path (serialization,
+TTL, namespacing, invalidation) can be exercised without a Redis server.
+"""
+
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Optional, Tuple, Union
+import copy
+import fnmatch
+import json
+import os
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Optional shared backend (make optional to avoid dependency issues)
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+
+class MemoryCache:
+    """LRU cache with a per-entry TTL, local to this process"""
+
+    def __init__(self, namespace: str, max_size: int = 10000, ttl: float = 300):
+        self.namespace = namespace
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        # Hand out copies so callers cannot mutate the cached value
+        return copy.deepcopy(value)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self._entries[key] = (time.monotonic() + (ttl or self.ttl), copy.deepcopy(value))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self._entries.pop(key, None)
+
+    async def clear(self):
+        self._entries.clear()
+
+
+class FakeRedis:
+    """The subset of the redis.asyncio client RedisCache uses, kept in memory.
+
+    Like Redis it stores bytes and hands back bytes, so values go through the
+    same JSON round trip. One instance stands in for one server: caches
+    created with CACHE_BACKEND=fakeredis share it, but it is never shared
+    between processes.
+    """
+
+    def __init__(self):
+        self._data: Dict[bytes, Tuple[Optional[float], bytes]] = {}
+
+    @staticmethod
+    def _encode(value: Union[str, bytes, int, float]) -> bytes:
+        if isinstance(value, bytes):
+            return value
+        return str(value).encode()
+
+    def _live(self, key: bytes) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    async def get(self, key: Union[str, bytes]) -> Optional[bytes]:
+        return self._live(self._encode(key))
+
+    async def set(self, key: Union[str, bytes], value: Union[str, bytes, int, float],
+                  ex: Optional[int] = None) -> bool:
+        expires_at = time.monotonic() + ex if ex else None
+        self._data[self._encode(key)] = (expires_at, self._encode(value))
+        return True
+
+    async def delete(self, *keys: Union[str, bytes]) -> int:
+        removed = 0
+        for key in keys:
+            key = self._encode(key)
+            if self._live(key) is not None:
+                removed += 1
+            self._data.pop(key, None)
+        return removed
+
+    async def scan_iter(self, match: Optional[str] = None) -> AsyncIterator[bytes]:
+        # Snapshot, so callers may delete while iterating
+        for key in list(self._data):
+            if self._live(key) is None:
+                continue
+            if match is None or fnmatch.fnmatchcase(key.decode(), match):
+                yield key
+
+    async def flushall(self):
+        self._data.clear()
+
+
+# The single in-process "server" behind CACHE_BACKEND=fakeredis
+_fake_redis: Optional[FakeRedis] = None
+
+
+def get_fake_redis() -> FakeRedis:
+    global _fake_redis
+    if _fake_redis is None:
+        _fake_redis = FakeRedis()
+    return _fake_redis
+
+
+class RedisCache:
+    """JSON values in Redis under a namespace prefix, shared by all workers"""
+
+    def __init__(self, namespace: str, ttl: float = 300, url: str = REDIS_URL, client: Any = None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self._client = client if client is not None else aioredis.from_url(url)
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self._client.get(self._key(key))
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        await self._client.set(self._key(key), json.dumps(value, default=str), ex=int(ttl or self.ttl))
+
+    async def delete(self, *keys: str):
+        if keys:
+            await self._client.delete(*(self._key(key) for key in keys))
+
+    async def clear(self):
+        async for key in self._client.scan_iter(match=f"{self.namespace}:*"):
+            await self._client.delete(key)
+
+
+def create_cache(namespace: str, max_size: int = 10000, ttl: float = 300):
+    """Build a cache on the configured backend"""
+    if CACHE_BACKEND == "fakeredis":
+        return RedisCache(namespace, ttl=ttl, client=get_fake_redis())
+    if CACHE_BACKEND == "redis":
+        if REDIS_AVAILABLE:
+            return RedisCache(namespace, ttl=ttl)
+        print(f"⚠️  redis not installed, using in-process cache for {namespace}")
+    return MemoryCache(namespace, max_size=max_size, ttl=ttl)
@@ -0,0 +1,238 @@
+"""
+Streaming bulk export of claims.
+
+Shared by GET /claims/export and the backend/export_claims.py CLI. Claims are
+read a page at a time in id order (keyset, so every page is an index range
+scan), optionally joined with their claim_history entries, and encoded as
+NDJSON, CSV or Parquet one page at a time. Only the current page is ever held,
+so a dump of the full book streams in constant memory.
+"""
+
+from app.database import AsyncClient
+from app.batch_processing import fetch_claims_page, ID_CHUNK_SIZE
+from typing import Any, AsyncIterator, Dict, List, Optional
+import csv
+import io
+import json
+import os
+
+# Parquet support is optional (make optional to avoid dependency issues)
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "1000"))
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+EXPORT_COLUMNS = [
+    'id', 'claim_number', 'user_id', 'type', 'status', 'priority', 'amount', 'description',
+    'incident_date', 'submitted_date', 'metadata', 'created_at', 'updated_at'
+]
+
+# Written as JSON text in CSV and Parquet, which have no nested values here
+JSON_COLUMNS = {'metadata', 'ai_analysis', 'history'}
+
+
+class ExportFormatError(Exception):
+    """Raised for an unknown format, or Parquet without pyarrow installed"""
+
+
+def export_columns(include_analysis: bool, include_history: bool) -> List[str]:
+    """Output columns, in order"""
+    columns = list(EXPORT_COLUMNS)
+    if include_analysis:
+        columns.append('ai_analysis')
+    if include_history:
+        columns.append('history')
+    return columns
+
+
+async def fetch_history(supabase: AsyncClient, claim_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """claim_history entries for a page of claims, oldest first, by claim id"""
+    history: Dict[str, List[Dict[str, Any]]] = {claim_id: [] for claim_id in claim_ids}
+    for start in range(0, len(claim_ids), ID_CHUNK_SIZE):
+        response = await supabase.table('claim_history').select(
+            'action, previous_status, new_status, notes, performed_by, performed_at, claim_id'
+        ).in_('claim_id', claim_ids[start:start + ID_CHUNK_SIZE]).order('performed_at').execute()
+        for entry in response.data:
+            history[entry.pop('claim_id')].append(entry)
+    return history
+
+
+async def iter_claim_pages(
+    supabase: AsyncClient,
+    status: Optional[str] = None,
+    claim_type: Optional[str] = None,
+    user_id: Optional[str] = None,
+    include_analysis: bool = False,
+    include_history: bool = False,
+    page_size: int = EXPORT_PAGE_SIZE,
+    limit: Optional[int] = None
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Selected claims a page at a time, in id order"""
+    columns = export_columns(include_analysis, include_history=False)
+    after_id = None
+    remaining = limit
+
+    while remaining is None or remaining > 0:
+        page_limit = page_size if remaining is None else min(page_size, remaining)
+        claims = await fetch_claims_page(
+            supabase, status=status, claim_type=claim_type, user_id=user_id,
+            after_id=after_id, limit=page_limit, columns=','.join(columns)
+        )
+        if not claims:
+            return
+
+        if include_history:
+            history = await fetch_history(supabase, [claim['id'] for claim in claims])
+            for claim in claims:
+                claim['history'] = history[claim['id']]
+
+        yield claims
+
+        after_id = claims[-1]['id']
+        if remaining is not None:
+            remaining -= len(claims)
+        if len(claims) < page_limit:
+            return
+
+
+def _flat(column: str, value: Any) -> Any:
+    if column in JSON_COLUMNS and value is not None:
+        return json.dumps(value, default=str)
+    return value
+
+
+class NDJSONEncoder:
+    """One JSON object per line, history and JSON columns nested"""
+
+    def __init__(self, columns: List[str]):
+        self.columns = columns
+
+    def page(self, claims: List[Dict[str, Any]]) -> bytes:
+        return "".join(
+            json.dumps({column: claim.get(column) for column in self.columns}, default=str) + "\n"
+            for claim in claims
+        ).encode()
+
+    def close(self) -> bytes:
+        return b""
+
+
+class CSVEncoder:
+    """Header row, then one row per claim with JSON columns as text"""
+
+    def __init__(self, columns: List[str]):
+        self.columns = columns
+        self._header = True
+
+    def page(self, claims: List[Dict[str, Any]]) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if self._header:
+            writer.writerow(self.columns)
+            self._header = False
+        writer.writerows([_flat(column, claim.get(column)) for column in self.columns] for claim in claims)
+        return buffer.getvalue().encode()
+
+    def close(self) -> bytes:
+        # An empty export still gets its header row
+        return self.page([]) if self._header else b""
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back whatever was written since the last drain"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ParquetEncoder:
+    """One Parquet row group per page; JSON columns are stored as strings"""
+
+    def __init__(self, columns: List[str]):
+        if not PARQUET_AVAILABLE:
+            raise ExportFormatError("Parquet export needs the pyarrow package")
+        self.columns = columns
+        self.schema = pa.schema([
+            (column, pa.float64() if column == 'amount' else pa.string())
+            for column in columns
+        ])
+        self._sink = _ChunkSink()
+        self._writer = pq.ParquetWriter(self._sink, self.schema, compression="snappy")
+
+    def page(self, claims: List[Dict[str, Any]]) -> bytes:
+        arrays = {
+            column: [
+                value if value is None else float(value) if column == 'amount' else str(value)
+                for value in (_flat(column, claim.get(column)) for claim in claims)
+            ]
+            for column in self.columns
+        }
+        self._writer.write_table(pa.Table.from_pydict(arrays, schema=self.schema))
+        return self._sink.drain()
+
+    def close(self) -> bytes:
+        self._writer.close()
+        return self._sink.drain()
+
+
+ENCODERS = {"ndjson": NDJSONEncoder, "csv": CSVEncoder, "parquet": ParquetEncoder}
+
+
+def make_encoder(fmt: str, include_analysis: bool = False, include_history: bool = False):
+    """Encoder for the format; raises ExportFormatError before anything is sent"""
+    if fmt not in ENCODERS:
+        raise ExportFormatError(f"Unsupported export format '{fmt}'")
+    return ENCODERS[fmt](export_columns(include_analysis, include_history))
+
+
+async def export_claims(
+    supabase: AsyncClient,
+    encoder,
+    status: Optional[str] = None,
+    claim_type: Optional[str] = None,
+    user_id: Optional[str] = None,
+    include_analysis: bool = False,
+    include_history: bool = False,
+    page_size: int = EXPORT_PAGE_SIZE,
+    limit: Optional[int] = None
+) -> AsyncIterator[bytes]:
+    """Encoded export, one chunk per page of claims"""
+    async for claims in iter_claim_pages(
+        supabase, status=status, claim_type=claim_type, user_id=user_id,
+        include_analysis=include_analysis, include_history=include_history,
+        page_size=page_size, limit=limit
+    ):
+        chunk = encoder.page(claims)
+        if chunk:
+            yield chunk
+
+    tail = encoder.close()
+    if tail:
+        yield tail
@@ -0,0 +1,408 @@
+"""
+Bulk claim import from CSV or NDJSON.
+
+Shared by POST /claims/import and the backend/import_claims.py CLI. The file is
+parsed as it streams in, rows are validated with ClaimCreate a batch at a time,
+and each valid batch is written by public.bulk_create_claims_with_history (the
+claims and their history entries in one round-trip). Invalid rows are reported
+with their row number and skipped; nothing but the current batch is held, so
+memory stays flat however many rows the file has. A line or CSV record longer
+than IMPORT_MAX_RECORD_LENGTH characters is reported as a row error and skipped.
+"""
+
+from app.database import AsyncClient
+from app.langgraph.claim_agent import ClaimProcessingAgent, CLAIM_INPUT_FIELDS
+from app.batch_processing import analyze_claims, store_results, AI_BATCH_CONCURRENCY
+from app.models.claim_model import ClaimCreate
+from pydantic import TypeAdapter, ValidationError
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, Union
+import codecs
+import csv
+import json
+import os
+import re
+import uuid
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+# Errors kept for the response; the rest are only counted
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+# Longest line / CSV record kept in memory; longer ones are row errors
+IMPORT_MAX_RECORD_LENGTH = int(os.getenv("IMPORT_MAX_RECORD_LENGTH", "1048576"))
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+_claims_adapter = TypeAdapter(List[ClaimCreate])
+
+
+class ImportFormatError(Exception):
+    """Raised when the file cannot be read as the requested format"""
+
+
+class RecordTooLongError(ValueError):
+    """A line or record over the length limit; yielded in its place, not raised"""
+
+    def __init__(self, max_length: int):
+        super().__init__(f"Row is longer than {max_length} characters")
+
+
+# "\r\n", "\r" or "\n". Not str.splitlines: that also breaks on U+2028, form
+# feeds and the like, which may appear raw inside JSON strings and CSV fields
+_LINE_END = re.compile(r"\r\n?|\n")
+
+# Rest of a quoted CSV field up to its closing quote ("" is an escaped quote)
+_QUOTED_FIELD_REST = re.compile(r'[^"]*(?:""[^"]*)*"(?!")')
+
+
+def detect_format(content_type: Optional[str]) -> Optional[str]:
+    """Import format implied by a Content-Type header, if any"""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in ("text/csv", "application/csv"):
+        return "csv"
+    if media_type in ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/json-lines"):
+        return "ndjson"
+    return None
+
+
+class _LineSplitter:
+    """Splits decoded text into lines, newlines kept, across chunk boundaries
+
+    Only newly fed text is scanned, and a line is held only up to max_length
+    characters: the rest of a longer line is discarded as it arrives and the
+    line comes out as a RecordTooLongError.
+    """
+
+    def __init__(self, max_length: int):
+        self.max_length = max_length
+        self._parts: List[str] = []
+        self._length = 0
+        # The held line ended in "\r" at the end of a chunk; a "\n" may follow
+        self._after_cr = False
+
+    def _append(self, text: str):
+        self._length += len(text)
+        if self._length > self.max_length:
+            self._parts = []
+        elif text:
+            self._parts.append(text)
+
+    def _end_line(self, lines: List[Union[str, RecordTooLongError]]):
+        if self._length > self.max_length:
+            lines.append(RecordTooLongError(self.max_length))
+        else:
+            lines.append("".join(self._parts))
+        self._parts, self._length = [], 0
+
+    def feed(self, text: str, final: bool = False) -> List[Union[str, RecordTooLongError]]:
+        lines: List[Union[str, RecordTooLongError]] = []
+        pos = 0
+        if self._after_cr and (text or final):
+            if text.startswith("\n"):
+                self._append("\n")
+                pos = 1
+            self._after_cr = False
+            self._end_line(lines)
+        for match in _LINE_END.finditer(text, pos):
+            self._append(text[pos:match.end()])
+            pos = match.end()
+            if pos == len(text) and match.group() == "\r" and not final:
+                self._after_cr = True
+            else:
+                self._end_line(lines)
+        self._append(text[pos:])
+        if final and self._length:
+            self._end_line(lines)
+        return lines
+
+
+async def iter_lines(
+    chunks: AsyncIterator[bytes],
+    max_length: int = IMPORT_MAX_RECORD_LENGTH
+) -> AsyncIterator[Union[str, RecordTooLongError]]:
+    """Decode a byte stream as UTF-8 and yield it line by line, newlines kept
+
+    Lines end at "\n", "\r\n" or a lone "\r". A line longer than max_length
+    characters is yielded as a RecordTooLongError instead.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    splitter = _LineSplitter(max_length)
+    async for chunk in chunks:
+        for line in splitter.feed(decoder.decode(chunk)):
+            yield line
+    for line in splitter.feed(decoder.decode(b"", final=True), final=True):
+        yield line
+
+
+def _ends_in_quoted_field(line: str, in_quoted_field: bool) -> bool:
+    """Whether a CSV line leaves a quoted field open, given whether it began in one
+
+    As the csv module reads it, a quote opens a quoted field only at the start
+    of a field, so a stray quote inside an unquoted value (5" screen) does not
+    join the following lines into the record.
+    """
+    if '"' not in line:
+        return in_quoted_field
+    pos = 0
+    if in_quoted_field:
+        match = _QUOTED_FIELD_REST.match(line)
+        if match is None:
+            return True
+        pos = match.end()
+    else:
+        # Treat the line start as a field start
+        pos = -1
+    while True:
+        if pos >= 0:
+            # Skip to the next field; anything after a closing quote belongs to this one
+            pos = line.find(",", pos)
+            if pos == -1:
+                return False
+        pos += 1
+        if line.startswith('"', pos):
+            match = _QUOTED_FIELD_REST.match(line, pos + 1)
+            if match is None:
+                return True
+            pos = match.end()
+
+
+async def _csv_records(
+    chunks: AsyncIterator[bytes],
+    max_length: int = IMPORT_MAX_RECORD_LENGTH
+) -> AsyncIterator[Tuple[int, Union[List[str], Exception]]]:
+    """Parsed CSV records with their 1-based record number
+
+    A record ends at a newline outside a quoted field. A record that cannot be
+    parsed or runs past max_length characters is yielded as an exception, and
+    reading resumes at the next line.
+    """
+    parts: List[str] = []
+    length, in_quoted_field, number = 0, False, 0
+    async for line in iter_lines(chunks, max_length):
+        if isinstance(line, RecordTooLongError):
+            number += 1
+            yield number, line
+            parts, length, in_quoted_field = [], 0, False
+            continue
+
+        parts.append(line)
+        length += len(line)
+        in_quoted_field = _ends_in_quoted_field(line, in_quoted_field)
+        if length > max_length:
+            # Most likely an unterminated quote; give up on this record only
+            number += 1
+            yield number, RecordTooLongError(max_length)
+            parts, length, in_quoted_field = [], 0, False
+            continue
+        if in_quoted_field:
+            continue
+
+        record = "".join(parts)
+        parts, length = [], 0
+        if record.strip():
+            number += 1
+            try:
+                yield number, next(csv.reader([record]))
+            except csv.Error as e:
+                yield number, ValueError(f"Invalid CSV: {e}")
+    if parts:
+        yield number + 1, ValueError("File ends inside a quoted CSV field")
+
+
+def _csv_value(column: str, value: str) -> Any:
+    if column == "metadata":
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+
+async def parse_rows(
+    chunks: AsyncIterator[bytes],
+    fmt: str,
+    max_record_length: int = IMPORT_MAX_RECORD_LENGTH
+) -> AsyncIterator[Tuple[int, Any]]:
+    """(row number, raw row) pairs from a CSV (with header) or NDJSON stream
+
+    Row numbers count data rows from 1. Rows that cannot even be parsed are
+    yielded as exceptions so they are reported like validation failures.
+    """
+    if fmt == "csv":
+        header = None
+        async for number, record in _csv_records(chunks, max_record_length):
+            if header is None:
+                if isinstance(record, Exception):
+                    raise ImportFormatError(f"Header: {record}")
+                header = [column.strip() for column in record]
+                continue
+            if isinstance(record, Exception):
+                yield number - 1, record
+                continue
+            if len(record) != len(header):
+                yield number - 1, ValueError(f"Expected {len(header)} columns, got {len(record)}")
+                continue
+            # Empty cells are left out so the model defaults apply
+            yield number - 1, {
+                column: _csv_value(column, value)
+                for column, value in zip(header, record)
+                if column and value != ""
+            }
+    elif fmt == "ndjson":
+        number = 0
+        async for line in iter_lines(chunks, max_record_length):
+            if isinstance(line, RecordTooLongError):
+                number += 1
+                yield number, line
+                continue
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                yield number, json.loads(line)
+            except ValueError as e:
+                yield number, ValueError(f"Invalid JSON: {e}")
+    else:
+        raise ImportFormatError(f"Unsupported import format '{fmt}'")
+
+
+def _error_message(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in detail['loc']) or 'row'}: {detail['msg']}"
+            for detail in error.errors()
+        )
+    return str(error)
+
+
+def validate_batch(rows: List[Tuple[int, Any]]) -> Tuple[List[Tuple[int, Dict[str, Any], ClaimCreate]], List[Tuple[int, str]]]:
+    """Validate a batch with ClaimCreate in one call, falling back to row by row
+    to pin down errors when any row is invalid"""
+    valid, errors = [], []
+    candidates = []
+    for number, row in rows:
+        if isinstance(row, Exception):
+            errors.append((number, str(row)))
+        elif not isinstance(row, dict):
+            errors.append((number, "Row must be an object"))
+        else:
+            candidates.append((number, row))
+
+    try:
+        claims = _claims_adapter.validate_python([row for _, row in candidates])
+        valid = [(number, row, claim) for (number, row), claim in zip(candidates, claims)]
+    except ValidationError:
+        for number, row in candidates:
+            try:
+                valid.append((number, row, ClaimCreate.model_validate(row)))
+            except ValidationError as e:
+                errors.append((number, _error_message(e)))
+
+    errors.sort()
+    return valid, errors
+
+
+def claim_record(row: Dict[str, Any], claim: ClaimCreate, owner_id: str) -> Dict[str, Any]:
+    """Row for bulk_create_claims_with_history; the id is assigned here so the
+    batch can be analysed without reading it back"""
+    return {
+        "id": str(uuid.uuid4()),
+        "user_id": str(row.get("user_id") or owner_id),
+        "type": claim.type.value,
+        "priority": claim.priority.value,
+        "amount": claim.amount,
+        "description": claim.description,
+        "incident_date": claim.incident_date.isoformat(),
+        "metadata": claim.metadata or {}
+    }
+
+
+async def insert_claims(
+    supabase: AsyncClient,
+    records: List[Dict[str, Any]],
+    imported_by: str
+) -> List[Dict[str, Any]]:
+    """Insert a batch of claim records with their history entries"""
+    await supabase.rpc('bulk_create_claims_with_history', {
+        'claim_rows': records,
+        'submitted_by': imported_by
+    }).execute()
+    return records
+
+
+async def import_claims(
+    supabase: AsyncClient,
+    chunks: AsyncIterator[bytes],
+    fmt: str,
+    imported_by: str,
+    owner_id: Optional[str] = None,
+    batch_size: int = IMPORT_BATCH_SIZE,
+    analyze: bool = False,
+    agent: Optional[ClaimProcessingAgent] = None,
+    concurrency: int = AI_BATCH_CONCURRENCY,
+    max_errors: int = IMPORT_MAX_ERRORS,
+    max_record_length: int = IMPORT_MAX_RECORD_LENGTH,
+    on_error: Optional[Callable[[int, str], None]] = None,
+    on_batch: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """Import every row of a CSV / NDJSON stream as claims.
+
+    Rows may name their owner in a `user_id` column; otherwise the claim
+    belongs to owner_id (default: the importer). Errors are passed to on_error
+    when given, else the first max_errors are returned in the summary. With
+    analyze set, each inserted batch is also run through the AI workflow.
+    """
+    if analyze and agent is None:
+        raise ValueError("An agent is required to analyze imported claims")
+
+    summary = {"total": 0, "imported": 0, "failed": 0, "analyzed": 0, "errors": []}
+
+    def report(number: int, message: str):
+        summary["failed"] += 1
+        if on_error:
+            on_error(number, message)
+        elif len(summary["errors"]) < max_errors:
+            summary["errors"].append({"row": number, "error": message})
+
+    async def flush(rows: List[Tuple[int, Any]]):
+        valid, errors = validate_batch(rows)
+        for number, message in errors:
+            report(number, message)
+        if not valid:
+            return
+
+        records = [claim_record(row, claim, owner_id or imported_by) for _, row, claim in valid]
+        try:
+            inserted = await insert_claims(supabase, records, imported_by)
+        except Exception:
+            # One bad row (e.g. an unknown user_id) fails the whole statement;
+            # retry row by row so only the bad rows are rejected
+            inserted = []
+            for (number, _, _), record in zip(valid, records):
+                try:
+                    inserted.extend(await insert_claims(supabase, [record], imported_by))
+                except Exception as e:
+                    report(number, f"Insert failed: {e}")
+        summary["imported"] += len(inserted)
+
+        if analyze and inserted:
+            claims = [{field: record[field] for field in ['id'] + CLAIM_INPUT_FIELDS} for record in inserted]
+            results = await analyze_claims(agent, claims, concurrency)
+            await store_results(supabase, results)
+            summary["analyzed"] += sum(1 for _, result in results if 'error' not in result)
+
+    batch: List[Tuple[int, Any]] = []
+    async for number, row in parse_rows(chunks, fmt, max_record_length):
+        summary["total"] += 1
+        batch.append((number, row))
+        if len(batch) >= batch_size:
+            await flush(batch)
+            batch = []
+            if on_batch:
+                on_batch(summary)
+
+    if batch:
+        await flush(batch)
+        if on_batch:
+            on_batch(summary)
+
+    summary["errors_truncated"] = summary["failed"] > len(summary["errors"]) and on_error is None
+    return summary
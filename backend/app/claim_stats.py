@@ -0,0 +1,92 @@
+"""
+Dashboard statistics from the claims_rollup table.
+
+The rollup holds one row per (status, type, priority) with a claim count and
+amount total, maintained by triggers in database_setup.sql, so a dashboard
+load is a read of at most a hundred small rows rather than a scan of claims.
+The assembled stats are cached for STATS_CACHE_TTL seconds and concurrent
+misses in a worker share one refresh.
+"""
+
+from app.database import AsyncClient
+from app.cache import create_cache
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+import asyncio
+import os
+
+STATS_CACHE_TTL = float(os.getenv("STATS_CACHE_TTL", "15"))
+
+# Statuses still waiting on an agent
+OPEN_STATUSES = ('submitted', 'under_review')
+
+stats_cache = create_cache("claim_stats", max_size=16, ttl=STATS_CACHE_TTL)
+_refresh_lock = asyncio.Lock()
+
+
+def summarize_rollup(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Totals overall and per status / type / priority from rollup rows"""
+    stats: Dict[str, Any] = {
+        "total_claims": 0,
+        "total_amount": 0.0,
+        "open_claims": 0,
+        "open_amount": 0.0,
+        "by_status": {},
+        "by_type": {},
+        "by_priority": {},
+        "groups": []
+    }
+
+    for row in rows:
+        count = int(row.get("claim_count") or 0)
+        if count <= 0:
+            # Groups emptied by updates/deletes stay in the table at zero
+            continue
+        amount = float(row.get("total_amount") or 0)
+
+        stats["total_claims"] += count
+        stats["total_amount"] += amount
+        if row["status"] in OPEN_STATUSES:
+            stats["open_claims"] += count
+            stats["open_amount"] += amount
+
+        for dimension, key in (("by_status", "status"), ("by_type", "type"), ("by_priority", "priority")):
+            bucket = stats[dimension].setdefault(row[key], {"count": 0, "total_amount": 0.0})
+            bucket["count"] += count
+            bucket["total_amount"] += amount
+
+        stats["groups"].append({
+            "status": row["status"],
+            "type": row["type"],
+            "priority": row["priority"],
+            "count": count,
+            "total_amount": amount
+        })
+
+    for dimension in ("by_status", "by_type", "by_priority"):
+        for bucket in stats[dimension].values():
+            bucket["avg_amount"] = bucket["total_amount"] / bucket["count"]
+    stats["avg_amount"] = stats["total_amount"] / stats["total_claims"] if stats["total_claims"] else 0.0
+    return stats
+
+
+async def get_claim_stats(supabase: AsyncClient) -> Dict[str, Any]:
+    """Current dashboard stats, at most STATS_CACHE_TTL seconds old"""
+    cached = await stats_cache.get("all")
+    if cached is not None:
+        return cached
+
+    async with _refresh_lock:
+        # Another request may have refreshed while this one waited
+        cached = await stats_cache.get("all")
+        if cached is not None:
+            return cached
+
+        response = await supabase.table('claims_rollup').select(
+            'status, type, priority, claim_count, total_amount'
+        ).execute()
+        stats = summarize_rollup(response.data)
+        stats["generated_at"] = datetime.now(timezone.utc).isoformat()
+
+        await stats_cache.set("all", stats)
+        return stats
@@ -1,5 +1,14 @@
-from supabase import create_client, Client
+from gotrue import AsyncGoTrueClient
+from postgrest import AsyncPostgrestClient
+from storage3 import AsyncStorageClient
+from app import IMPORT_STARTED
+from app.metrics import SUPABASE_LATENCY
+from datetime import datetime, timezone
+from typing import Any, AsyncIterable, Dict, Optional, Tuple
+import asyncio
+import httpx
 import os
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -9,32 +18,249 @@ SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
 SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
 
-if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
-    raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_KEY must be set")
+# "supabase" talks to the hosted project, "memory" uses the in-process stand-in
+DATABASE_BACKEND = os.getenv("DATABASE_BACKEND", "supabase")
 
-# Create Supabase client with service role key for admin operations
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+# Connection pool shared by every request on this worker
+SUPABASE_MAX_CONNECTIONS = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "200"))
+SUPABASE_MAX_KEEPALIVE = int(os.getenv("SUPABASE_MAX_KEEPALIVE", "50"))
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "30"))
 
-# Create client for anonymous operations
-supabase_anon: Client = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
+# Seconds between startup probes while the database is unreachable
+DB_PROBE_RETRY_SECONDS = float(os.getenv("DB_PROBE_RETRY_SECONDS", "5"))
 
-async def init_db():
-    """Initialize database connection and check health"""
-    try:
-        # Test basic connection first
-        response = supabase.table('auth.users').select('id').limit(1).execute()
-        print("✅ Database connection successful")
-        return True
-    except Exception as e:
-        print(f"⚠️  Database tables may not exist yet: {e}")
-        print("✅ Database connection established but tables need to be created")
-        print("📋 Please run the SQL schema in your Supabase dashboard")
-        return True  # Return True to allow the app to start
-
-def get_supabase() -> Client:
+
+def _resource(path: str) -> Tuple[str, str]:
+    """(service, resource) for a Supabase URL path, e.g. ("rest", "claims")"""
+    parts = [part for part in path.split("/") if part]
+    # /<service>/v1/<resource>[/...]; keep rpc function names, drop object paths
+    service = parts[0] if parts else ""
+    rest = parts[2:] if len(parts) > 1 and parts[1].startswith("v") else parts[1:]
+    if rest[:1] == ["rpc"]:
+        return service, "/".join(rest[:2])
+    return service, rest[0] if rest else ""
+
+
+async def _start_timer(request: httpx.Request):
+    request.extensions["started_at"] = time.perf_counter()
+
+
+async def _record_timing(response: httpx.Response):
+    started_at = response.request.extensions.get("started_at")
+    if started_at is None:
+        return
+    service, resource = _resource(response.request.url.path)
+    SUPABASE_LATENCY.observe(
+        time.perf_counter() - started_at,
+        service=service,
+        method=response.request.method,
+        resource=resource,
+        status=str(response.status_code)
+    )
+
+
+# PostgREST and auth calls from both clients share one connection pool
+_transport: Optional[httpx.AsyncHTTPTransport] = None
+
+
+def _pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=SUPABASE_MAX_CONNECTIONS,
+        max_keepalive_connections=SUPABASE_MAX_KEEPALIVE
+    )
+
+
+def _shared_transport() -> httpx.AsyncHTTPTransport:
+    global _transport
+    if _transport is None:
+        _transport = httpx.AsyncHTTPTransport(limits=_pool_limits())
+    return _transport
+
+
+def _pooled_http_client(**kwargs) -> httpx.AsyncClient:
+    """Create an HTTP client that keeps connections open between requests
+    and records the latency of every call"""
+    if "transport" not in kwargs:
+        kwargs["limits"] = _pool_limits()
+    return httpx.AsyncClient(
+        timeout=SUPABASE_TIMEOUT,
+        event_hooks={"request": [_start_timer], "response": [_record_timing]},
+        **kwargs
+    )
+
+
+class _PooledPostgrestClient(AsyncPostgrestClient):
+    """PostgREST client whose session uses the shared pool limits"""
+
+    def create_session(self, base_url, headers, timeout):
+        return _pooled_http_client(base_url=base_url, headers=headers, transport=_shared_transport())
+
+
+class _StreamingStorageClient(AsyncStorageClient):
+    """Storage client on the shared pool that can also upload a body as it is produced"""
+
+    def _create_session(self, base_url, headers, timeout, verify=True):
+        return _pooled_http_client(base_url=base_url, headers=headers, verify=bool(verify), follow_redirects=True, http2=True)
+
+    async def upload_stream(self, bucket: str, path: str, chunks: AsyncIterable[bytes], content_type: str):
+        """Upload an object from an async iterable of chunks without buffering it.
+
+        storage3's upload() needs the whole file, so post the raw body directly.
+        """
+        response = await self.session.post(
+            f"/object/{bucket}/{path}",
+            content=chunks,
+            headers={"content-type": content_type, "x-upsert": "false"}
+        )
+        response.raise_for_status()
+
+
+class AsyncClient:
+    """Non-blocking Supabase client exposing the same table/rpc/auth/storage surface
+    as the synchronous `supabase.Client`; every query must be awaited."""
+
+    def __init__(self, supabase_url: str, supabase_key: str):
+        headers = {
+            "apiKey": supabase_key,
+            "Authorization": f"Bearer {supabase_key}"
+        }
+
+        self.postgrest = _PooledPostgrestClient(f"{supabase_url}/rest/v1", headers=headers)
+        self._auth_http = _pooled_http_client(base_url=f"{supabase_url}/auth/v1", headers=headers, transport=_shared_transport())
+        # Server-side client: never persist or auto-refresh a user session
+        self.auth = AsyncGoTrueClient(
+            url=f"{supabase_url}/auth/v1",
+            headers=headers,
+            auto_refresh_token=False,
+            persist_session=False,
+            http_client=self._auth_http
+        )
+        self.storage = _StreamingStorageClient(f"{supabase_url}/storage/v1", headers)
+
+    def table(self, table_name: str):
+        """Start a query against a table"""
+        return self.postgrest.from_(table_name)
+
+    def rpc(self, fn: str, params: dict):
+        """Call a Postgres function"""
+        return self.postgrest.rpc(fn, params)
+
+    async def ping_auth(self):
+        """Call the auth service's health endpoint; raises if it is not up"""
+        response = await self._auth_http.get("/health")
+        response.raise_for_status()
+
+    async def aclose(self):
+        """Close this client's sessions (the shared pool is closed by close_db)"""
+        await self.postgrest.aclose()
+        await self.auth.close()
+        await self.storage.aclose()
+
+
+# Clients are built on first use, so importing this module does no network
+# setup and needs no credentials (e.g. for tests and CLI --help)
+_supabase: Optional[AsyncClient] = None
+_supabase_anon: Optional[AsyncClient] = None
+
+
+def _create_client(key: Optional[str], key_name: str) -> AsyncClient:
+    if not SUPABASE_URL or not key:
+        raise ValueError(f"SUPABASE_URL and {key_name} must be set")
+    return AsyncClient(SUPABASE_URL, key)
+
+
+def get_supabase() -> AsyncClient:
     """Dependency to get Supabase client"""
-    return supabase
+    global _supabase
+    if _supabase is None:
+        if DATABASE_BACKEND == "memory":
+            from app.memory_database import MemoryClient
+            _supabase = MemoryClient()
+        else:
+            # Service role key for admin operations
+            _supabase = _create_client(SUPABASE_SERVICE_KEY, "SUPABASE_SERVICE_KEY")
+    return _supabase
 
-def get_supabase_anon() -> Client:
+
+def get_supabase_anon() -> AsyncClient:
     """Dependency to get anonymous Supabase client"""
-    return supabase_anon
\ No newline at end of file
+    global _supabase_anon
+    if _supabase_anon is None:
+        if DATABASE_BACKEND == "memory":
+            # One shared in-memory store so both clients see the same rows
+            _supabase_anon = get_supabase()
+        else:
+            _supabase_anon = _create_client(SUPABASE_ANON_KEY, "SUPABASE_ANON_KEY")
+    return _supabase_anon
+
+
+def __getattr__(name: str):
+    # `from app.database import supabase` still works, building the client then
+    if name == "supabase":
+        return get_supabase()
+    if name == "supabase_anon":
+        return get_supabase_anon()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Result of the startup probe, reported by /health
+db_status: Dict[str, Any] = {
+    "status": "starting", "latency_ms": None, "checked_at": None, "error": None, "ready_after_s": None
+}
+_probe_task: Optional[asyncio.Task] = None
+
+
+async def check_db() -> float:
+    """Run a trivial query and return its latency in seconds; raises if it fails"""
+    start = time.perf_counter()
+    await get_supabase().table('profiles').select('id').limit(1).execute()
+    return time.perf_counter() - start
+
+
+async def _probe_until_ready():
+    while True:
+        try:
+            latency = await check_db()
+        except Exception as e:
+            db_status.update(status="unavailable", error=str(e), checked_at=datetime.now(timezone.utc).isoformat())
+            print(f"⚠️  Database not reachable yet, retrying in {DB_PROBE_RETRY_SECONDS:g}s: {e}")
+            print("📋 If the tables do not exist, run the SQL schema in your Supabase dashboard")
+            await asyncio.sleep(DB_PROBE_RETRY_SECONDS)
+            continue
+        db_status.update(
+            status="ok", latency_ms=round(latency * 1000, 2), error=None,
+            checked_at=datetime.now(timezone.utc).isoformat(),
+            # Cold start: first import of the app package to the first successful probe
+            ready_after_s=round(time.perf_counter() - IMPORT_STARTED, 3)
+        )
+        print(f"✅ Database connection successful (ready {db_status['ready_after_s']}s after import)")
+        return
+
+
+async def init_db():
+    """Start the database health probe in the background; startup does not wait for it"""
+    global _probe_task
+    if _probe_task is None or _probe_task.done():
+        _probe_task = asyncio.create_task(_probe_until_ready())
+
+
+async def wait_for_db():
+    """Return once the startup probe has succeeded"""
+    if _probe_task is not None:
+        await asyncio.shield(_probe_task)
+
+
+async def close_db():
+    """Stop the probe and release pooled database connections"""
+    global _supabase, _supabase_anon, _transport, _probe_task
+    if _probe_task is not None:
+        _probe_task.cancel()
+        _probe_task = None
+    if DATABASE_BACKEND == "memory":
+        # The in-memory client is the data itself; keep it
+        return
+    for client in {id(c): c for c in (_supabase, _supabase_anon) if c is not None}.values():
+        await client.aclose()
+    if _transport is not None:
+        await _transport.aclose()
+    _supabase = _supabase_anon = _transport = None
@@ -0,0 +1,182 @@
+"""
+Streaming document uploads.
+
+The multipart body is parsed as it arrives (python-multipart) and the first
+file part is handed chunk by chunk to the document classifier and to Supabase
+Storage through a small bounded queue. Nothing holds the whole file, so memory
+per upload stays at a few chunks however large the document is.
+"""
+
+from app.langgraph.keywords import ClassifierStream
+from multipart.multipart import MultipartParser, parse_options_header
+from typing import Any, AsyncIterator, Dict, List, Optional
+import asyncio
+import codecs
+import os
+import re
+import uuid
+
+DOCUMENT_BUCKET = os.getenv("DOCUMENT_BUCKET", "claim-documents")
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", str(100 * 1024 * 1024)))
+UPLOAD_QUEUE_CHUNKS = int(os.getenv("UPLOAD_QUEUE_CHUNKS", "4"))
+
+
+class InvalidUploadError(Exception):
+    """Raised when the request body is not a multipart upload with a file"""
+
+
+class UploadTooLargeError(Exception):
+    """Raised when the uploaded file exceeds MAX_UPLOAD_SIZE"""
+
+
+class MultipartFileReader:
+    """Incremental reader for the first file part of a multipart/form-data body"""
+
+    def __init__(self, content_type: str):
+        mime_type, params = parse_options_header(content_type or "")
+        if mime_type != b"multipart/form-data" or b"boundary" not in params:
+            raise InvalidUploadError("Expected a multipart/form-data upload")
+
+        self.file_name: Optional[str] = None
+        self.file_type: Optional[str] = None
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._in_file = False
+        self._file_done = False
+        self._data: List[bytes] = []
+
+        self._parser = MultipartParser(params[b"boundary"], callbacks={
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end
+        })
+
+    # python-multipart callbacks
+
+    def _on_part_begin(self):
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if b"filename" in options and self.file_name is None:
+            self.file_name = options[b"filename"].decode("utf-8", errors="replace")
+            self.file_type = self._headers.get(b"content-type", b"application/octet-stream").decode("latin-1")
+            self._in_file = True
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._in_file:
+            self._data.append(bytes(data[start:end]))
+
+    def _on_part_end(self):
+        if self._in_file:
+            self._in_file = False
+            self._file_done = True
+
+    async def chunks(self, body: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """File bytes as they are parsed out of the request body"""
+        async for raw in body:
+            self._parser.write(raw)
+            if self._data:
+                chunk = b"".join(self._data)
+                self._data.clear()
+                yield chunk
+            if self._file_done:
+                # Later form fields are not needed
+                return
+
+
+def storage_path(user_id: str, claim_id: str, file_name: str) -> str:
+    """Object path under the uploader's folder, as the bucket policies require"""
+    safe_name = re.sub(r"[^A-Za-z0-9._-]+", "_", file_name).strip("._") or "document"
+    return f"{user_id}/{claim_id}/{uuid.uuid4()}-{safe_name}"
+
+
+async def _send(queue: asyncio.Queue, upload: asyncio.Task, chunk: Optional[bytes]):
+    """Queue a chunk for the uploader, failing fast if the upload has died"""
+    try:
+        queue.put_nowait(chunk)
+        return
+    except asyncio.QueueFull:
+        pass
+
+    put = asyncio.ensure_future(queue.put(chunk))
+    await asyncio.wait({put, upload}, return_when=asyncio.FIRST_COMPLETED)
+    if not put.done():
+        put.cancel()
+        upload.result()
+        raise RuntimeError("Storage upload ended before the file was complete")
+
+
+async def stream_document(
+    supabase,
+    body: AsyncIterator[bytes],
+    content_type: str,
+    user_id: str,
+    claim_id: str,
+    stream: ClassifierStream,
+    max_size: int = MAX_UPLOAD_SIZE
+) -> Dict[str, Any]:
+    """Upload the file in a multipart body to storage while classifying it.
+
+    Returns the stored file's name, path, type and size; `stream` holds the
+    classification once this returns.
+    """
+    reader = MultipartFileReader(content_type)
+    parts = reader.chunks(body)
+    chunk = await anext(parts, None)
+    if reader.file_name is None:
+        raise InvalidUploadError("Upload must contain a file")
+
+    file_path = storage_path(user_id, claim_id, reader.file_name)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=UPLOAD_QUEUE_CHUNKS)
+
+    async def queued_chunks():
+        while (item := await queue.get()) is not None:
+            yield item
+
+    upload = asyncio.create_task(
+        supabase.storage.upload_stream(DOCUMENT_BUCKET, file_path, queued_chunks(), reader.file_type)
+    )
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    file_size = 0
+
+    try:
+        while chunk is not None:
+            file_size += len(chunk)
+            if file_size > max_size:
+                raise UploadTooLargeError(f"File exceeds the {max_size} byte upload limit")
+            if not stream.done:
+                stream.feed(decoder.decode(chunk))
+            await _send(queue, upload, chunk)
+            chunk = await anext(parts, None)
+
+        stream.feed(decoder.decode(b"", final=True))
+        await _send(queue, upload, None)
+        await upload
+    except BaseException:
+        upload.cancel()
+        await asyncio.gather(upload, return_exceptions=True)
+        raise
+
+    return {
+        "file_name": reader.file_name,
+        "file_path": file_path,
+        "file_type": reader.file_type,
+        "file_size": file_size
+    }
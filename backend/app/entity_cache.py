@@ -0,0 +1,58 @@
+"""
+Read-through cache of profile and claim rows.
+
+Profiles are read on every dashboard page load and by every agent-only
+endpoint, and single claims are re-read far more often than they change, so
+both are served from app.cache (per-worker LRU, or Redis shared by all workers
+with CACHE_BACKEND=redis). Every code path that writes a profile or claim
+evicts its entry after the write; the TTL bounds staleness from writes made
+outside the API and, with the per-worker backend, from other workers.
+"""
+
+from app.database import AsyncClient
+from app.cache import create_cache
+from typing import Any, Dict, Iterable, Optional
+import os
+
+ENTITY_CACHE_SIZE = int(os.getenv("ENTITY_CACHE_SIZE", "10000"))
+PROFILE_CACHE_TTL = int(os.getenv("PROFILE_CACHE_TTL", "300"))
+CLAIM_CACHE_TTL = int(os.getenv("CLAIM_CACHE_TTL", "60"))
+
+profile_cache = create_cache("profile", max_size=ENTITY_CACHE_SIZE, ttl=PROFILE_CACHE_TTL)
+claim_cache = create_cache("claim", max_size=ENTITY_CACHE_SIZE, ttl=CLAIM_CACHE_TTL)
+
+
+async def get_profile_row(supabase: AsyncClient, user_id: str) -> Optional[Dict[str, Any]]:
+    """The user's profile row, or None if there is none"""
+    cached = await profile_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    response = await supabase.table('profiles').select('*').eq('id', user_id).limit(1).execute()
+    if not response.data:
+        return None
+
+    await profile_cache.set(user_id, response.data[0])
+    return response.data[0]
+
+
+async def get_claim_row(supabase: AsyncClient, claim_id: str) -> Optional[Dict[str, Any]]:
+    """The full claim row, or None if there is none; callers check ownership"""
+    cached = await claim_cache.get(claim_id)
+    if cached is not None:
+        return cached
+
+    response = await supabase.table('claims').select('*').eq('id', claim_id).limit(1).execute()
+    if not response.data:
+        return None
+
+    await claim_cache.set(claim_id, response.data[0])
+    return response.data[0]
+
+
+async def invalidate_profile(user_id: str):
+    await profile_cache.delete(user_id)
+
+
+async def invalidate_claims(claim_ids: Iterable[str]):
+    await claim_cache.delete(*claim_ids)
@@ -0,0 +1,150 @@
+"""
+Liveness and readiness of this worker.
+
+Liveness only says the event loop is answering. Readiness also requires the
+startup work (database probe, stored agent config) to be done, and then probes
+the database, the auth service and the compiled ClaimProcessingAgent workflow
+concurrently, each under HEALTH_PROBE_TIMEOUT. Probe results are kept for
+HEALTH_CACHE_TTL seconds and concurrent checks share one run, so however often
+the load balancer asks, each worker probes its dependencies at most once per
+TTL. The results are per worker on purpose: a worker whose connections are
+wedged must report itself, so nothing here goes through the shared cache.
+"""
+
+from app.database import get_supabase, check_db, wait_for_db, db_status, DB_PROBE_RETRY_SECONDS
+from app.langgraph.claim_agent import get_claim_agent, reload_claim_agent, load_agent_config
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+import asyncio
+import os
+import time
+
+HEALTH_CACHE_TTL = float(os.getenv("HEALTH_CACHE_TTL", "5"))
+HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", "2"))
+
+# Run through the workflow by the readiness probe; never stored
+PROBE_CLAIM = {
+    "id": "health-probe",
+    "type": "auto",
+    "amount": 1000.0,
+    "description": "Readiness probe",
+    "priority": "low"
+}
+
+STARTED_AT = time.time()
+
+# Whether the stored agent config has been applied; readiness waits for it
+agent_status: Dict[str, Any] = {"status": "starting", "version": None, "error": None}
+
+_probe_results: Optional[Dict[str, Any]] = None
+_probed_at = 0.0
+_probe_lock = asyncio.Lock()
+
+
+async def load_stored_agent_config():
+    """Recompile the workflow for the agent config in system_settings once the
+    database answers. A workflow preloaded before fork (run.py --prod) is kept
+    unless the stored config differs. Reading the config is retried with
+    backoff (up to DB_PROBE_RETRY_SECONDS apart) until it succeeds; only config
+    that fails to compile leaves the agent in "error"."""
+    await wait_for_db()
+    delay = 0.5
+    while True:
+        try:
+            config = await load_agent_config(get_supabase())
+            break
+        except Exception as e:
+            agent_status.update(status="unavailable", error=str(e))
+            print(f"⚠️  Could not read agent config, retrying in {delay:g}s: {e}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, DB_PROBE_RETRY_SECONDS)
+
+    try:
+        agent = reload_claim_agent(config)
+    except Exception as e:
+        agent_status.update(status="error", error=str(e))
+        print(f"⚠️  Invalid agent config: {e}")
+        return
+    agent_status.update(status="ok", version=agent.version, error=None)
+
+
+async def _probe_auth():
+    await get_supabase().ping_auth()
+
+
+async def _probe_workflow() -> Dict[str, Any]:
+    agent = get_claim_agent()
+    # Probe runs stay out of the production node latency histograms
+    result = await agent.process_claim(dict(PROBE_CLAIM), record_metrics=False)
+    # process_claim reports a failed run rather than raising
+    if result.get("error"):
+        raise RuntimeError(result["error"])
+    return {"version": agent.version}
+
+
+async def _run_probe(probe: Callable[[], Awaitable[Any]]) -> Dict[str, Any]:
+    """Status and latency of one dependency; a probe that hangs counts as down"""
+    start = time.perf_counter()
+    try:
+        details = await asyncio.wait_for(probe(), timeout=HEALTH_PROBE_TIMEOUT)
+        outcome = {"status": "ok", "error": None}
+    except asyncio.TimeoutError:
+        details = None
+        outcome = {"status": "timeout", "error": f"No answer within {HEALTH_PROBE_TIMEOUT:g}s"}
+    except Exception as e:
+        details = None
+        outcome = {"status": "error", "error": str(e)}
+    outcome["latency_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    if isinstance(details, dict):
+        outcome.update(details)
+    return outcome
+
+
+async def probe_dependencies() -> Dict[str, Any]:
+    """Per-dependency status, at most HEALTH_CACHE_TTL seconds old"""
+    global _probe_results, _probed_at
+    if _probe_results is not None and time.monotonic() - _probed_at < HEALTH_CACHE_TTL:
+        return _probe_results
+
+    async with _probe_lock:
+        # Another check may have probed while this one waited
+        if _probe_results is not None and time.monotonic() - _probed_at < HEALTH_CACHE_TTL:
+            return _probe_results
+
+        names = ("database", "auth", "workflow")
+        outcomes = await asyncio.gather(
+            _run_probe(check_db), _run_probe(_probe_auth), _run_probe(_probe_workflow)
+        )
+        _probe_results = {
+            "checked_at": datetime.now(timezone.utc).isoformat(),
+            "dependencies": dict(zip(names, outcomes))
+        }
+        _probed_at = time.monotonic()
+        return _probe_results
+
+
+def liveness() -> Dict[str, Any]:
+    return {
+        "status": "alive",
+        "pid": os.getpid(),
+        "uptime_s": round(time.time() - STARTED_AT, 1)
+    }
+
+
+async def readiness() -> Dict[str, Any]:
+    """Readiness report; "ready" is True only if startup is done and every probe passed"""
+    startup = {"database": db_status, "agent": agent_status}
+    if db_status["status"] != "ok" or agent_status["status"] != "ok":
+        # Nothing to probe until startup has finished
+        status = "error" if agent_status["status"] == "error" else "starting"
+        return {"ready": False, "status": status, "startup": startup, "dependencies": {}}
+
+    probes = await probe_dependencies()
+    ready = all(outcome["status"] == "ok" for outcome in probes["dependencies"].values())
+    return {
+        "ready": ready,
+        "status": "ready" if ready else "degraded",
+        "startup": startup,
+        "checked_at": probes["checked_at"],
+        "dependencies": probes["dependencies"]
+    }
@@ -0,0 +1,236 @@
+"""
+Background job queue for AI claim processing.
+
+Enqueueing returns immediately with a job id; a pool of in-process worker tasks
+runs the workflow and records per-node progress in a job store. The store is
+in-memory by default, or SQLite (AI_JOB_BACKEND=sqlite) so every worker
+process on a host can report on jobs started by its siblings.
+"""
+
+from app.database import get_supabase
+from app.langgraph.claim_agent import WORKFLOW_NODES, get_claim_agent
+from app.batch_processing import store_results
+from app.analysis_cache import cached_process_claim
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import uuid
+
+AI_JOB_BACKEND = os.getenv("AI_JOB_BACKEND", "memory")
+AI_JOB_DB_PATH = os.getenv("AI_JOB_DB_PATH", "ai_jobs.sqlite3")
+AI_JOB_WORKERS = int(os.getenv("AI_JOB_WORKERS", "4"))
+AI_JOB_QUEUE_SIZE = int(os.getenv("AI_JOB_QUEUE_SIZE", "1000"))
+AI_JOB_RETENTION = int(os.getenv("AI_JOB_RETENTION", "10000"))
+# How long shutdown waits for queued and running jobs before cancelling them
+AI_JOB_DRAIN_TIMEOUT = float(os.getenv("AI_JOB_DRAIN_TIMEOUT", "60"))
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue cannot accept more work"""
+
+
+class MemoryJobStore:
+    """Job records kept in this process, oldest evicted past the retention limit"""
+
+    def __init__(self, retention: int = AI_JOB_RETENTION):
+        self.retention = retention
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    async def create(self, job: Dict[str, Any]):
+        self._jobs[job["id"]] = job
+        while len(self._jobs) > self.retention:
+            self._jobs.popitem(last=False)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        return json.loads(json.dumps(job, default=str)) if job else None
+
+    async def update(self, job_id: str, changes: Dict[str, Any]):
+        if job_id in self._jobs:
+            self._jobs[job_id].update(changes)
+
+
+class SQLiteJobStore:
+    """Job records in a local SQLite file shared by all workers on the host,
+    oldest deleted past the retention limit"""
+
+    def __init__(self, path: str = AI_JOB_DB_PATH, retention: int = AI_JOB_RETENTION):
+        self.path = path
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened on first use in each process: a connection must not cross a fork
+        if self._pid != os.getpid():
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._pid = os.getpid()
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS ai_jobs (id TEXT PRIMARY KEY, data TEXT NOT NULL)"
+            )
+            self._connection.commit()
+        return self._connection
+
+    def _insert(self, job: Dict[str, Any]):
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO ai_jobs (id, data) VALUES (?, ?)",
+                (job["id"], json.dumps(job, default=str))
+            )
+            # rowid follows insertion order (updates keep it), so this keeps
+            # the newest `retention` jobs like MemoryJobStore
+            connection.execute(
+                "DELETE FROM ai_jobs WHERE rowid <= "
+                "(SELECT rowid FROM ai_jobs ORDER BY rowid DESC LIMIT 1 OFFSET ?)",
+                (self.retention,)
+            )
+            connection.commit()
+
+    def _write(self, job: Dict[str, Any]):
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                "UPDATE ai_jobs SET data = ? WHERE id = ?",
+                (json.dumps(job, default=str), job["id"])
+            )
+            connection.commit()
+
+    def _read(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connect().execute("SELECT data FROM ai_jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _merge(self, job_id: str, changes: Dict[str, Any]):
+        job = self._read(job_id)
+        if job is not None:
+            job.update(changes)
+            self._write(job)
+
+    # sqlite3 is blocking, so run it off the event loop
+
+    async def create(self, job: Dict[str, Any]):
+        await asyncio.to_thread(self._insert, job)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._read, job_id)
+
+    async def update(self, job_id: str, changes: Dict[str, Any]):
+        await asyncio.to_thread(self._merge, job_id, changes)
+
+
+class JobQueue:
+    """Bounded queue of AI processing jobs drained by a pool of worker tasks"""
+
+    def __init__(self, store, workers: int = AI_JOB_WORKERS, max_size: int = AI_JOB_QUEUE_SIZE):
+        self.store = store
+        self.workers = workers
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_size)
+        self._tasks = []
+
+    async def start(self):
+        """Spawn the worker tasks (called from the app lifespan)"""
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, drain_timeout: Optional[float] = None):
+        """Stop the workers, first letting queued and running jobs finish"""
+        if drain_timeout is None or drain_timeout > 0:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=drain_timeout)
+            except asyncio.TimeoutError:
+                pass
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def enqueue(self, claim_data: Dict[str, Any], user_id: str) -> Dict[str, Any]:
+        """Record a queued job for the claim and hand it to the workers"""
+        if self._queue.full():
+            raise QueueFullError("AI job queue is full")
+
+        job = {
+            "id": str(uuid.uuid4()),
+            "claim_id": claim_data["id"],
+            "user_id": user_id,
+            "status": "queued",
+            "nodes": {node_name: "pending" for node_name in WORKFLOW_NODES},
+            "progress": 0.0,
+            "result": None,
+            "error": None,
+            "created_at": datetime.now().isoformat(),
+            "started_at": None,
+            "finished_at": None
+        }
+
+        await self.store.create(job)
+        self._queue.put_nowait((job["id"], claim_data))
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self.store.get(job_id)
+
+    async def _worker(self):
+        while True:
+            job_id, claim_data = await self._queue.get()
+            try:
+                await self._run(job_id, claim_data)
+            except Exception as e:
+                await self.store.update(job_id, {
+                    "status": "failed",
+                    "error": str(e),
+                    "finished_at": datetime.now().isoformat()
+                })
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str, claim_data: Dict[str, Any]):
+        nodes = {node_name: "pending" for node_name in WORKFLOW_NODES}
+        await self.store.update(job_id, {
+            "status": "running",
+            "started_at": datetime.now().isoformat()
+        })
+
+        async def on_node(node_name, state):
+            if node_name not in nodes:
+                return
+            nodes[node_name] = "completed"
+            done = sum(1 for value in nodes.values() if value == "completed")
+            await self.store.update(job_id, {
+                "nodes": dict(nodes),
+                "progress": round(done / len(nodes), 3)
+            })
+
+        ai_result = await cached_process_claim(get_claim_agent(), claim_data, on_node=on_node)
+        await store_results(get_supabase(), [(claim_data, ai_result)])
+
+        outcome = {
+            "status": "failed" if "error" in ai_result else "succeeded",
+            "result": ai_result,
+            "error": ai_result.get("error"),
+            "finished_at": datetime.now().isoformat()
+        }
+        if "error" not in ai_result:
+            outcome["progress"] = 1.0
+        await self.store.update(job_id, outcome)
+
+
+def _create_store():
+    if AI_JOB_BACKEND == "sqlite":
+        return SQLiteJobStore()
+    return MemoryJobStore()
+
+
+job_queue = JobQueue(_create_store())
+
+def get_job_queue() -> JobQueue:
+    """Dependency to get the AI job queue"""
+    return job_queue
@@ -1,5 +1,17 @@
 # LangGraph AI Integration for Insurance Claim Processing
 
-from .claim_agent import ClaimProcessingAgent
+from .claim_agent import (
+    ClaimProcessingAgent, WORKFLOW_VERSION, CLAIM_INPUT_FIELDS, AI_CLAIM_COLUMNS,
+    WORKFLOW_NODES, PARALLEL_NODES, node_result,
+    init_claim_agent, reload_claim_agent, get_claim_agent, load_agent_config
+)
+from .rules import RuleSet, DEFAULT_SCORING_RULES, compile_rule_sets
+from .keywords import KeywordMatcher, KeywordClassifier, DEFAULT_DOCUMENT_KEYWORDS
 
-__all__ = ["ClaimProcessingAgent"]
\ No newline at end of file
+__all__ = [
+    "ClaimProcessingAgent", "WORKFLOW_VERSION", "CLAIM_INPUT_FIELDS", "AI_CLAIM_COLUMNS",
+    "WORKFLOW_NODES", "PARALLEL_NODES", "node_result",
+    "init_claim_agent", "reload_claim_agent", "get_claim_agent", "load_agent_config",
+    "RuleSet", "DEFAULT_SCORING_RULES", "compile_rule_sets",
+    "KeywordMatcher", "KeywordClassifier", "DEFAULT_DOCUMENT_KEYWORDS"
+]
\ No newline at end of file
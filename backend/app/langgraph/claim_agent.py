@@ -26,27 +26,106 @@ except ImportError:
     
     END = "END"
 
-from typing import Dict, Any, List, TypedDict
+from .rules import RuleSet, compile_rule_sets
+from .keywords import DEFAULT_DOCUMENT_KEYWORDS, ClassifierStream, KeywordClassifier
+from app.metrics import NODE_LATENCY
+from contextvars import ContextVar
+from typing import Dict, Any, Annotated, Awaitable, Callable, List, Optional, Sequence, TypedDict
 import asyncio
+import hashlib
 import json
 import random
+import time
 from datetime import datetime
 
+# Bump when node logic changes so stored analyses can be told apart
+WORKFLOW_VERSION = "1.0"
+
+# Claim fields the nodes and detect_fraud read; results depend on nothing else
+CLAIM_INPUT_FIELDS = ["type", "amount", "description"]
+
+# claims columns to select for a workflow run; skips the metadata / ai_analysis blobs
+AI_CLAIM_COLUMNS = ','.join(['id'] + CLAIM_INPUT_FIELDS)
+
+# Workflow nodes in topological order (used for progress reporting)
+WORKFLOW_NODES = [
+    "classify",
+    "validate",
+    "assess_risk",
+    "detect_fraud",
+    "generate_recommendations",
+    "finalize"
+]
+
+# analysis_results key each analysis node writes
+NODE_RESULT_KEYS = {
+    "classify": "classification",
+    "validate": "validation",
+    "assess_risk": "risk_assessment",
+    "detect_fraud": "fraud_detection"
+}
+
+# Nodes that only read claim_data and each write their own analysis_results
+# key; they run concurrently between classify and generate_recommendations
+PARALLEL_NODES = ["validate", "assess_risk", "detect_fraud"]
+
+def merge_analysis_results(current: Dict[str, Any], update: Dict[str, Any]) -> Dict[str, Any]:
+    """Reducer joining analysis_results written by concurrent branches"""
+    return {**(current or {}), **(update or {})}
+
 class ClaimState(TypedDict):
     """State for claim processing workflow"""
     claim_data: Dict[str, Any]
-    analysis_results: Dict[str, Any]
+    analysis_results: Annotated[Dict[str, Any], merge_analysis_results]
     recommendations: List[str]
     confidence: float
     next_action: str
     errors: List[str]
 
+# Called after each workflow node with the node name and the state so far
+NodeCallback = Callable[[str, ClaimState], Awaitable[None]]
+
+# Milliseconds per node for the process_claim call running in this context
+_node_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("node_timings", default=None)
+
+# False while a run should stay out of NODE_LATENCY (e.g. health probes)
+_record_metrics: ContextVar[bool] = ContextVar("record_metrics", default=True)
+
+def node_result(node_name: str, state: ClaimState) -> Dict[str, Any]:
+    """The part of the state a finished node produced, for progress reporting"""
+    if node_name in NODE_RESULT_KEYS:
+        key = NODE_RESULT_KEYS[node_name]
+        return {key: state["analysis_results"].get(key)}
+    if node_name == "generate_recommendations":
+        return {"recommendations": state.get("recommendations", [])}
+    if node_name == "finalize":
+        return {"confidence": state.get("confidence", 0.0), "next_action": state.get("next_action")}
+    return {}
+
 class ClaimProcessingAgent:
     """Main agent for processing insurance claims using LangGraph workflows"""
     
-    def __init__(self):
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = config or {}
+        self.version = self._workflow_version(self.config)
+        # Scoring rules may be overridden through config["scoring_rules"]
+        self.rule_sets: Dict[str, RuleSet] = compile_rule_sets(
+            self.config.get("scoring_rules"), fields=CLAIM_INPUT_FIELDS
+        )
+        # Document categories and their keywords, in priority order
+        self.document_classifier = KeywordClassifier(
+            self.config.get("document_keywords") or DEFAULT_DOCUMENT_KEYWORDS
+        )
         self.workflow = self._create_workflow()
     
+    @staticmethod
+    def _workflow_version(config: Dict[str, Any]) -> str:
+        """Workflow version, suffixed with a config fingerprint when configured"""
+        if not config:
+            return WORKFLOW_VERSION
+        fingerprint = hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode()).hexdigest()
+        return f"{WORKFLOW_VERSION}+{fingerprint[:8]}"
+    
     def _create_workflow(self) -> StateGraph:
         """Create the claim processing workflow"""
         
@@ -58,24 +137,50 @@ class ClaimProcessingAgent:
         workflow = StateGraph(ClaimState)
         
         # Add nodes
-        workflow.add_node("classify", self._classify_claim)
-        workflow.add_node("validate", self._validate_documents)
-        workflow.add_node("assess_risk", self._assess_risk)
-        workflow.add_node("detect_fraud", self._detect_fraud)
-        workflow.add_node("generate_recommendations", self._generate_recommendations)
-        workflow.add_node("finalize", self._finalize_analysis)
-        
-        # Add edges
+        for node_name, node in self._nodes().items():
+            workflow.add_node(node_name, node)
+        
+        # Add edges: fan out after classification, join before recommendations
         workflow.set_entry_point("classify")
-        workflow.add_edge("classify", "validate")
-        workflow.add_edge("validate", "assess_risk")
-        workflow.add_edge("assess_risk", "detect_fraud")
-        workflow.add_edge("detect_fraud", "generate_recommendations")
+        for node_name in PARALLEL_NODES:
+            workflow.add_edge("classify", node_name)
+        workflow.add_edge(PARALLEL_NODES, "generate_recommendations")
         workflow.add_edge("generate_recommendations", "finalize")
         workflow.add_edge("finalize", END)
         
         return workflow.compile()
     
+    def _nodes(self) -> Dict[str, Callable[[ClaimState], Awaitable[Dict[str, Any]]]]:
+        """Node implementations keyed by workflow node name.
+        
+        Parallel nodes return partial updates instead of mutating the state.
+        """
+        nodes = {
+            "classify": self._classify_claim,
+            "validate": self._validate_documents,
+            "assess_risk": self._assess_risk,
+            "detect_fraud": self._detect_fraud,
+            "generate_recommendations": self._generate_recommendations,
+            "finalize": self._finalize_analysis
+        }
+        return {node_name: self._timed(node_name, node) for node_name, node in nodes.items()}
+    
+    @staticmethod
+    def _timed(node_name: str, node):
+        """Wrap a node to record its duration in metrics and the run's timings"""
+        async def run(state):
+            start = time.perf_counter()
+            try:
+                return await node(state)
+            finally:
+                elapsed = time.perf_counter() - start
+                if _record_metrics.get():
+                    NODE_LATENCY.observe(elapsed, node=node_name)
+                timings = _node_timings.get()
+                if timings is not None:
+                    timings[node_name] = round(elapsed * 1000, 3)
+        return run
+    
     async def _classify_claim(self, state: ClaimState) -> ClaimState:
         """Classify the claim type and determine processing path"""
         claim_data = state["claim_data"]
@@ -96,7 +201,7 @@ class ClaimProcessingAgent:
         
         return state
     
-    async def _validate_documents(self, state: ClaimState) -> ClaimState:
+    async def _validate_documents(self, state: ClaimState) -> Dict[str, Any]:
         """Validate submitted documents"""
         claim_data = state["claim_data"]
         
@@ -108,62 +213,43 @@ class ClaimProcessingAgent:
             "authenticity_score": 0.92
         }
         
-        state["analysis_results"]["validation"] = validation
-        
-        return state
+        return {"analysis_results": {"validation": validation}}
     
-    async def _assess_risk(self, state: ClaimState) -> ClaimState:
+    async def _assess_risk(self, state: ClaimState) -> Dict[str, Any]:
         """Assess risk factors for the claim"""
-        claim_data = state["claim_data"]
-        
-        # Simulate risk assessment
-        risk_factors = []
-        risk_score = 0.3  # Default low risk
-        
-        # Example risk factors
-        if claim_data.get("amount", 0) > 50000:
-            risk_factors.append("High claim amount")
-            risk_score += 0.2
-        
-        if claim_data.get("type") == "auto" and "accident" in claim_data.get("description", "").lower():
-            risk_factors.append("Vehicle accident claim")
-            risk_score += 0.1
-        
-        assessment = {
-            "risk_score": min(risk_score, 1.0),
-            "risk_level": "low" if risk_score < 0.3 else "medium" if risk_score < 0.7 else "high",
-            "risk_factors": risk_factors,
-            "approval_probability": 1.0 - risk_score
-        }
+        assessment = self.assess_risk_batch([state["claim_data"]])[0]
         
-        state["analysis_results"]["risk_assessment"] = assessment
-        
-        return state
+        return {"analysis_results": {"risk_assessment": assessment}}
     
-    async def _detect_fraud(self, state: ClaimState) -> ClaimState:
+    async def _detect_fraud(self, state: ClaimState) -> Dict[str, Any]:
         """Detect potential fraud indicators"""
-        claim_data = state["claim_data"]
-        
-        # Simulate fraud detection
-        fraud_indicators = []
-        fraud_score = 0.1  # Default low fraud probability
-        
-        # Example fraud detection logic
-        description = claim_data.get("description", "").lower()
-        if "total loss" in description and claim_data.get("amount", 0) > 100000:
-            fraud_indicators.append("High-value total loss claim")
-            fraud_score += 0.3
+        evaluation = self.rule_sets["fraud_detection"].evaluate([state["claim_data"]])
+        fraud_score = evaluation.scores[0]
         
         fraud_detection = {
             "fraud_probability": fraud_score,
-            "fraud_indicators": fraud_indicators,
+            "fraud_indicators": evaluation.indicators[0],
             "investigation_required": fraud_score > 0.5,
             "confidence": 0.88
         }
         
-        state["analysis_results"]["fraud_detection"] = fraud_detection
-        
-        return state
+        return {"analysis_results": {"fraud_detection": fraud_detection}}
+    
+    def assess_risk_batch(self, claims: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Risk assessments for many claims in one vectorized rule evaluation"""
+        evaluation = self.rule_sets["risk_assessment"].evaluate(claims)
+        
+        return [
+            {
+                "risk_score": min(risk_score, 1.0),
+                "risk_level": risk_level,
+                "risk_factors": risk_factors,
+                "approval_probability": 1.0 - risk_score
+            }
+            for risk_score, risk_factors, risk_level in zip(
+                evaluation.scores, evaluation.indicators, evaluation.labels
+            )
+        ]
     
     async def _generate_recommendations(self, state: ClaimState) -> ClaimState:
         """Generate processing recommendations"""
@@ -243,8 +329,18 @@ class ClaimProcessingAgent:
         
         return doc_requirements.get(claim_type, ["Standard claim form"])
     
-    async def process_claim(self, claim_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Process a claim through the complete workflow"""
+    async def process_claim(
+        self,
+        claim_data: Dict[str, Any],
+        on_node: Optional[NodeCallback] = None,
+        record_metrics: bool = True
+    ) -> Dict[str, Any]:
+        """Process a claim through the complete workflow.
+        
+        If on_node is given it is awaited after every node completes.
+        With record_metrics=False the run's node times are not added to
+        NODE_LATENCY (they are still returned in "timings").
+        """
         
         initial_state = ClaimState(
             claim_data=claim_data,
@@ -255,13 +351,25 @@ class ClaimProcessingAgent:
             errors=[]
         )
         
+        timings: Dict[str, float] = {}
+        token = _node_timings.set(timings)
+        metrics_token = _record_metrics.set(record_metrics)
+        start = time.perf_counter()
+        
         try:
             if not LANGGRAPH_AVAILABLE:
                 # Use simplified processing when LangGraph is not available
-                result = await self._simple_claim_processing(initial_state)
-            else:
+                result = await self._simple_claim_processing(initial_state, on_node)
+            elif on_node is None:
                 # Run the workflow
                 result = await self.workflow.ainvoke(initial_state)
+            else:
+                # Stream node by node so the caller can observe progress
+                result = initial_state
+                async for step in self.workflow.astream(initial_state):
+                    for node_name, node_state in step.items():
+                        result = node_state
+                        await on_node(node_name, node_state)
             
             return {
                 "analysis": result.get("analysis_results", {}),
@@ -269,8 +377,12 @@ class ClaimProcessingAgent:
                 "confidence": result.get("confidence", 0.0),
                 "next_action": result.get("next_action", "manual_review"),
                 "processed_at": datetime.now().isoformat(),
-                "workflow_version": "1.0",
-                "langgraph_enabled": LANGGRAPH_AVAILABLE
+                "workflow_version": self.version,
+                "langgraph_enabled": LANGGRAPH_AVAILABLE,
+                "timings": {
+                    "total_ms": round((time.perf_counter() - start) * 1000, 3),
+                    "nodes": timings
+                }
             }
             
         except Exception as e:
@@ -281,25 +393,62 @@ class ClaimProcessingAgent:
                 "confidence": 0.0,
                 "next_action": "manual_review",
                 "processed_at": datetime.now().isoformat(),
-                "langgraph_enabled": LANGGRAPH_AVAILABLE
+                "langgraph_enabled": LANGGRAPH_AVAILABLE,
+                "timings": {
+                    "total_ms": round((time.perf_counter() - start) * 1000, 3),
+                    "nodes": timings
+                }
             }
+        finally:
+            _node_timings.reset(token)
+            _record_metrics.reset(metrics_token)
     
-    async def _simple_claim_processing(self, state: ClaimState) -> Dict[str, Any]:
+    async def _simple_claim_processing(
+        self,
+        state: ClaimState,
+        on_node: Optional[NodeCallback] = None
+    ) -> Dict[str, Any]:
         """Simplified claim processing when LangGraph is not available"""
         
-        # Run all processing steps manually
-        state = await self._classify_claim(state)
-        state = await self._validate_documents(state)
-        state = await self._assess_risk(state)
-        state = await self._detect_fraud(state)
-        state = await self._generate_recommendations(state)
-        state = await self._finalize_analysis(state)
+        nodes = self._nodes()
+        
+        async def run_sequential(node_name):
+            nonlocal state
+            state = await nodes[node_name](state)
+            if on_node:
+                await on_node(node_name, state)
+        
+        async def run_parallel(node_name):
+            update = await nodes[node_name](state)
+            # Branches write disjoint keys, so merging on completion is race-free
+            state["analysis_results"] = merge_analysis_results(
+                state["analysis_results"], update["analysis_results"]
+            )
+            if on_node:
+                await on_node(node_name, state)
+        
+        await run_sequential("classify")
+        await asyncio.gather(*(run_parallel(node_name) for node_name in PARALLEL_NODES))
+        await run_sequential("generate_recommendations")
+        await run_sequential("finalize")
         
         return state
     
     async def classify_document(self, content: str, doc_type: str) -> Dict[str, Any]:
         """Classify and extract data from a document"""
         
+        # Simple classification based on content keywords (single pass)
+        classification = self.document_classifier.classify(content)
+        
+        return self.document_result(classification)
+    
+    def open_document_stream(self) -> ClassifierStream:
+        """Incremental classify_document: feed() text chunks, then document_result(stream.result())"""
+        return self.document_classifier.stream()
+    
+    def document_result(self, classification: str) -> Dict[str, Any]:
+        """Confidence and extracted data for a document classification"""
+        
         # Simulate document classification
         classifications = {
             "invoice": {"confidence": 0.92, "extracted_data": {"amount": "1500.00", "date": "2024-01-15"}},
@@ -308,17 +457,6 @@ class ClaimProcessingAgent:
             "medical": {"confidence": 0.90, "extracted_data": {"provider": "City Hospital", "diagnosis": "Minor injury"}}
         }
         
-        # Simple classification based on content keywords
-        classification = "unknown"
-        if "invoice" in content.lower() or "bill" in content.lower():
-            classification = "invoice"
-        elif "receipt" in content.lower():
-            classification = "receipt"
-        elif "report" in content.lower():
-            classification = "report"
-        elif "medical" in content.lower() or "hospital" in content.lower():
-            classification = "medical"
-        
         result = classifications.get(classification, {
             "confidence": 0.5,
             "extracted_data": {}
@@ -332,37 +470,55 @@ class ClaimProcessingAgent:
     
     async def detect_fraud(self, claim_data: Dict[str, Any]) -> Dict[str, Any]:
         """Run fraud detection on claim data"""
-        
-        fraud_score = 0.1
-        risk_factors = []
-        
-        # Example fraud detection rules
-        amount = claim_data.get("amount", 0)
-        description = claim_data.get("description", "").lower()
-        
-        if amount > 200000:
-            fraud_score += 0.3
-            risk_factors.append("Unusually high claim amount")
-        
-        if "total loss" in description and amount > 50000:
-            fraud_score += 0.2
-            risk_factors.append("High-value total loss claim")
-        
-        if "emergency" in description:
-            fraud_score += 0.1
-            risk_factors.append("Emergency claim - requires verification")
-        
-        # Determine recommendation
-        if fraud_score > 0.7:
-            recommendation = "reject"
-        elif fraud_score > 0.4:
-            recommendation = "investigate"
-        else:
-            recommendation = "approve"
-        
-        return {
-            "fraud_probability": min(fraud_score, 1.0),
-            "risk_factors": risk_factors,
-            "recommendation": recommendation,
-            "confidence": 0.85
-        }
\ No newline at end of file
+        return self.detect_fraud_batch([claim_data])[0]
+    
+    def detect_fraud_batch(self, claims: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Fraud checks for many claims in one vectorized rule evaluation"""
+        evaluation = self.rule_sets["fraud_check"].evaluate(claims)
+        
+        return [
+            {
+                "fraud_probability": min(fraud_score, 1.0),
+                "risk_factors": risk_factors,
+                "recommendation": recommendation,
+                "confidence": 0.85
+            }
+            for fraud_score, risk_factors, recommendation in zip(
+                evaluation.scores, evaluation.indicators, evaluation.labels
+            )
+        ]
+
+
+# system_settings keys that map onto agent config entries
+AGENT_SETTINGS = ["scoring_rules", "document_keywords"]
+
+async def load_agent_config(supabase) -> Optional[Dict[str, Any]]:
+    """Agent config overrides stored in system_settings, or None if there are none"""
+    response = await supabase.table('system_settings').select('setting_key, setting_value').in_('setting_key', AGENT_SETTINGS).execute()
+    config = {row['setting_key']: row['setting_value'] for row in response.data}
+    return config or None
+
+# Process-wide agent: the workflow is compiled once and shared by all requests
+_claim_agent: Optional[ClaimProcessingAgent] = None
+
+def init_claim_agent(config: Optional[Dict[str, Any]] = None) -> ClaimProcessingAgent:
+    """Build the shared agent if it does not exist yet (called at startup)"""
+    global _claim_agent
+    if _claim_agent is None:
+        _claim_agent = ClaimProcessingAgent(config)
+    return _claim_agent
+
+def reload_claim_agent(config: Optional[Dict[str, Any]] = None) -> ClaimProcessingAgent:
+    """Compile a workflow for new config and swap it in.
+
+    Requests already running keep the agent they started with; the swap is a
+    single reference assignment, so no locking is needed.
+    """
+    global _claim_agent
+    if _claim_agent is None or ClaimProcessingAgent._workflow_version(config or {}) != _claim_agent.version:
+        _claim_agent = ClaimProcessingAgent(config)
+    return _claim_agent
+
+def get_claim_agent() -> ClaimProcessingAgent:
+    """Dependency to get the shared claim processing agent"""
+    return _claim_agent or init_claim_agent()
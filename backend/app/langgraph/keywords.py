@@ -0,0 +1,120 @@
+# Multi-pattern keyword matching for document and claim text
+#
+# All keywords of a table are compiled into one regex, so each text is
+# lowercased once and scanned in a single pass instead of once per keyword.
+# Matches use a lookahead, which reports overlapping keywords too.
+
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+# Document categories in priority order: the first category with a hit wins
+DEFAULT_DOCUMENT_KEYWORDS: Dict[str, List[str]] = {
+    "invoice": ["invoice", "bill"],
+    "receipt": ["receipt"],
+    "report": ["report"],
+    "medical": ["medical", "hospital"]
+}
+
+
+class KeywordMatcher:
+    """Case-insensitive matcher for a fixed set of keywords"""
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = list(dict.fromkeys(keyword.lower() for keyword in keywords))
+        if not all(self.keywords):
+            raise ValueError("Keywords must be non-empty")
+
+        # Longest first, so a match at any position is the longest keyword there
+        alternatives = sorted(self.keywords, key=len, reverse=True)
+        self._pattern = re.compile("(?=(" + "|".join(map(re.escape, alternatives)) + "))") if alternatives else None
+
+        # Shorter keywords that are prefixes of a match start at the same position
+        self._prefixes = {
+            keyword: [other for other in self.keywords if other != keyword and keyword.startswith(other)]
+            for keyword in self.keywords
+        }
+
+    def iter_hits(self, text: str) -> Iterator[Tuple[int, str]]:
+        """Yield (position, keyword) hits in text order, positions in the lowercased text"""
+        if self._pattern is None or not text:
+            return
+        for match in self._pattern.finditer(text.lower()):
+            keyword = match.group(1)
+            yield match.start(), keyword
+            for prefix in self._prefixes[keyword]:
+                yield match.start(), prefix
+
+    def find_all(self, text: str) -> List[Tuple[int, str]]:
+        """Every (position, keyword) hit in text"""
+        return list(self.iter_hits(text))
+
+    def present(self, text: str) -> Set[str]:
+        """Keywords occurring anywhere in text, stopping once all are found"""
+        found: Set[str] = set()
+        for _, keyword in self.iter_hits(text):
+            found.add(keyword)
+            if len(found) == len(self.keywords):
+                break
+        return found
+
+
+class KeywordClassifier:
+    """Picks the first category, in table order, with any keyword in the text"""
+
+    def __init__(self, table: Dict[str, List[str]]):
+        self.categories = list(table)
+        self.matcher = KeywordMatcher(keyword for keywords in table.values() for keyword in keywords)
+        # Rank of the highest-priority category each keyword belongs to
+        self._rank: Dict[str, int] = {}
+        for rank, keywords in enumerate(table.values()):
+            for keyword in keywords:
+                self._rank.setdefault(keyword.lower(), rank)
+
+    def best_rank(self, text: str, best: Optional[int] = None) -> int:
+        """Lowest category rank with a hit in text, or len(categories) for none"""
+        best = len(self.categories) if best is None else best
+        for _, keyword in self.matcher.iter_hits(text):
+            best = min(best, self._rank[keyword])
+            if best == 0:
+                # Nothing can outrank the first category
+                break
+        return best
+
+    def category(self, rank: int, default: str = "unknown") -> str:
+        return self.categories[rank] if rank < len(self.categories) else default
+
+    def classify(self, text: str, default: str = "unknown") -> str:
+        return self.category(self.best_rank(text), default)
+
+    def stream(self) -> "ClassifierStream":
+        return ClassifierStream(self)
+
+
+class ClassifierStream:
+    """Incremental KeywordClassifier.classify over text arriving in chunks
+
+    Only the last (longest keyword - 1) characters are carried between chunks,
+    so memory stays constant however long the text is.
+    """
+
+    def __init__(self, classifier: KeywordClassifier):
+        self.classifier = classifier
+        self._overlap = max((len(keyword) for keyword in classifier.matcher.keywords), default=1) - 1
+        self._tail = ""
+        self._best = len(classifier.categories)
+
+    @property
+    def done(self) -> bool:
+        """True once the top category has matched and more text cannot change it"""
+        return self._best == 0
+
+    def feed(self, text: str):
+        if self.done or not text:
+            return
+        # Prepend the previous tail so keywords split across chunks still match
+        window = self._tail + text
+        self._best = self.classifier.best_rank(window, self._best)
+        self._tail = window[-self._overlap:] if self._overlap else ""
+
+    def result(self, default: str = "unknown") -> str:
+        return self.classifier.category(self._best, default)
@@ -0,0 +1,173 @@
+"""
+Buffered writer for ai_processing_logs.
+
+Request handlers hand entries to the writer without awaiting the database; a
+background task flushes them in bulk inserts once AI_LOG_BATCH_SIZE entries are
+waiting or every AI_LOG_FLUSH_INTERVAL seconds, and the app lifespan flushes
+whatever is left on shutdown. With AI_LOG_INPUT_MODE=hash the (large) input
+claim row is replaced by its SHA-256.
+
+If the database is unavailable the batch stays buffered for the next flush. If
+it rejects the rows (bad data, constraint violation), they are retried one by
+one and the ones still rejected are dropped and counted in `rejected`, so a
+single bad row cannot block logging.
+"""
+
+from app.database import get_supabase
+from postgrest import APIError
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+import asyncio
+import hashlib
+import json
+import os
+
+AI_LOG_BATCH_SIZE = int(os.getenv("AI_LOG_BATCH_SIZE", "500"))
+AI_LOG_FLUSH_INTERVAL = float(os.getenv("AI_LOG_FLUSH_INTERVAL", "1.0"))
+AI_LOG_MAX_BUFFER = int(os.getenv("AI_LOG_MAX_BUFFER", "50000"))
+AI_LOG_INPUT_MODE = os.getenv("AI_LOG_INPUT_MODE", "full")
+
+# SQLSTATE classes meaning the rows themselves are bad: 22 (data exception,
+# e.g. a malformed uuid) and 23 (constraint violation, e.g. an unknown claim_id)
+REJECTED_SQLSTATE_CLASSES = ("22", "23")
+
+# Bulk inserts need every row to carry the same keys
+LOG_COLUMNS = [
+    "id", "claim_id", "workflow_name", "node_name", "input_data", "output_data",
+    "execution_time", "status", "error_message", "processed_at"
+]
+
+
+def is_rejection(error: Exception) -> bool:
+    """Whether the database refused the rows, as opposed to being unavailable"""
+    return isinstance(error, APIError) and str(error.code or "")[:2] in REJECTED_SQLSTATE_CLASSES
+
+
+def input_hash(input_data: Any) -> Dict[str, str]:
+    """Stand-in for an input row when only its identity needs to be logged"""
+    payload = json.dumps(input_data, sort_keys=True, default=str)
+    return {"sha256": hashlib.sha256(payload.encode()).hexdigest()}
+
+
+class AILogWriter:
+    """Accumulates log entries in memory and writes them in bulk"""
+
+    def __init__(
+        self,
+        batch_size: int = AI_LOG_BATCH_SIZE,
+        flush_interval: float = AI_LOG_FLUSH_INTERVAL,
+        max_buffer: int = AI_LOG_MAX_BUFFER,
+        input_mode: str = AI_LOG_INPUT_MODE
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.input_mode = input_mode
+        self.dropped = 0
+        self.rejected = 0
+        self._buffer: List[Dict[str, Any]] = []
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def _prepare(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        row = {column: entry.get(column) for column in LOG_COLUMNS}
+        # Stamp now, not when the batch happens to be flushed
+        if row["processed_at"] in (None, "now()"):
+            row["processed_at"] = datetime.now(timezone.utc).isoformat()
+        if self.input_mode == "hash" and row["input_data"] is not None:
+            row["input_data"] = input_hash(row["input_data"])
+        return row
+
+    def _trim(self):
+        overflow = len(self._buffer) - self.max_buffer
+        if overflow > 0:
+            # Under sustained database failure drop the oldest entries
+            del self._buffer[:overflow]
+            self.dropped += overflow
+
+    def write(self, entries: Iterable[Dict[str, Any]]):
+        """Queue entries for the next flush; never blocks on the database"""
+        self._buffer.extend(self._prepare(entry) for entry in entries)
+        self._trim()
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    async def _insert(self, rows: List[Dict[str, Any]]):
+        await get_supabase().table('ai_processing_logs').insert(rows).execute()
+
+    async def _insert_each(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert a rejected batch row by row; returns the rows still to be written"""
+        for index, row in enumerate(batch):
+            try:
+                await self._insert([row])
+            except Exception as e:
+                if not is_rejection(e):
+                    # Lost the database part way through
+                    return batch[index:]
+                # Retrying this row can never succeed
+                self.rejected += 1
+                print(f"⚠️  Dropping AI log entry for claim {row.get('claim_id')}: {e}")
+        return []
+
+    async def flush(self):
+        """Insert everything buffered, batch_size rows per round-trip"""
+        async with self._flush_lock:
+            while self._buffer:
+                batch = self._buffer[:self.batch_size]
+                del self._buffer[:len(batch)]
+                try:
+                    await self._insert(batch)
+                    continue
+                except Exception as e:
+                    if is_rejection(e):
+                        # One bad row fails the whole insert
+                        unwritten = await self._insert_each(batch)
+                    else:
+                        print(f"⚠️  Failed to write {len(batch)} AI log entries: {e}")
+                        unwritten = batch
+                if unwritten:
+                    # Keep them for the next flush
+                    self._buffer[:0] = unwritten
+                    self._trim()
+                    break
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def start(self):
+        """Start the background flusher (called from the app lifespan)"""
+        if self._task is None:
+            # Bind the primitives to the running loop
+            self._wakeup = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and write out anything still buffered"""
+        if self._task is not None:
+            # Let an in-flight flush finish rather than cancelling it mid-insert
+            self._stopping = True
+            self._wakeup.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+
+ai_log_writer = AILogWriter()
+
+def get_ai_log_writer() -> AILogWriter:
+    """Dependency to get the AI log writer"""
+    return ai_log_writer
@@ -1,21 +1,38 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.security import HTTPBearer
 from contextlib import asynccontextmanager
-from app.database import init_db
+from app.database import init_db, close_db
 from app.routers import auth, user, claims, ai
+from app.langgraph.claim_agent import init_claim_agent
+from app.health import load_stored_agent_config, liveness, readiness
+from app.jobs import job_queue, AI_JOB_DRAIN_TIMEOUT
+from app.log_writer import ai_log_writer
+from app.metrics import REQUEST_LATENCY, render_metrics
+import asyncio
 import os
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup
+    # Startup never waits on the network: the database probe and the stored
+    # agent config load run in the background and /health/ready reports them
     await init_db()
+    # Compile the AI workflow once; requests share it
+    init_claim_agent()
+    config_loader = asyncio.create_task(load_stored_agent_config())
+    await ai_log_writer.start()
+    await job_queue.start()
     yield
-    # Shutdown
-    pass
+    # Shutdown: finish jobs, then write out their buffered logs
+    config_loader.cancel()
+    await job_queue.stop(drain_timeout=AI_JOB_DRAIN_TIMEOUT)
+    await ai_log_writer.stop()
+    await close_db()
 
 app = FastAPI(
     title="Insurance Claim System API",
@@ -33,6 +50,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Observe request latency per route template (not per concrete path)"""
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        REQUEST_LATENCY.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=str(status_code)
+        )
+
 # Security
 security = HTTPBearer()
 
@@ -51,9 +86,27 @@ async def root():
         "docs_url": "/docs"
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus scrape endpoint for this worker"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness: the worker is answering; never touches dependencies"""
+    return liveness()
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness: 200 when startup is done and the database, auth and AI
+    workflow probes pass, 503 otherwise; probes are cached per worker"""
+    report = await readiness()
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
+
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "message": "API is running correctly"}
+    """Same as /health/ready, for load balancers already pointed here"""
+    return await readiness_check()
 
 if __name__ == "__main__":
     import uvicorn
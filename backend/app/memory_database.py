@@ -0,0 +1,573 @@
+"""
+In-process stand-in for the Supabase client.
+
+Implements the subset of the PostgREST query builder and GoTrue auth API the
+routers use, backed by plain dictionaries. Selected with DATABASE_BACKEND=memory
+or injected through `app.dependency_overrides[get_supabase]` in tests.
+MEMORY_DB_LATENCY_MS (plus up to MEMORY_DB_JITTER_MS) is awaited on every
+query, RPC and auth lookup to stand in for the network round-trip.
+"""
+
+from postgrest import APIError
+from postgrest.base_request_builder import APIResponse, SingleAPIResponse
+from types import SimpleNamespace
+from typing import Any, AsyncIterable, Dict, List, Optional
+from datetime import datetime, timezone
+import asyncio
+import copy
+import os
+import random
+import secrets
+import uuid
+
+MEMORY_DB_LATENCY_MS = float(os.getenv("MEMORY_DB_LATENCY_MS", "0"))
+MEMORY_DB_JITTER_MS = float(os.getenv("MEMORY_DB_JITTER_MS", "0"))
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _comparable(value: Any) -> Any:
+    """Normalise values so numbers and ISO strings compare like Postgres would"""
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    return str(value)
+
+
+_OPERATORS = {
+    "eq": lambda v, x: _comparable(v) == _comparable(x),
+    "neq": lambda v, x: _comparable(v) != _comparable(x),
+    "gt": lambda v, x: v is not None and _comparable(v) > _comparable(x),
+    "gte": lambda v, x: v is not None and _comparable(v) >= _comparable(x),
+    "lt": lambda v, x: v is not None and _comparable(v) < _comparable(x),
+    "lte": lambda v, x: v is not None and _comparable(v) <= _comparable(x),
+    "is": lambda v, x: v is None if x == "null" else str(v).lower() == x,
+}
+
+
+def _split_terms(expression: str) -> List[str]:
+    """Split a PostgREST logic expression on top-level commas"""
+    terms, depth, quoted, current = [], 0, False, ""
+    for char in expression:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            terms.append(current)
+            current = ""
+            continue
+        current += char
+    if current:
+        terms.append(current)
+    return terms
+
+
+def _parse_logic(expression: str, combine=any):
+    """Compile `col.op.value,and(...),or(...)` into a row predicate"""
+    predicates = []
+    for term in _split_terms(expression):
+        term = term.strip()
+        for name, nested in (("and(", all), ("or(", any)):
+            if term.startswith(name) and term.endswith(")"):
+                predicates.append(_parse_logic(term[len(name):-1], nested))
+                break
+        else:
+            column, operator, value = term.split(".", 2)
+            if len(value) >= 2 and value[0] == value[-1] == '"':
+                value = value[1:-1]
+            compare = _OPERATORS[operator]
+            predicates.append(lambda row, c=column, x=value, op=compare: op(row.get(c), x))
+    return lambda row: combine(predicate(row) for predicate in predicates)
+
+
+class MemoryQuery:
+    """Chainable query mirroring postgrest's async request builders"""
+
+    def __init__(self, store: "MemoryClient", table: str):
+        self._store = store
+        self._table = table
+        self._operation = "select"
+        self._columns = "*"
+        self._count = None
+        self._payload = None
+        self._upsert_key = None
+        self._filters = []
+        self._orders = []
+        self._limit = None
+        self._offset = 0
+        self._single = False
+        self._maybe_single = False
+
+    # Operations
+
+    def select(self, *columns: str, count: Optional[str] = None) -> "MemoryQuery":
+        self._operation = "select"
+        self._columns = ",".join(columns) if columns else "*"
+        self._count = count
+        return self
+
+    def insert(self, json: Any, *, count: Optional[str] = None, upsert: bool = False, **kwargs) -> "MemoryQuery":
+        self._operation = "upsert" if upsert else "insert"
+        self._payload = json
+        self._count = count
+        return self
+
+    def upsert(self, json: Any, *, on_conflict: str = "id", count: Optional[str] = None, **kwargs) -> "MemoryQuery":
+        self._operation = "upsert"
+        self._payload = json
+        self._upsert_key = on_conflict or "id"
+        self._count = count
+        return self
+
+    def update(self, json: Dict[str, Any], *, count: Optional[str] = None, **kwargs) -> "MemoryQuery":
+        self._operation = "update"
+        self._payload = json
+        self._count = count
+        return self
+
+    def delete(self, *, count: Optional[str] = None, **kwargs) -> "MemoryQuery":
+        self._operation = "delete"
+        self._count = count
+        return self
+
+    # Filters
+
+    def _filter(self, column: str, predicate) -> "MemoryQuery":
+        self._filters.append(lambda row: predicate(row.get(column)))
+        return self
+
+    def eq(self, column: str, value: Any) -> "MemoryQuery":
+        return self._filter(column, lambda v: _comparable(v) == _comparable(value))
+
+    def neq(self, column: str, value: Any) -> "MemoryQuery":
+        return self._filter(column, lambda v: _comparable(v) != _comparable(value))
+
+    def gt(self, column: str, value: Any) -> "MemoryQuery":
+        return self._filter(column, lambda v: v is not None and _comparable(v) > _comparable(value))
+
+    def gte(self, column: str, value: Any) -> "MemoryQuery":
+        return self._filter(column, lambda v: v is not None and _comparable(v) >= _comparable(value))
+
+    def lt(self, column: str, value: Any) -> "MemoryQuery":
+        return self._filter(column, lambda v: v is not None and _comparable(v) < _comparable(value))
+
+    def lte(self, column: str, value: Any) -> "MemoryQuery":
+        return self._filter(column, lambda v: v is not None and _comparable(v) <= _comparable(value))
+
+    def in_(self, column: str, values: List[Any]) -> "MemoryQuery":
+        allowed = {_comparable(value) for value in values}
+        return self._filter(column, lambda v: _comparable(v) in allowed)
+
+    def is_(self, column: str, value: Any) -> "MemoryQuery":
+        expected = None if value in (None, "null") else value
+        return self._filter(column, lambda v: v is expected or v == expected)
+
+    def or_(self, filters: str, reference_table: Optional[str] = None) -> "MemoryQuery":
+        self._filters.append(_parse_logic(filters))
+        return self
+
+    # Modifiers
+
+    def order(self, column: str, *, desc: bool = False, nullsfirst: bool = False, **kwargs) -> "MemoryQuery":
+        self._orders.append((column, desc))
+        return self
+
+    def limit(self, size: int, **kwargs) -> "MemoryQuery":
+        self._limit = size
+        return self
+
+    def range(self, start: int, end: int, **kwargs) -> "MemoryQuery":
+        self._offset = start
+        self._limit = end - start + 1
+        return self
+
+    def single(self) -> "MemoryQuery":
+        self._single = True
+        return self
+
+    def maybe_single(self) -> "MemoryQuery":
+        self._maybe_single = True
+        return self
+
+    # Execution
+
+    def _matches(self, row: Dict[str, Any]) -> bool:
+        return all(predicate(row) for predicate in self._filters)
+
+    def _project(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        columns = [c.strip() for c in self._columns.split(",") if c.strip()]
+        if "*" in columns:
+            return copy.deepcopy(row)
+        return {c: copy.deepcopy(row.get(c)) for c in columns}
+
+    def _sorted(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Apply sort keys last-to-first so the first order() call wins
+        for column, desc in reversed(self._orders):
+            present = [r for r in rows if r.get(column) is not None]
+            missing = [r for r in rows if r.get(column) is None]
+            present.sort(key=lambda r: _comparable(r.get(column)), reverse=desc)
+            rows = present + missing
+        return rows
+
+    def _window(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if self._limit is None:
+            return rows[self._offset:]
+        return rows[self._offset:self._offset + self._limit]
+
+    def _prepare(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        row = {k: (_now() if v == "now()" else v) for k, v in copy.deepcopy(record).items()}
+        row.setdefault("id", str(uuid.uuid4()))
+        row.setdefault("created_at", _now())
+        return row
+
+    def _run(self) -> APIResponse:
+        if self._table in self._store.views:
+            if self._operation != "select":
+                raise APIError({"message": f"cannot {self._operation} view \"{self._table}\"", "code": "55000"})
+            rows = self._store.views[self._table](self._store)
+        else:
+            rows = self._store.tables.setdefault(self._table, [])
+
+        if self._operation in ("insert", "upsert"):
+            records = self._payload if isinstance(self._payload, list) else [self._payload]
+            written = []
+            key = self._upsert_key or "id"
+            for record in records:
+                existing = next(
+                    (r for r in rows if self._operation == "upsert" and key in record and r.get(key) == record[key]),
+                    None
+                )
+                if existing is not None:
+                    existing.update({k: (_now() if v == "now()" else v) for k, v in copy.deepcopy(record).items()})
+                    written.append(copy.deepcopy(existing))
+                    continue
+                row = self._prepare(record)
+                rows.append(row)
+                written.append(copy.deepcopy(row))
+            return APIResponse(data=written, count=len(written) if self._count else None)
+
+        matched = [r for r in rows if self._matches(r)]
+
+        if self._operation == "update":
+            changes = {k: (_now() if v == "now()" else v) for k, v in copy.deepcopy(self._payload).items()}
+            for row in matched:
+                row.update(changes)
+            return APIResponse(data=copy.deepcopy(matched), count=len(matched) if self._count else None)
+
+        if self._operation == "delete":
+            self._store.tables[self._table] = [r for r in rows if not self._matches(r)]
+            return APIResponse(data=copy.deepcopy(matched), count=len(matched) if self._count else None)
+
+        total = len(matched)
+        data = [self._project(r) for r in self._window(self._sorted(matched))]
+
+        if self._single or self._maybe_single:
+            if len(data) > 1 or (self._single and not data):
+                raise APIError({
+                    "message": "JSON object requested, multiple (or no) rows returned",
+                    "code": "PGRST116",
+                    "hint": None,
+                    "details": f"The result contains {len(data)} rows"
+                })
+            return SingleAPIResponse[Optional[Dict[str, Any]]](
+                data=data[0] if data else None,
+                count=total if self._count else None
+            )
+
+        return APIResponse(data=data, count=total if self._count else None)
+
+    async def execute(self) -> APIResponse:
+        await self._store.round_trip()
+        return self._run()
+
+
+class MemoryRPC:
+    """Call to a Python implementation of a Postgres function. Every function
+    here is declared RETURNS SETOF in SQL, so like PostgREST the result is
+    always a list of rows"""
+
+    def __init__(self, store: "MemoryClient", fn: str, params: Dict[str, Any]):
+        self._store = store
+        self._fn = fn
+        self._params = params
+
+    async def execute(self) -> APIResponse:
+        await self._store.round_trip()
+        if self._fn not in self._store.functions:
+            raise APIError({"message": f"Could not find the function public.{self._fn}", "code": "PGRST202"})
+        return APIResponse[Any](data=self._store.functions[self._fn](self._store, copy.deepcopy(self._params)))
+
+
+def _bulk_update_ai_analysis(store: "MemoryClient", params: Dict[str, Any]) -> List[str]:
+    """Mirror of public.bulk_update_ai_analysis in database_setup.sql"""
+    results = params.get("results") or {}
+    updated = []
+    for row in store.tables.get("claims", []):
+        if row.get("id") in results:
+            row["ai_analysis"] = results[row["id"]]
+            row["updated_at"] = _now()
+            updated.append(row["id"])
+    return updated
+
+
+def _insert_claim(store: "MemoryClient", claim: Dict[str, Any], submitted_by: str, action: str) -> Dict[str, Any]:
+    """Insert a submitted claim and its first history entry"""
+    now = _now()
+    row = {
+        "id": claim.get("id") or str(uuid.uuid4()),
+        "user_id": claim.get("user_id") or submitted_by,
+        # As the set_claim_number trigger does
+        "claim_number": f"CLM-{datetime.now().strftime('%Y%m%d')}-{str(uuid.uuid4())[:8].upper()}",
+        "type": claim.get("type"),
+        "status": "submitted",
+        "priority": claim.get("priority") or "medium",
+        "amount": claim.get("amount"),
+        "description": claim.get("description"),
+        "incident_date": claim.get("incident_date"),
+        "submitted_date": now,
+        "metadata": claim.get("metadata") or {},
+        "ai_analysis": {},
+        "assigned_to": None,
+        "assigned_at": None,
+        "created_at": now,
+        "updated_at": now
+    }
+    store.tables.setdefault("claims", []).append(row)
+    store.tables.setdefault("claim_history", []).append({
+        "id": str(uuid.uuid4()),
+        "claim_id": row["id"],
+        "action": action,
+        "previous_status": None,
+        "new_status": row["status"],
+        "notes": None,
+        "performed_by": submitted_by,
+        "performed_at": now
+    })
+    return row
+
+
+def _create_claim_with_history(store: "MemoryClient", params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Mirror of public.create_claim_with_history in database_setup.sql"""
+    # The SQL function ignores any id / owner in the payload
+    claim = {**(params.get("claim") or {}), "id": None, "user_id": None}
+    row = _insert_claim(store, claim, params.get("submitted_by"), "Claim submitted")
+    return [copy.deepcopy(row)]
+
+
+def _bulk_create_claims_with_history(store: "MemoryClient", params: Dict[str, Any]) -> List[str]:
+    """Mirror of public.bulk_create_claims_with_history in database_setup.sql"""
+    claim_rows = params.get("claim_rows") or []
+    existing = {row.get("id") for row in store.tables.get("claims", [])}
+    duplicates = [claim["id"] for claim in claim_rows if claim.get("id") in existing]
+    if duplicates:
+        # All-or-nothing, like the single INSERT statement
+        raise APIError({"message": "duplicate key value violates unique constraint \"claims_pkey\"", "code": "23505"})
+    return [
+        _insert_claim(store, claim, params.get("submitted_by"), "Claim imported")["id"]
+        for claim in claim_rows
+    ]
+
+
+_PRIORITY_RANK = {"urgent": 0, "high": 1, "medium": 2, "low": 3}
+_NEXT_ACTION_RANK = {"investigate": 0, "manual_review": 1, "standard_review": 2, "auto_approve": 4}
+
+
+def _claim_work_queue(store: "MemoryClient", params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Mirror of public.claim_work_queue in database_setup.sql"""
+    now = datetime.now(timezone.utc)
+    cutoff = now.timestamp() - params.get("lease_seconds", 0)
+    claim_types = params.get("claim_types")
+
+    def available(row):
+        if row.get("status") not in ("submitted", "under_review"):
+            return False
+        if claim_types is not None and row.get("type") not in claim_types:
+            return False
+        assigned_at = row.get("assigned_at")
+        return row.get("assigned_to") is None or (
+            assigned_at is not None and datetime.fromisoformat(assigned_at).timestamp() < cutoff
+        )
+
+    queue = sorted(
+        (row for row in store.tables.get("claims", []) if available(row)),
+        key=lambda row: (
+            _PRIORITY_RANK.get(row.get("priority"), 4),
+            _NEXT_ACTION_RANK.get((row.get("ai_analysis") or {}).get("next_action"), 3),
+            row.get("submitted_date") or ""
+        )
+    )[:params.get("max_claims", 1)]
+
+    for row in queue:
+        row["assigned_to"] = params.get("agent_id")
+        row["assigned_at"] = now.isoformat()
+    return copy.deepcopy(queue)
+
+
+MEMORY_FUNCTIONS = {
+    "bulk_update_ai_analysis": _bulk_update_ai_analysis,
+    "create_claim_with_history": _create_claim_with_history,
+    "bulk_create_claims_with_history": _bulk_create_claims_with_history,
+    "claim_work_queue": _claim_work_queue
+}
+
+
+def _claims_rollup(store: "MemoryClient") -> List[Dict[str, Any]]:
+    """What the claims_rollup triggers in database_setup.sql maintain"""
+    groups: Dict[tuple, Dict[str, Any]] = {}
+    for claim in store.tables.get("claims", []):
+        key = (claim.get("status"), claim.get("type"), claim.get("priority") or "none")
+        group = groups.setdefault(key, {
+            "status": key[0], "type": key[1], "priority": key[2],
+            "claim_count": 0, "total_amount": 0.0
+        })
+        group["claim_count"] += 1
+        group["total_amount"] += float(claim.get("amount") or 0)
+    return list(groups.values())
+
+
+# Tables the database keeps up to date itself, computed on read here
+MEMORY_VIEWS = {
+    "claims_rollup": _claims_rollup
+}
+
+
+class MemoryAdminAuth:
+    """Admin half of the auth stand-in"""
+
+    def __init__(self, auth: "MemoryAuth"):
+        self._auth = auth
+
+    async def create_user(self, attributes: Dict[str, Any]):
+        user = SimpleNamespace(
+            id=str(uuid.uuid4()),
+            email=attributes.get("email"),
+            user_metadata=attributes.get("user_metadata", {}),
+            created_at=_now()
+        )
+        self._auth.users[user.id] = user
+        self._auth.passwords[user.email] = (attributes.get("password"), user.id)
+        return SimpleNamespace(user=user)
+
+    async def delete_user(self, id: str) -> None:
+        user = self._auth.users.pop(id, None)
+        if user is not None:
+            self._auth.passwords.pop(user.email, None)
+        self._auth.tokens = {t: uid for t, uid in self._auth.tokens.items() if uid != id}
+
+
+class MemoryAuth:
+    """GoTrue stand-in issuing opaque tokens for in-memory users"""
+
+    def __init__(self, round_trip=None):
+        self.users: Dict[str, SimpleNamespace] = {}
+        self.passwords: Dict[str, tuple] = {}
+        self.tokens: Dict[str, str] = {}
+        self.refresh_tokens: Dict[str, str] = {}
+        self.admin = MemoryAdminAuth(self)
+        self._round_trip = round_trip
+
+    def issue_token(self, user_id: str) -> str:
+        """Mint an access token for a user (handy for seeding tests)"""
+        token = secrets.token_urlsafe(24)
+        self.tokens[token] = user_id
+        return token
+
+    def _session(self, user_id: str) -> SimpleNamespace:
+        refresh_token = secrets.token_urlsafe(24)
+        self.refresh_tokens[refresh_token] = user_id
+        return SimpleNamespace(access_token=self.issue_token(user_id), refresh_token=refresh_token)
+
+    async def get_user(self, jwt: Optional[str] = None):
+        if self._round_trip:
+            await self._round_trip()
+        user_id = self.tokens.get(jwt)
+        return SimpleNamespace(user=self.users.get(user_id) if user_id else None)
+
+    async def sign_in_with_password(self, credentials: Dict[str, Any]):
+        password, user_id = self.passwords.get(credentials.get("email"), (None, None))
+        if user_id is None or password != credentials.get("password"):
+            raise APIError({"message": "Invalid login credentials", "code": "400"})
+        return SimpleNamespace(user=self.users[user_id], session=self._session(user_id))
+
+    async def refresh_session(self, refresh_token: Optional[str] = None):
+        user_id = self.refresh_tokens.pop(refresh_token, None)
+        if user_id is None:
+            return SimpleNamespace(user=None, session=None)
+        return SimpleNamespace(user=self.users.get(user_id), session=self._session(user_id))
+
+    async def sign_out(self) -> None:
+        return None
+
+
+class MemoryBucket:
+    """Subset of storage3's bucket proxy"""
+
+    def __init__(self, storage: "MemoryStorage", bucket: str):
+        self._storage = storage
+        self._bucket = bucket
+
+    async def remove(self, paths: List[str]) -> List[Dict[str, Any]]:
+        removed = [path for path in paths if self._storage.objects.pop((self._bucket, path), None) is not None]
+        return [{"name": path} for path in removed]
+
+
+class MemoryStorage:
+    """Object storage stand-in keyed by (bucket, path)"""
+
+    def __init__(self):
+        self.objects: Dict[tuple, bytes] = {}
+
+    def from_(self, bucket: str) -> MemoryBucket:
+        return MemoryBucket(self, bucket)
+
+    async def upload_stream(self, bucket: str, path: str, chunks: AsyncIterable[bytes], content_type: str):
+        if (bucket, path) in self.objects:
+            raise APIError({"message": "The resource already exists", "code": "409"})
+        body = bytearray()
+        async for chunk in chunks:
+            body.extend(chunk)
+        self.objects[(bucket, path)] = bytes(body)
+
+
+class MemoryClient:
+    """Drop-in replacement for app.database.AsyncClient holding rows in memory"""
+
+    def __init__(
+        self,
+        tables: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+        latency_ms: float = MEMORY_DB_LATENCY_MS,
+        jitter_ms: float = MEMORY_DB_JITTER_MS
+    ):
+        self.tables: Dict[str, List[Dict[str, Any]]] = copy.deepcopy(tables) if tables else {}
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.round_trips = 0
+        self.auth = MemoryAuth(self.round_trip)
+        self.storage = MemoryStorage()
+        self.functions = dict(MEMORY_FUNCTIONS)
+        self.views = dict(MEMORY_VIEWS)
+
+    async def round_trip(self):
+        """Simulated network delay of one request to the database"""
+        self.round_trips += 1
+        delay = self.latency_ms + (random.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+
+    def table(self, table_name: str) -> MemoryQuery:
+        return MemoryQuery(self, table_name)
+
+    def rpc(self, fn: str, params: Dict[str, Any]) -> MemoryRPC:
+        return MemoryRPC(self, fn, params)
+
+    async def ping_auth(self) -> None:
+        await self.round_trip()
+
+    async def aclose(self) -> None:
+        return None
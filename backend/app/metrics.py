@@ -0,0 +1,106 @@
+"""
+In-process latency metrics in Prometheus text format.
+
+Histograms are kept per worker process and served from GET /metrics; point
+Prometheus at every worker (or aggregate with sum by (le) across instances).
+No client library is needed for the handful of series we export.
+"""
+
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+import math
+import threading
+import time
+
+# Seconds; spans fast cache hits up to slow model calls
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Histogram:
+    """Cumulative-bucket histogram with a fixed label set"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str], buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            # Per-bucket counts, then +Inf count and sum
+            series = self._series.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0])
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+
+        for key, series in sorted(snapshot.items()):
+            labels = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key))
+            prefix = f"{labels}," if labels else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else repr(bound)
+                lines.append(f'{self.name}_bucket{{{prefix}le="{le}"}} {cumulative}')
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+            lines.append(f"{self.name}_sum{suffix} {series[-1]}")
+        return lines
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"]
+)
+
+AUTH_LATENCY = Histogram(
+    "auth_verify_duration_seconds",
+    "Bearer token verification latency (local JWT check or auth server round-trip)",
+    ["method"]
+)
+
+SUPABASE_LATENCY = Histogram(
+    "supabase_request_duration_seconds",
+    "Supabase API call latency",
+    ["service", "method", "resource", "status"]
+)
+
+NODE_LATENCY = Histogram(
+    "workflow_node_duration_seconds",
+    "Claim workflow node execution time",
+    ["node"]
+)
+
+REGISTRY = [REQUEST_LATENCY, AUTH_LATENCY, SUPABASE_LATENCY, NODE_LATENCY]
+
+
+def render_metrics() -> str:
+    """All metrics in Prometheus text exposition format"""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -1,10 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from supabase import Client
-from app.database import get_supabase
-from app.routers.user import get_current_user
-from app.langgraph.claim_agent import ClaimProcessingAgent
-from pydantic import BaseModel
-from typing import Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from app.database import get_supabase, AsyncClient
+from app.routers.user import get_current_user, require_agent
+from fastapi.responses import StreamingResponse
+from app.langgraph.claim_agent import ClaimProcessingAgent, AI_CLAIM_COLUMNS, get_claim_agent, node_result
+from app.batch_processing import process_claims_batch, store_results, build_log_entries, AI_BATCH_CONCURRENCY
+from app.jobs import JobQueue, QueueFullError, get_job_queue
+from app.log_writer import ai_log_writer
+from app.analysis_cache import cached_process_claim, cached_detect_fraud
+from app.entity_cache import invalidate_claims
+from app.documents import (
+    DOCUMENT_BUCKET, InvalidUploadError, UploadTooLargeError, stream_document
+)
+from pydantic import BaseModel, Field
+from typing import Dict, Any, AsyncIterator, List, Optional
+import asyncio
+import json
 import uuid
 
 router = APIRouter()
@@ -27,22 +37,64 @@ class DocumentClassificationResponse(BaseModel):
     confidence: float
     extracted_data: Dict[str, Any]
 
+class DocumentUploadResponse(DocumentClassificationResponse):
+    document_id: str
+    claim_id: str
+    file_name: str
+    file_path: str
+    file_type: str
+    file_size: int
+
 class FraudCheckResponse(BaseModel):
     claim_id: str
     fraud_probability: float
     risk_factors: list
     recommendation: str
 
+class AIJobResponse(BaseModel):
+    id: str
+    claim_id: str
+    status: str
+    nodes: Dict[str, str]
+    progress: float
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+
+class BatchProcessRequest(BaseModel):
+    claim_ids: Optional[List[str]] = None
+    status: Optional[str] = None
+    type: Optional[str] = None
+    limit: int = Field(100, ge=1, le=1000)
+    concurrency: int = Field(AI_BATCH_CONCURRENCY, ge=1, le=64)
+
+class BatchClaimResult(BaseModel):
+    claim_id: str
+    status: str
+    next_action: Optional[str] = None
+    confidence: float = 0.0
+    error: Optional[str] = None
+
+class BatchProcessResponse(BaseModel):
+    processed: int
+    succeeded: int
+    failed: int
+    results: List[BatchClaimResult]
+
 @router.post("/process-claim/{claim_id}", response_model=AIAnalysisResponse)
 async def process_claim_with_ai(
     claim_id: str,
     current_user=Depends(get_current_user),
-    supabase: Client = Depends(get_supabase)
+    supabase: AsyncClient = Depends(get_supabase),
+    agent: ClaimProcessingAgent = Depends(get_claim_agent)
 ):
     """Process a claim using AI workflows"""
+    claim_data = None
     try:
         # Verify claim belongs to user
-        claim_response = supabase.table('claims').select('*').eq('id', claim_id).eq('user_id', current_user.id).single().execute()
+        claim_response = await supabase.table('claims').select(AI_CLAIM_COLUMNS).eq('id', claim_id).eq('user_id', current_user.id).single().execute()
         
         if not claim_response.data:
             raise HTTPException(
@@ -52,11 +104,8 @@ async def process_claim_with_ai(
         
         claim_data = claim_response.data
         
-        # Initialize AI agent
-        agent = ClaimProcessingAgent()
-        
         # Process claim through AI workflow
-        ai_result = await agent.process_claim(claim_data)
+        ai_result = await cached_process_claim(agent, claim_data)
         
         # Update claim with AI analysis
         update_data = {
@@ -64,21 +113,11 @@ async def process_claim_with_ai(
             "updated_at": "now()"
         }
         
-        supabase.table('claims').update(update_data).eq('id', claim_id).execute()
+        await supabase.table('claims').update(update_data).eq('id', claim_id).execute()
+        await invalidate_claims([claim_id])
         
-        # Log AI processing
-        log_entry = {
-            "id": str(uuid.uuid4()),
-            "claim_id": claim_id,
-            "workflow_name": "claim_processing",
-            "node_name": "full_analysis",
-            "input_data": claim_data,
-            "output_data": ai_result,
-            "status": "success",
-            "processed_at": "now()"
-        }
-        
-        supabase.table('ai_processing_logs').insert(log_entry).execute()
+        # Log AI processing, with per-node execution times (written in the background)
+        ai_log_writer.write(build_log_entries(claim_data, ai_result))
         
         return AIAnalysisResponse(
             claim_id=claim_id,
@@ -90,34 +129,198 @@ async def process_claim_with_ai(
     except HTTPException:
         raise
     except Exception as e:
-        # Log error
-        error_log = {
-            "id": str(uuid.uuid4()),
-            "claim_id": claim_id,
-            "workflow_name": "claim_processing",
-            "node_name": "full_analysis",
-            "status": "error",
-            "error_message": str(e),
-            "processed_at": "now()"
-        }
+        # Log error, unless the claim never loaded (unknown or malformed id):
+        # the row would only be rejected by the claim_id foreign key
+        if claim_data is not None:
+            error_log = {
+                "id": str(uuid.uuid4()),
+                "claim_id": claim_id,
+                "workflow_name": "claim_processing",
+                "node_name": "full_analysis",
+                "status": "error",
+                "error_message": str(e),
+                "processed_at": "now()"
+            }
+            
+            ai_log_writer.write([error_log])
         
-        supabase.table('ai_processing_logs').insert(error_log).execute()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"AI processing failed: {str(e)}"
+        )
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+async def _workflow_events(
+    supabase: AsyncClient,
+    agent: ClaimProcessingAgent,
+    claim_data: Dict[str, Any]
+) -> AsyncIterator[str]:
+    """Run the workflow, yielding an SSE event as each node finishes
+    
+    If the client goes away the generator is closed, which cancels the run
+    and skips storing a partial result.
+    """
+    progress: asyncio.Queue = asyncio.Queue()
+    
+    async def on_node(node_name, state):
+        await progress.put((node_name, node_result(node_name, state)))
+    
+    run = asyncio.create_task(cached_process_claim(agent, claim_data, on_node=on_node))
+    run.add_done_callback(lambda _: progress.put_nowait(None))
+    
+    try:
+        while (item := await progress.get()) is not None:
+            node_name, result = item
+            yield _sse("node", {"node": node_name, "result": result})
+        
+        ai_result = run.result()
+        await store_results(supabase, [(claim_data, ai_result)])
         
+        if "error" in ai_result:
+            yield _sse("error", {"claim_id": claim_data["id"], "error": ai_result["error"]})
+        else:
+            yield _sse("complete", AIAnalysisResponse(
+                claim_id=claim_data["id"],
+                analysis=ai_result.get('analysis', {}),
+                confidence=ai_result.get('confidence', 0.0),
+                recommendations=ai_result.get('recommendations', [])
+            ).model_dump())
+    finally:
+        if not run.done():
+            run.cancel()
+            await asyncio.gather(run, return_exceptions=True)
+
+@router.post("/process-claim/{claim_id}/stream")
+async def process_claim_with_ai_stream(
+    claim_id: str,
+    current_user=Depends(get_current_user),
+    supabase: AsyncClient = Depends(get_supabase),
+    agent: ClaimProcessingAgent = Depends(get_claim_agent)
+):
+    """Process a claim, streaming each workflow node's result as server-sent events
+    
+    Emits a `node` event per finished node, then `complete` (or `error`).
+    Disconnecting cancels the nodes that have not run yet.
+    """
+    try:
+        # Verify claim belongs to user
+        claim_response = await supabase.table('claims').select(AI_CLAIM_COLUMNS).eq('id', claim_id).eq('user_id', current_user.id).execute()
+    except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"AI processing failed: {str(e)}"
         )
+    
+    if not claim_response.data:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Claim not found"
+        )
+    
+    return StreamingResponse(
+        _workflow_events(supabase, agent, claim_response.data[0]),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/jobs", response_model=AIJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def enqueue_ai_job(
+    request: AIProcessRequest,
+    current_user=Depends(get_current_user),
+    supabase: AsyncClient = Depends(get_supabase),
+    jobs: JobQueue = Depends(get_job_queue)
+):
+    """Queue a claim for AI processing and return immediately with a job id"""
+    try:
+        # Verify claim belongs to user
+        claim_response = await supabase.table('claims').select(AI_CLAIM_COLUMNS).eq('id', request.claim_id).eq('user_id', current_user.id).single().execute()
+        
+        if not claim_response.data:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Claim not found"
+            )
+        
+        job = await jobs.enqueue(claim_response.data, current_user.id)
+        
+        return AIJobResponse(**job)
+        
+    except HTTPException:
+        raise
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to queue AI processing: {str(e)}"
+        )
+
+@router.get("/jobs/{job_id}", response_model=AIJobResponse)
+async def get_ai_job(
+    job_id: str,
+    current_user=Depends(get_current_user),
+    jobs: JobQueue = Depends(get_job_queue)
+):
+    """Get status and per-node progress of a queued AI job"""
+    job = await jobs.get(job_id)
+    
+    if not job or job.get('user_id') != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    
+    return AIJobResponse(**job)
+
+@router.post("/process-claims/batch", response_model=BatchProcessResponse)
+async def process_claims_batch_with_ai(
+    request: BatchProcessRequest,
+    current_user=Depends(require_agent),
+    supabase: AsyncClient = Depends(get_supabase),
+    agent: ClaimProcessingAgent = Depends(get_claim_agent)
+):
+    """Process many claims (by id list and/or filter) using AI workflows"""
+    if not request.claim_ids and not request.status and not request.type:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide claim_ids or at least one filter"
+        )
+    
+    try:
+        summary = await process_claims_batch(
+            supabase,
+            agent,
+            claim_ids=request.claim_ids,
+            status=request.status,
+            claim_type=request.type,
+            limit=request.limit,
+            concurrency=request.concurrency
+        )
+        
+        return BatchProcessResponse(**summary)
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Batch AI processing failed: {str(e)}"
+        )
 
 @router.get("/analysis/{claim_id}", response_model=AIAnalysisResponse)
 async def get_ai_analysis(
     claim_id: str,
     current_user=Depends(get_current_user),
-    supabase: Client = Depends(get_supabase)
+    supabase: AsyncClient = Depends(get_supabase)
 ):
     """Get existing AI analysis for a claim"""
     try:
         # Verify claim belongs to user and get AI analysis
-        response = supabase.table('claims').select('id, ai_analysis').eq('id', claim_id).eq('user_id', current_user.id).single().execute()
+        response = await supabase.table('claims').select('id, ai_analysis').eq('id', claim_id).eq('user_id', current_user.id).single().execute()
         
         if not response.data:
             raise HTTPException(
@@ -151,13 +354,11 @@ async def get_ai_analysis(
 @router.post("/classify-document", response_model=DocumentClassificationResponse)
 async def classify_document(
     request: DocumentClassificationRequest,
-    current_user=Depends(get_current_user)
+    current_user=Depends(get_current_user),
+    agent: ClaimProcessingAgent = Depends(get_claim_agent)
 ):
     """Classify and extract data from a document"""
     try:
-        # Initialize AI agent
-        agent = ClaimProcessingAgent()
-        
         # Classify document
         classification_result = await agent.classify_document(
             request.document_content,
@@ -176,16 +377,86 @@ async def classify_document(
             detail=f"Document classification failed: {str(e)}"
         )
 
+@router.post("/classify-document/upload", response_model=DocumentUploadResponse)
+async def upload_and_classify_document(
+    request: Request,
+    claim_id: str = Query(...),
+    current_user=Depends(get_current_user),
+    supabase: AsyncClient = Depends(get_supabase),
+    agent: ClaimProcessingAgent = Depends(get_claim_agent)
+):
+    """Stream a multipart file upload into claim storage, classifying it on the way
+    
+    The body is read incrementally, so the file is never held in memory whole.
+    """
+    try:
+        # Verify claim belongs to user
+        claim_response = await supabase.table('claims').select('id').eq('id', claim_id).eq('user_id', current_user.id).execute()
+        
+        if not claim_response.data:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Claim not found"
+            )
+        
+        classifier = agent.open_document_stream()
+        try:
+            stored = await stream_document(
+                supabase,
+                request.stream(),
+                request.headers.get('content-type', ''),
+                current_user.id,
+                claim_id,
+                classifier
+            )
+        except InvalidUploadError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        except UploadTooLargeError as e:
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+        
+        document = {
+            "id": str(uuid.uuid4()),
+            "claim_id": claim_id,
+            **stored
+        }
+        
+        try:
+            await supabase.table('claim_documents').insert(document).execute()
+        except Exception:
+            # Do not leave an orphaned object behind
+            await supabase.storage.from_(DOCUMENT_BUCKET).remove([stored['file_path']])
+            raise
+        
+        classification_result = agent.document_result(classifier.result())
+        
+        return DocumentUploadResponse(
+            classification=classification_result.get('classification', 'unknown'),
+            confidence=classification_result.get('confidence', 0.0),
+            extracted_data=classification_result.get('extracted_data', {}),
+            document_id=document['id'],
+            claim_id=claim_id,
+            **stored
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Document upload failed: {str(e)}"
+        )
+
 @router.get("/fraud-check/{claim_id}", response_model=FraudCheckResponse)
 async def fraud_check(
     claim_id: str,
     current_user=Depends(get_current_user),
-    supabase: Client = Depends(get_supabase)
+    supabase: AsyncClient = Depends(get_supabase),
+    agent: ClaimProcessingAgent = Depends(get_claim_agent)
 ):
     """Run fraud detection on a claim"""
     try:
         # Verify claim belongs to user
-        claim_response = supabase.table('claims').select('*').eq('id', claim_id).eq('user_id', current_user.id).single().execute()
+        claim_response = await supabase.table('claims').select(AI_CLAIM_COLUMNS).eq('id', claim_id).eq('user_id', current_user.id).single().execute()
         
         if not claim_response.data:
             raise HTTPException(
@@ -195,11 +466,8 @@ async def fraud_check(
         
         claim_data = claim_response.data
         
-        # Initialize AI agent
-        agent = ClaimProcessingAgent()
-        
         # Run fraud detection
-        fraud_result = await agent.detect_fraud(claim_data)
+        fraud_result = await cached_detect_fraud(agent, claim_data)
         
         return FraudCheckResponse(
             claim_id=claim_id,
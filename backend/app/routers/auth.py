@@ -1,6 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from supabase import Client
-from app.database import get_supabase
+from app.database import get_supabase, AsyncClient
 from app.models.user_model import UserRegister, UserLogin, UserResponse, ProfileCreate
 import uuid
 
@@ -9,12 +8,12 @@ router = APIRouter()
 @router.post("/register", response_model=dict)
 async def register(
     user_data: UserRegister,
-    supabase: Client = Depends(get_supabase)
+    supabase: AsyncClient = Depends(get_supabase)
 ):
     """Register a new user"""
     try:
         # Create user in Supabase Auth
-        auth_response = supabase.auth.admin.create_user({
+        auth_response = await supabase.auth.admin.create_user({
             "email": user_data.email,
             "password": user_data.password,
             "email_confirm": True
@@ -35,7 +34,7 @@ async def register(
             role=user_data.role
         )
         
-        profile_response = supabase.table('profiles').insert({
+        profile_response = await supabase.table('profiles').insert({
             "id": profile_data.id,
             "full_name": profile_data.full_name,
             "role": profile_data.role.value
@@ -43,7 +42,7 @@ async def register(
         
         if not profile_response.data:
             # Cleanup: delete user if profile creation fails
-            supabase.auth.admin.delete_user(user_id)
+            await supabase.auth.admin.delete_user(user_id)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Failed to create user profile"
@@ -66,13 +65,13 @@ async def register(
 @router.post("/login", response_model=dict)
 async def login(
     credentials: UserLogin,
-    supabase: Client = Depends(get_supabase)
+    supabase: AsyncClient = Depends(get_supabase)
 ):
     """Login user"""
     try:
         # Note: In a real application, you would use the client-side auth
         # This is a simplified version for demonstration
-        auth_response = supabase.auth.sign_in_with_password({
+        auth_response = await supabase.auth.sign_in_with_password({
             "email": credentials.email,
             "password": credentials.password
         })
@@ -102,10 +101,10 @@ async def login(
         )
 
 @router.post("/logout")
-async def logout(supabase: Client = Depends(get_supabase)):
+async def logout(supabase: AsyncClient = Depends(get_supabase)):
     """Logout user"""
     try:
-        supabase.auth.sign_out()
+        await supabase.auth.sign_out()
         return {"message": "Logout successful"}
     except Exception as e:
         raise HTTPException(
@@ -116,11 +115,11 @@ async def logout(supabase: Client = Depends(get_supabase)):
 @router.post("/refresh", response_model=dict)
 async def refresh_token(
     refresh_token: str,
-    supabase: Client = Depends(get_supabase)
+    supabase: AsyncClient = Depends(get_supabase)
 ):
     """Refresh access token"""
     try:
-        auth_response = supabase.auth.refresh_session(refresh_token)
+        auth_response = await supabase.auth.refresh_session(refresh_token)
         
         if not auth_response.session:
             raise HTTPException(
@@ -1,49 +1,94 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from supabase import Client
-from app.database import get_supabase
-from app.routers.user import get_current_user
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from app.database import get_supabase, AsyncClient
+from app.routers.user import get_current_user, require_agent
+from app.langgraph.claim_agent import ClaimProcessingAgent, get_claim_agent
+from app.analysis_cache import invalidate_claim
+from app.entity_cache import get_claim_row, invalidate_claims
+from app.batch_processing import AI_BATCH_CONCURRENCY
+from app.claim_import import (
+    IMPORT_BATCH_SIZE, IMPORT_FORMATS, ImportFormatError, detect_format, import_claims
+)
+from app.claim_export import (
+    EXPORT_FORMATS, EXPORT_PAGE_SIZE, ExportFormatError, export_claims, make_encoder
+)
+from app.claim_stats import get_claim_stats
+from app.work_queue import WORK_QUEUE_MAX_CLAIMS, assigned_claims, claim_next, release_claim
+from fastapi.responses import StreamingResponse
 from app.models.claim_model import (
     Claim, ClaimCreate, ClaimUpdate, ClaimStatusUpdate, 
     ClaimListResponse, ClaimHistory, ClaimStatus
 )
-from typing import Optional, List
-import uuid
+from pydantic import BaseModel, create_model
+from typing import Dict, Literal, Optional, List, Tuple
+import base64
+import json
 from datetime import datetime
 
 router = APIRouter()
 
-def generate_claim_number() -> str:
-    """Generate a unique claim number"""
-    return f"CLM-{datetime.now().strftime('%Y%m%d')}-{str(uuid.uuid4())[:8].upper()}"
+# Claim with every field optional, for responses limited by `fields=`
+ClaimFields = create_model(
+    'ClaimFields',
+    **{name: (Optional[field.annotation], None) for name, field in Claim.model_fields.items()}
+)
+
+# List pages leave out the large metadata / ai_analysis JSONB columns by default
+CLAIM_LIST_FIELDS = [
+    'id', 'claim_number', 'type', 'status', 'priority', 'amount', 'description',
+    'incident_date', 'submitted_date', 'created_at', 'updated_at'
+]
+
+def select_columns(fields: Optional[str], default: Optional[List[str]], required: List[str]) -> str:
+    """Turn a `fields=` parameter into a select() column list
+    
+    `fields=*` (or no default) selects everything; the `required` columns are
+    always included because the endpoint itself needs them.
+    """
+    if fields is None:
+        if default is None:
+            return '*'
+        columns = default
+    elif fields.strip() == '*':
+        return '*'
+    else:
+        columns = [field.strip() for field in fields.split(',') if field.strip()]
+        unknown = [field for field in columns if field not in Claim.model_fields]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown fields: {', '.join(unknown)}"
+            )
+    return ','.join(dict.fromkeys(required + columns))
+
+class ClaimPageResponse(ClaimListResponse):
+    """ClaimListResponse plus a keyset cursor; totals and claim fields are optional"""
+    claims: List[ClaimFields]
+    total: Optional[int] = None
+    page: Optional[int] = None
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 @router.post("/", response_model=Claim)
 async def create_claim(
     claim_data: ClaimCreate,
     current_user=Depends(get_current_user),
-    supabase: Client = Depends(get_supabase)
+    supabase: AsyncClient = Depends(get_supabase)
 ):
     """Create a new claim"""
     try:
-        claim_id = str(uuid.uuid4())
-        claim_number = generate_claim_number()
-        
-        # Prepare claim data
-        new_claim = {
-            "id": claim_id,
-            "user_id": current_user.id,
-            "claim_number": claim_number,
-            "type": claim_data.type.value,
-            "status": ClaimStatus.submitted.value,
-            "priority": claim_data.priority.value,
-            "amount": claim_data.amount,
-            "description": claim_data.description,
-            "incident_date": claim_data.incident_date.isoformat(),
-            "submitted_date": datetime.now().isoformat(),
-            "metadata": claim_data.metadata or {},
-            "ai_analysis": {}
-        }
-        
-        response = supabase.table('claims').insert(new_claim).execute()
+        # One round-trip: the function inserts the claim and its history entry
+        # in a single transaction, and the set_claim_number trigger numbers it
+        response = await supabase.rpc('create_claim_with_history', {
+            "claim": {
+                "type": claim_data.type.value,
+                "priority": claim_data.priority.value,
+                "amount": claim_data.amount,
+                "description": claim_data.description,
+                "incident_date": claim_data.incident_date.isoformat(),
+                "metadata": claim_data.metadata or {}
+            },
+            "submitted_by": current_user.id
+        }).execute()
         
         if not response.data:
             raise HTTPException(
@@ -51,18 +96,6 @@ async def create_claim(
                 detail="Failed to create claim"
             )
         
-        # Add to claim history
-        history_entry = {
-            "id": str(uuid.uuid4()),
-            "claim_id": claim_id,
-            "action": "Claim submitted",
-            "new_status": ClaimStatus.submitted.value,
-            "performed_by": current_user.id,
-            "performed_at": datetime.now().isoformat()
-        }
-        
-        supabase.table('claim_history').insert(history_entry).execute()
-        
         return Claim(**response.data[0])
         
     except HTTPException:
@@ -73,19 +106,110 @@ async def create_claim(
             detail=f"Failed to create claim: {str(e)}"
         )
 
-@router.get("/", response_model=ClaimListResponse)
+class ClaimImportError(BaseModel):
+    row: int
+    error: str
+
+class ClaimImportResponse(BaseModel):
+    total: int
+    imported: int
+    failed: int
+    analyzed: int
+    errors: List[ClaimImportError]
+    errors_truncated: bool
+
+@router.post("/import", response_model=ClaimImportResponse)
+async def import_claims_file(
+    request: Request,
+    format: Optional[Literal['csv', 'ndjson']] = Query(None, description="Defaults to the Content-Type (text/csv or application/x-ndjson)"),
+    user_id: Optional[str] = Query(None, description="Owner for rows without a user_id column (default: the importer)"),
+    analyze: bool = Query(False, description="Run AI analysis on each imported batch"),
+    batch_size: int = Query(IMPORT_BATCH_SIZE, ge=1, le=10000),
+    concurrency: int = Query(AI_BATCH_CONCURRENCY, ge=1, le=64),
+    current_user=Depends(require_agent),
+    supabase: AsyncClient = Depends(get_supabase),
+    agent: ClaimProcessingAgent = Depends(get_claim_agent)
+):
+    """Bulk-import claims from a CSV (with header row) or NDJSON request body
+    
+    The body is streamed and written in batches; invalid rows are reported by
+    row number without aborting the import (agents/admins).
+    """
+    fmt = format or detect_format(request.headers.get('content-type'))
+    if fmt not in IMPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Send text/csv or application/x-ndjson, or pass format="
+        )
+    
+    try:
+        summary = await import_claims(
+            supabase,
+            request.stream(),
+            fmt,
+            imported_by=current_user.id,
+            owner_id=user_id,
+            batch_size=batch_size,
+            analyze=analyze,
+            agent=agent,
+            concurrency=concurrency
+        )
+        
+        return ClaimImportResponse(**summary)
+        
+    except ImportFormatError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to import claims: {str(e)}"
+        )
+
+def encode_cursor(row: dict) -> str:
+    """Opaque cursor pointing just past a row in (created_at, id) order"""
+    raw = json.dumps([row['created_at'], row['id']]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Inverse of encode_cursor; raises ValueError on malformed input"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, claim_id = json.loads(base64.urlsafe_b64decode(padded))
+        return str(created_at), str(claim_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+@router.get("/", response_model=ClaimPageResponse, response_model_exclude_unset=True)
 async def get_claims(
     page: int = Query(1, ge=1),
     per_page: int = Query(10, ge=1, le=100),
     status: Optional[ClaimStatus] = Query(None),
     type: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="next_cursor from a previous page; switches to keyset pagination"),
+    count: Optional[Literal['exact', 'estimated', 'none']] = Query(None, description="Total to compute (default: exact for page mode, none for cursor mode)"),
+    fields: Optional[str] = Query(None, description="Comma-separated claim fields, or * for all (default omits metadata and ai_analysis)"),
     current_user=Depends(get_current_user),
-    supabase: Client = Depends(get_supabase)
+    supabase: AsyncClient = Depends(get_supabase)
 ):
-    """Get user's claims with pagination and filtering"""
+    """Get user's claims with pagination and filtering
+    
+    Page mode (page/per_page) is kept for compatibility. Passing `cursor`
+    uses keyset pagination on (created_at, id), which stays fast on deep pages.
+    """
     try:
+        keyset = cursor is not None
+        count = count or ('none' if keyset else 'exact')
+        columns = select_columns(fields, CLAIM_LIST_FIELDS, required=['id', 'created_at'])
+        
         # Build query
-        query = supabase.table('claims').select('*', count='exact').eq('user_id', current_user.id)
+        if count == 'none':
+            query = supabase.table('claims').select(columns)
+        else:
+            query = supabase.table('claims').select(columns, count=count)
+        query = query.eq('user_id', current_user.id)
         
         # Apply filters
         if status:
@@ -94,46 +218,224 @@ async def get_claims(
             query = query.eq('type', type)
         
         # Apply pagination
-        offset = (page - 1) * per_page
-        query = query.range(offset, offset + per_page - 1).order('created_at', desc=True)
+        if keyset:
+            if cursor:
+                try:
+                    created_at, last_id = decode_cursor(cursor)
+                except ValueError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+                query = query.or_(
+                    f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt."{last_id}")'
+                )
+            # One extra row tells us whether another page exists
+            query = query.order('created_at', desc=True).order('id', desc=True).limit(per_page + 1)
+        else:
+            offset = (page - 1) * per_page
+            query = query.range(offset, offset + per_page - 1).order('created_at', desc=True).order('id', desc=True)
         
-        response = query.execute()
+        response = await query.execute()
         
-        claims = [Claim(**claim) for claim in response.data]
-        total = response.count if response.count is not None else len(claims)
-        total_pages = (total + per_page - 1) // per_page
+        rows = response.data[:per_page]
+        has_more = len(response.data) > per_page if keyset else len(rows) == per_page
         
-        return ClaimListResponse(
+        claims = [ClaimFields(**claim) for claim in rows]
+        total = response.count
+        if total is None and count != 'none':
+            total = len(claims)
+        total_pages = (total + per_page - 1) // per_page if total is not None else None
+        
+        return ClaimPageResponse(
             claims=claims,
             total=total,
-            page=page,
+            page=None if keyset else page,
             per_page=per_page,
-            total_pages=total_pages
+            total_pages=total_pages,
+            next_cursor=encode_cursor(rows[-1]) if has_more and rows else None
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            status_code=500,
             detail=f"Failed to retrieve claims: {str(e)}"
         )
 
-@router.get("/{claim_id}", response_model=Claim)
+class ClaimStatsBucket(BaseModel):
+    count: int
+    total_amount: float
+    avg_amount: float
+
+class ClaimStatsGroup(BaseModel):
+    status: str
+    type: str
+    priority: str
+    count: int
+    total_amount: float
+
+class ClaimStatsResponse(BaseModel):
+    total_claims: int
+    total_amount: float
+    avg_amount: float
+    open_claims: int
+    open_amount: float
+    by_status: Dict[str, ClaimStatsBucket]
+    by_type: Dict[str, ClaimStatsBucket]
+    by_priority: Dict[str, ClaimStatsBucket]
+    groups: List[ClaimStatsGroup]
+    generated_at: str
+
+@router.get("/stats", response_model=ClaimStatsResponse)
+async def get_claims_stats(
+    current_user=Depends(require_agent),
+    supabase: AsyncClient = Depends(get_supabase)
+):
+    """Claim counts and amount totals for the agent/admin dashboards
+    
+    Served from the trigger-maintained claims_rollup table and cached briefly,
+    so it is one small read however many claims there are.
+    """
+    try:
+        return ClaimStatsResponse(**await get_claim_stats(supabase))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to retrieve claim statistics: {str(e)}"
+        )
+
+@router.post("/queue/next", response_model=List[Claim])
+async def claim_next_from_queue(
+    count: int = Query(1, ge=1, le=WORK_QUEUE_MAX_CLAIMS),
+    type: Optional[List[str]] = Query(None, description="Only claims of these types"),
+    current_user=Depends(require_agent),
+    supabase: AsyncClient = Depends(get_supabase)
+):
+    """Assign the next open claims to the calling agent and return them
+    
+    Ordered by priority, the AI's next_action, then age. Concurrent agents
+    never receive the same claim; unreleased assignments expire after a lease.
+    """
+    try:
+        claims = await claim_next(supabase, current_user.id, max_claims=count, claim_types=type)
+        return [Claim(**claim) for claim in claims]
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch work queue: {str(e)}"
+        )
+
+@router.get("/queue", response_model=List[Claim])
+async def get_my_queue(
+    current_user=Depends(require_agent),
+    supabase: AsyncClient = Depends(get_supabase)
+):
+    """Open claims currently assigned to the calling agent"""
+    try:
+        claims = await assigned_claims(supabase, current_user.id)
+        return [Claim(**claim) for claim in claims]
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch work queue: {str(e)}"
+        )
+
+@router.post("/queue/{claim_id}/release")
+async def release_queued_claim(
+    claim_id: str,
+    current_user=Depends(require_agent),
+    supabase: AsyncClient = Depends(get_supabase)
+):
+    """Return an assigned claim to the queue"""
+    try:
+        released = await release_claim(supabase, current_user.id, claim_id)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to release claim: {str(e)}"
+        )
+    
+    if not released:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Claim not assigned to you"
+        )
+    
+    return {"message": "Claim released to the queue"}
+
+@router.get("/export")
+async def export_claims_file(
+    format: Literal['ndjson', 'csv', 'parquet'] = Query('ndjson'),
+    include: Optional[str] = Query(None, description="Comma-separated extras: history, analysis"),
+    status_filter: Optional[ClaimStatus] = Query(None, alias="status"),
+    type_filter: Optional[str] = Query(None, alias="type"),
+    user_id: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None, ge=1),
+    current_user=Depends(require_agent),
+    supabase: AsyncClient = Depends(get_supabase)
+):
+    """Stream every selected claim as NDJSON, CSV or Parquet (agents/admins)
+    
+    Claims are read and encoded a page at a time, so the full book can be
+    dumped without paging through GET /claims.
+    """
+    extras = {item.strip() for item in (include or '').split(',') if item.strip()}
+    unknown = extras - {'history', 'analysis'}
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown include: {', '.join(sorted(unknown))}"
+        )
+    
+    try:
+        encoder = make_encoder(format, 'analysis' in extras, 'history' in extras)
+    except ExportFormatError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    media_type, extension = EXPORT_FORMATS[format]
+    file_name = f"claims-{datetime.now().strftime('%Y%m%d')}.{extension}"
+    
+    return StreamingResponse(
+        export_claims(
+            supabase,
+            encoder,
+            status=status_filter.value if status_filter else None,
+            claim_type=type_filter,
+            user_id=user_id,
+            include_analysis='analysis' in extras,
+            include_history='history' in extras,
+            page_size=EXPORT_PAGE_SIZE,
+            limit=limit
+        ),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{file_name}"'}
+    )
+
+@router.get("/{claim_id}", response_model=ClaimFields, response_model_exclude_unset=True)
 async def get_claim(
     claim_id: str,
+    fields: Optional[str] = Query(None, description="Comma-separated claim fields (default: all)"),
     current_user=Depends(get_current_user),
-    supabase: Client = Depends(get_supabase)
+    supabase: AsyncClient = Depends(get_supabase)
 ):
     """Get a specific claim"""
     try:
-        response = supabase.table('claims').select('*').eq('id', claim_id).eq('user_id', current_user.id).single().execute()
+        columns = select_columns(fields, None, required=['id'])
+        # Whole rows are cached; `fields` only trims the response
+        claim = await get_claim_row(supabase, claim_id)
         
-        if not response.data:
+        if not claim or claim.get('user_id') != current_user.id:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Claim not found"
             )
         
-        return Claim(**response.data)
+        if columns != '*':
+            claim = {column: claim.get(column) for column in columns.split(',')}
+        
+        return ClaimFields(**claim)
         
     except HTTPException:
         raise
@@ -148,12 +450,13 @@ async def update_claim(
     claim_id: str,
     claim_update: ClaimUpdate,
     current_user=Depends(get_current_user),
-    supabase: Client = Depends(get_supabase)
+    supabase: AsyncClient = Depends(get_supabase),
+    agent: ClaimProcessingAgent = Depends(get_claim_agent)
 ):
     """Update a claim (only if in submitted status)"""
     try:
         # Check if claim exists and belongs to user
-        existing_claim = supabase.table('claims').select('*').eq('id', claim_id).eq('user_id', current_user.id).single().execute()
+        existing_claim = await supabase.table('claims').select('*').eq('id', claim_id).eq('user_id', current_user.id).single().execute()
         
         if not existing_claim.data:
             raise HTTPException(
@@ -189,7 +492,8 @@ async def update_claim(
         
         update_data['updated_at'] = datetime.now().isoformat()
         
-        response = supabase.table('claims').update(update_data).eq('id', claim_id).execute()
+        response = await supabase.table('claims').update(update_data).eq('id', claim_id).execute()
+        await invalidate_claims([claim_id])
         
         if not response.data:
             raise HTTPException(
@@ -197,6 +501,9 @@ async def update_claim(
                 detail="Failed to update claim"
             )
         
+        # Cached AI results for the old contents can never be hit again
+        await invalidate_claim(agent, existing_claim.data)
+        
         return Claim(**response.data[0])
         
     except HTTPException:
@@ -211,12 +518,12 @@ async def update_claim(
 async def get_claim_history(
     claim_id: str,
     current_user=Depends(get_current_user),
-    supabase: Client = Depends(get_supabase)
+    supabase: AsyncClient = Depends(get_supabase)
 ):
     """Get claim history"""
     try:
         # Verify claim belongs to user
-        claim_response = supabase.table('claims').select('id').eq('id', claim_id).eq('user_id', current_user.id).single().execute()
+        claim_response = await supabase.table('claims').select('id').eq('id', claim_id).eq('user_id', current_user.id).single().execute()
         
         if not claim_response.data:
             raise HTTPException(
@@ -225,7 +532,7 @@ async def get_claim_history(
             )
         
         # Get claim history
-        history_response = supabase.table('claim_history').select('*').eq('claim_id', claim_id).order('performed_at', desc=True).execute()
+        history_response = await supabase.table('claim_history').select('*').eq('claim_id', claim_id).order('performed_at', desc=True).execute()
         
         return [ClaimHistory(**entry) for entry in history_response.data]
         
@@ -1,6 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Header
-from supabase import Client
-from app.database import get_supabase
+from app.database import get_supabase, AsyncClient
+from app.token_verifier import TokenVerifier, get_token_verifier
+from app.metrics import AUTH_LATENCY
+from app.entity_cache import get_profile_row, invalidate_profile, invalidate_claims
 from app.models.user_model import Profile, ProfileUpdate
 from typing import Optional
 
@@ -8,7 +10,8 @@ router = APIRouter()
 
 async def get_current_user(
     authorization: Optional[str] = Header(None),
-    supabase: Client = Depends(get_supabase)
+    supabase: AsyncClient = Depends(get_supabase),
+    verifier: TokenVerifier = Depends(get_token_verifier)
 ):
     """Get current authenticated user"""
     if not authorization or not authorization.startswith("Bearer "):
@@ -20,7 +23,14 @@ async def get_current_user(
     token = authorization.split(" ")[1]
     
     try:
-        user_response = supabase.auth.get_user(token)
+        # Verify locally when the signing key is known; otherwise ask the auth server
+        with AUTH_LATENCY.time(method="local"):
+            user = await verifier.verify(token)
+        if user is not None:
+            return user
+        
+        with AUTH_LATENCY.time(method="remote"):
+            user_response = await supabase.auth.get_user(token)
         if not user_response.user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -33,22 +43,40 @@ async def get_current_user(
             detail="Authentication failed"
         )
 
+async def require_agent(
+    current_user=Depends(get_current_user),
+    supabase: AsyncClient = Depends(get_supabase)
+):
+    """Allow only users whose profile role is agent or admin"""
+    try:
+        profile = await get_profile_row(supabase, current_user.id)
+        role = profile.get('role') if profile else None
+    except Exception:
+        role = None
+    
+    if role not in ('agent', 'admin'):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Agent or admin role required"
+        )
+    return current_user
+
 @router.get("/profile", response_model=Profile)
 async def get_profile(
     current_user=Depends(get_current_user),
-    supabase: Client = Depends(get_supabase)
+    supabase: AsyncClient = Depends(get_supabase)
 ):
     """Get current user's profile"""
     try:
-        response = supabase.table('profiles').select('*').eq('id', current_user.id).single().execute()
+        profile = await get_profile_row(supabase, current_user.id)
         
-        if not response.data:
+        if not profile:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Profile not found"
             )
         
-        return Profile(**response.data)
+        return Profile(**profile)
         
     except HTTPException:
         raise
@@ -62,7 +90,7 @@ async def get_profile(
 async def update_profile(
     profile_update: ProfileUpdate,
     current_user=Depends(get_current_user),
-    supabase: Client = Depends(get_supabase)
+    supabase: AsyncClient = Depends(get_supabase)
 ):
     """Update current user's profile"""
     try:
@@ -78,7 +106,8 @@ async def update_profile(
         # Add updated timestamp
         update_data['updated_at'] = 'now()'
         
-        response = supabase.table('profiles').update(update_data).eq('id', current_user.id).execute()
+        response = await supabase.table('profiles').update(update_data).eq('id', current_user.id).execute()
+        await invalidate_profile(current_user.id)
         
         if not response.data:
             raise HTTPException(
@@ -99,15 +128,20 @@ async def update_profile(
 @router.delete("/account")
 async def delete_account(
     current_user=Depends(get_current_user),
-    supabase: Client = Depends(get_supabase)
+    supabase: AsyncClient = Depends(get_supabase)
 ):
     """Delete current user's account"""
     try:
+        # Their claims go with the profile (ON DELETE CASCADE); note which to evict
+        claims_response = await supabase.table('claims').select('id').eq('user_id', current_user.id).execute()
+        
         # Delete profile first (due to foreign key constraints)
-        supabase.table('profiles').delete().eq('id', current_user.id).execute()
+        await supabase.table('profiles').delete().eq('id', current_user.id).execute()
+        await invalidate_profile(current_user.id)
+        await invalidate_claims(claim['id'] for claim in claims_response.data)
         
         # Delete user from auth
-        supabase.auth.admin.delete_user(current_user.id)
+        await supabase.auth.admin.delete_user(current_user.id)
         
         return {"message": "Account deleted successfully"}
         
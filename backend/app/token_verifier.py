@@ -0,0 +1,207 @@
+"""
+Local verification of Supabase access tokens.
+
+Validates the JWT signature and expiry in-process instead of asking the auth
+server on every request. Signing keys come from SUPABASE_JWT_SECRET (HS256
+projects) or the project's JWKS endpoint (asymmetric keys), and recently
+verified tokens are kept in a bounded LRU until they expire.
+"""
+
+from jose import jwt, JWTError
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+import hashlib
+import httpx
+import os
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+SUPABASE_JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+
+# Always ask the auth server so revoked sessions are rejected immediately
+AUTH_STRICT_REVOCATION = os.getenv("AUTH_STRICT_REVOCATION", "false").lower() == "true"
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+AUTH_TOKEN_CACHE_TTL = int(os.getenv("AUTH_TOKEN_CACHE_TTL", "300"))
+JWKS_CACHE_TTL = int(os.getenv("JWKS_CACHE_TTL", "600"))
+JWKS_MIN_REFRESH_INTERVAL = int(os.getenv("JWKS_MIN_REFRESH_INTERVAL", "30"))
+
+# Algorithm implied by a JWK that does not name one: (kty, crv) -> alg
+JWK_DEFAULT_ALGORITHMS = {
+    ("RSA", None): "RS256",
+    ("EC", "P-256"): "ES256",
+    ("EC", "P-384"): "ES384",
+    ("EC", "P-521"): "ES512",
+}
+
+
+def key_algorithm(jwk: Dict[str, Any]) -> Optional[str]:
+    """The algorithm a JWKS key signs with, from the key alone; None if unknown"""
+    if jwk.get("alg"):
+        return jwk["alg"]
+    return JWK_DEFAULT_ALGORITHMS.get((jwk.get("kty"), jwk.get("crv")))
+
+
+@dataclass
+class TokenUser:
+    """Authenticated user reconstructed from verified token claims"""
+    id: str
+    email: Optional[str] = None
+    role: Optional[str] = None
+    aud: Optional[str] = None
+    app_metadata: Dict[str, Any] = field(default_factory=dict)
+    user_metadata: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def from_claims(cls, claims: Dict[str, Any]) -> "TokenUser":
+        return cls(
+            id=claims["sub"],
+            email=claims.get("email"),
+            role=claims.get("role"),
+            aud=claims.get("aud"),
+            app_metadata=claims.get("app_metadata") or {},
+            user_metadata=claims.get("user_metadata") or {}
+        )
+
+
+class TokenVerifier:
+    """Verifies bearer tokens locally, caching signing keys and results"""
+
+    def __init__(
+        self,
+        jwt_secret: Optional[str] = SUPABASE_JWT_SECRET,
+        jwks_url: Optional[str] = f"{SUPABASE_URL}/auth/v1/.well-known/jwks.json" if SUPABASE_URL else None,
+        audience: Optional[str] = SUPABASE_JWT_AUDIENCE,
+        strict_revocation: bool = AUTH_STRICT_REVOCATION,
+        cache_size: int = AUTH_TOKEN_CACHE_SIZE,
+        cache_ttl: int = AUTH_TOKEN_CACHE_TTL
+    ):
+        self.jwt_secret = jwt_secret
+        self.jwks_url = jwks_url
+        self.audience = audience
+        self.strict_revocation = strict_revocation
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+
+        self._verified: "OrderedDict[str, Tuple[float, TokenUser]]" = OrderedDict()
+        self._jwks: Dict[str, Dict[str, Any]] = {}
+        self._jwks_fetched_at = 0.0
+        # Last fetch attempt, successful or not
+        self._jwks_attempted_at = 0.0
+        self._jwks_lock = asyncio.Lock()
+
+    def _cache_key(self, token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def _cached(self, key: str) -> Optional[TokenUser]:
+        entry = self._verified.get(key)
+        if entry is None:
+            return None
+        expires_at, user = entry
+        if expires_at <= time.time():
+            del self._verified[key]
+            return None
+        self._verified.move_to_end(key)
+        return user
+
+    def _remember(self, key: str, user: TokenUser, token_exp: float):
+        # Never trust a cached result past the token's own expiry
+        self._verified[key] = (min(token_exp, time.time() + self.cache_ttl), user)
+        self._verified.move_to_end(key)
+        while len(self._verified) > self.cache_size:
+            self._verified.popitem(last=False)
+
+    def forget(self, token: str):
+        """Drop a token from the verified cache (e.g. after logout)"""
+        self._verified.pop(self._cache_key(token), None)
+
+    def _refresh_due(self, force: bool) -> bool:
+        now = time.time()
+        # Counted from the last attempt, so neither an unreachable endpoint nor
+        # tokens with unknown kids can cause more than one fetch per interval
+        if now - self._jwks_attempted_at < JWKS_MIN_REFRESH_INTERVAL:
+            return False
+        return force or now - self._jwks_fetched_at >= JWKS_CACHE_TTL
+
+    async def _refresh_jwks(self, force: bool = False):
+        """Reload the JWKS document, at most once per refresh interval"""
+        async with self._jwks_lock:
+            if not self._refresh_due(force):
+                return
+            self._jwks_attempted_at = time.time()
+            async with httpx.AsyncClient(timeout=10) as client:
+                response = await client.get(self.jwks_url)
+                response.raise_for_status()
+            self._jwks = {key["kid"]: key for key in response.json().get("keys", []) if "kid" in key}
+            self._jwks_fetched_at = time.time()
+
+    async def _signing_key(self, header: Dict[str, Any]) -> Optional[Any]:
+        """Resolve the key for a token header, or None if it is unknown locally"""
+        if header.get("alg") == "HS256":
+            return self.jwt_secret
+
+        kid = header.get("kid")
+        if not self.jwks_url or not kid:
+            return None
+
+        # Unknown kid means the keys may have rotated; otherwise refresh on schedule
+        known = kid in self._jwks
+        # With a known key, don't queue behind a refresh another request started
+        if self._refresh_due(force=not known) and not (known and self._jwks_lock.locked()):
+            try:
+                await self._refresh_jwks(force=not known)
+            except (httpx.HTTPError, ValueError):
+                pass
+        return self._jwks.get(kid)
+
+    async def verify(self, token: str) -> Optional[TokenUser]:
+        """Return the token's user, or None when the auth server must decide.
+
+        Raises JWTError when the token is well-formed but invalid or expired.
+        """
+        if self.strict_revocation:
+            return None
+
+        key = self._cache_key(token)
+        user = self._cached(key)
+        if user is not None:
+            return user
+
+        try:
+            header = jwt.get_unverified_header(token)
+        except JWTError:
+            # Not a JWT we understand; let the auth server decide
+            return None
+
+        signing_key = await self._signing_key(header)
+        if signing_key is None:
+            return None
+
+        # Pin the algorithm to the key, never to what the token claims
+        algorithm = key_algorithm(signing_key) if isinstance(signing_key, dict) else "HS256"
+        if algorithm is None:
+            # A key we cannot pin an algorithm for is not used; the auth server decides
+            return None
+        claims = jwt.decode(
+            token,
+            signing_key,
+            algorithms=[algorithm],
+            audience=self.audience,
+            options={"verify_aud": bool(self.audience), "require_exp": True, "require_sub": True}
+        )
+
+        user = TokenUser.from_claims(claims)
+        self._remember(key, user, float(claims["exp"]))
+        return user
+
+
+token_verifier = TokenVerifier()
+
+def get_token_verifier() -> TokenVerifier:
+    """Dependency to get the shared token verifier"""
+    return token_verifier
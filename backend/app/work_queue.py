@@ -0,0 +1,75 @@
+"""
+Agent work queue over open claims.
+
+public.claim_work_queue picks the next open claims in queue order (priority,
+then the AI's next_action, then age) and assigns them to the calling agent in
+one statement with FOR UPDATE SKIP LOCKED, so concurrent agents never receive
+the same claim. An assignment is a lease: claims an agent neither resolves nor
+releases return to the queue after WORK_QUEUE_LEASE_SECONDS.
+"""
+
+from app.database import AsyncClient
+from app.entity_cache import invalidate_claims
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+import os
+
+WORK_QUEUE_LEASE_SECONDS = int(os.getenv("WORK_QUEUE_LEASE_SECONDS", "1800"))
+WORK_QUEUE_MAX_CLAIMS = int(os.getenv("WORK_QUEUE_MAX_CLAIMS", "25"))
+
+OPEN_STATUSES = ['submitted', 'under_review']
+
+# Must match public.priority_rank / public.next_action_rank in database_setup.sql
+PRIORITY_RANK = {"urgent": 0, "high": 1, "medium": 2, "low": 3}
+NEXT_ACTION_RANK = {"investigate": 0, "manual_review": 1, "standard_review": 2, "auto_approve": 4}
+
+
+def queue_order(claim: Dict[str, Any]) -> tuple:
+    """Sort key giving the queue order"""
+    return (
+        PRIORITY_RANK.get(claim.get('priority'), 4),
+        NEXT_ACTION_RANK.get((claim.get('ai_analysis') or {}).get('next_action'), 3),
+        claim.get('submitted_date') or ''
+    )
+
+
+async def claim_next(
+    supabase: AsyncClient,
+    agent_id: str,
+    max_claims: int = 1,
+    claim_types: Optional[List[str]] = None,
+    lease_seconds: int = WORK_QUEUE_LEASE_SECONDS
+) -> List[Dict[str, Any]]:
+    """Assign up to max_claims of the next open claims to the agent"""
+    response = await supabase.rpc('claim_work_queue', {
+        'agent_id': agent_id,
+        'max_claims': max_claims,
+        'lease_seconds': lease_seconds,
+        'claim_types': claim_types
+    }).execute()
+    await invalidate_claims(claim['id'] for claim in response.data or [])
+    # UPDATE ... RETURNING does not keep the ORDER BY
+    return sorted(response.data or [], key=queue_order)
+
+
+async def assigned_claims(
+    supabase: AsyncClient,
+    agent_id: str,
+    lease_seconds: int = WORK_QUEUE_LEASE_SECONDS
+) -> List[Dict[str, Any]]:
+    """Open claims the agent currently holds an unexpired lease on"""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=lease_seconds)
+    response = await supabase.table('claims').select('*').eq('assigned_to', agent_id).in_(
+        'status', OPEN_STATUSES
+    ).gte('assigned_at', cutoff.isoformat()).execute()
+    return sorted(response.data, key=queue_order)
+
+
+async def release_claim(supabase: AsyncClient, agent_id: str, claim_id: str) -> bool:
+    """Hand a claim back to the queue; False if the agent does not hold it"""
+    response = await supabase.table('claims').update({
+        'assigned_to': None,
+        'assigned_at': None
+    }).eq('id', claim_id).eq('assigned_to', agent_id).execute()
+    await invalidate_claims([claim_id])
+    return bool(response.data)
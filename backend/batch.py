@@ -0,0 +1,72 @@
+"""
+Batch AI analysis of claims from the command line
+
+Examples:
+    python batch.py --status submitted --concurrency 16
+    python batch.py --claim-ids <id> <id> ...
+    python batch.py --all
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run AI analysis over many claims")
+    parser.add_argument("--claim-ids", nargs="+", help="Specific claim ids to process")
+    parser.add_argument("--status", help="Only claims with this status")
+    parser.add_argument("--type", dest="claim_type", help="Only claims of this type")
+    parser.add_argument("--user-id", help="Only claims belonging to this user")
+    parser.add_argument("--all", action="store_true", help="Process every claim")
+    parser.add_argument("--limit", type=int, help="Stop after this many claims")
+    parser.add_argument("--concurrency", type=int, help="Workflow runs in flight at once")
+    parser.add_argument("--page-size", type=int, help="Claims fetched and written per round-trip")
+    return parser.parse_args()
+
+
+async def main(args):
+    from app.database import get_supabase, close_db
+    from app.langgraph.claim_agent import init_claim_agent, load_agent_config
+    from app.batch_processing import process_claims_batch, AI_BATCH_CONCURRENCY, AI_BATCH_PAGE_SIZE
+    from app.log_writer import ai_log_writer
+
+    def report(summary):
+        print(f"processed={summary['processed']} succeeded={summary['succeeded']} failed={summary['failed']}", flush=True)
+
+    await ai_log_writer.start()
+    try:
+        summary = await process_claims_batch(
+            get_supabase(),
+            init_claim_agent(await load_agent_config(get_supabase())),
+            claim_ids=args.claim_ids,
+            status=args.status,
+            claim_type=args.claim_type,
+            user_id=args.user_id,
+            limit=args.limit,
+            concurrency=args.concurrency or AI_BATCH_CONCURRENCY,
+            page_size=args.page_size or AI_BATCH_PAGE_SIZE,
+            collect_results=False,
+            on_page=report
+        )
+    finally:
+        await ai_log_writer.stop()
+        await close_db()
+
+    summary.pop("results")
+    print(json.dumps(summary))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    # Add the current directory to Python path
+    current_dir = Path(__file__).parent
+    sys.path.insert(0, str(current_dir))
+
+    args = parse_args()
+    if not (args.claim_ids or args.status or args.claim_type or args.user_id or args.all):
+        sys.exit("Select claims with --claim-ids, a filter, or --all")
+
+    sys.exit(asyncio.run(main(args)))
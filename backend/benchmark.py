@@ -0,0 +1,350 @@
+"""
+Load test and micro-benchmarks against the in-memory database
+
+The app runs in-process on the memory backend (no Supabase project needed)
+with an injected per-call latency standing in for the network. Each scenario
+is driven at a fixed concurrency and reports throughput and p50/p95/p99; the
+micro-benchmarks time the ClaimProcessingAgent nodes directly, and cold
+starts are timed in fresh interpreters from first import until /health would
+report ready. Results are written as JSON, and --compare prints the change
+against an earlier run.
+
+Examples:
+    python benchmark.py --output bench.json
+    python benchmark.py --latency-ms 20 --concurrency 64 --requests 5000
+    python benchmark.py --scenarios profile,claims_list --compare bench.json
+"""
+
+import argparse
+import asyncio
+import copy
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+SCENARIOS = ["claims_list", "claim_get", "claim_create", "profile", "process_claim", "classify_document"]
+
+SAMPLE_DOCUMENT = (
+    "Repair estimate for vehicle damage following the collision on the highway. "
+    "Parts and labour itemised below; the garage report is attached. " * 40
+    + "Please settle the attached invoice within 30 days."
+)
+
+# Run in a fresh interpreter: import the app, start it, wait for readiness
+COLD_START_SCRIPT = """
+import asyncio, json, time
+from app import IMPORT_STARTED
+from app.main import app
+from app.health import readiness
+imported = time.perf_counter()
+
+async def main():
+    async with app.router.lifespan_context(app):
+        started = time.perf_counter()
+        while not (await readiness())["ready"]:
+            await asyncio.sleep(0.001)
+        print(json.dumps({
+            "import": imported - IMPORT_STARTED,
+            "startup": started - IMPORT_STARTED,
+            "ready": time.perf_counter() - IMPORT_STARTED
+        }))
+
+asyncio.run(main())
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the API and AI workflow nodes")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=int, default=32, help="Requests in flight at once")
+    parser.add_argument("--requests", type=int, default=2000, help="Measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=50, help="Unmeasured requests before each scenario")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Injected latency per database call")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Extra random latency, uniform in [0, jitter]")
+    parser.add_argument("--seed-claims", type=int, default=1000, help="Claims created before the run")
+    parser.add_argument("--micro-iterations", type=int, default=2000, help="Calls per micro-benchmark (0 to skip)")
+    parser.add_argument("--cold-starts", type=int, default=5, help="Cold starts to time (0 to skip)")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the JSON results")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    return parser.parse_args()
+
+
+def summarize(latencies, scale):
+    """Percentiles of a list of durations in seconds, in ms (scale=1e3) or us (1e6)"""
+    import numpy as np
+
+    if not latencies:
+        return {}
+    values = np.asarray(latencies) * scale
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "mean": round(float(values.mean()), 3),
+        "p50": round(float(p50), 3),
+        "p95": round(float(p95), 3),
+        "p99": round(float(p99), 3),
+        "max": round(float(values.max()), 3)
+    }
+
+
+async def drive(request, total, concurrency):
+    """Issue `total` requests with `concurrency` workers; returns latencies,
+    error count and wall time"""
+    latencies, errors = [], 0
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            index = total - remaining - 1
+            start = time.perf_counter()
+            response = await request(index)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+async def setup(client, supabase, seed_claims):
+    """Register a user, log in and seed claims with distinct AI inputs"""
+    credentials = {"email": "bench@example.com", "password": "bench-password"}
+    await client.post("/auth/register", json={**credentials, "full_name": "Benchmark User"})
+    session = (await client.post("/auth/login", json=credentials)).json()
+    headers = {"Authorization": f"Bearer {session['access_token']}"}
+    user_id = session["user"]["id"]
+
+    claim_types = ["auto", "health", "property", "life"]
+    rows = [{
+        "type": claim_types[i % len(claim_types)],
+        "amount": 1000 + i * 97.5,
+        "description": f"Benchmark claim {i}: accident with total loss" if i % 5 == 0 else f"Benchmark claim {i}",
+        "incident_date": "2024-01-01",
+        "metadata": {}
+    } for i in range(seed_claims)]
+    ids = []
+    for start in range(0, len(rows), 1000):
+        response = await supabase.rpc("bulk_create_claims_with_history", {
+            "claim_rows": rows[start:start + 1000],
+            "submitted_by": user_id
+        }).execute()
+        ids.extend(response.data)
+    return headers, ids
+
+
+def scenario_requests(client, headers, claim_ids):
+    new_claim = {"type": "auto", "amount": 2500, "description": "Benchmark submission", "incident_date": "2024-01-01"}
+    document = {"document_content": SAMPLE_DOCUMENT, "document_type": "estimate"}
+
+    return {
+        "claims_list": lambda i: client.get("/claims/", params={"per_page": 20}, headers=headers),
+        "claim_get": lambda i: client.get(f"/claims/{claim_ids[i % len(claim_ids)]}", headers=headers),
+        "claim_create": lambda i: client.post("/claims/", json=new_claim, headers=headers),
+        "profile": lambda i: client.get("/user/profile", headers=headers),
+        "process_claim": lambda i: client.post(f"/ai/process-claim/{claim_ids[i % len(claim_ids)]}", headers=headers),
+        "classify_document": lambda i: client.post("/ai/classify-document", json=document, headers=headers),
+    }
+
+
+async def run_load(args, scenarios):
+    import httpx
+    from app.main import app
+    from app.database import get_supabase
+
+    supabase = get_supabase()
+    results = {}
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            headers, claim_ids = await setup(client, supabase, args.seed_claims)
+            requests = scenario_requests(client, headers, claim_ids)
+
+            for name in scenarios:
+                await drive(requests[name], args.warmup, args.concurrency)
+                round_trips = supabase.round_trips
+                latencies, errors, elapsed = await drive(requests[name], args.requests, args.concurrency)
+                results[name] = {
+                    "requests": len(latencies),
+                    "errors": errors,
+                    "duration_s": round(elapsed, 3),
+                    "throughput_rps": round(len(latencies) / elapsed, 1),
+                    "db_calls_per_request": round((supabase.round_trips - round_trips) / len(latencies), 2),
+                    "latency_ms": summarize(latencies, 1e3)
+                }
+                print(f"{name:18} {results[name]['throughput_rps']:>9.1f} req/s  "
+                      f"p50={results[name]['latency_ms']['p50']:.2f}ms  "
+                      f"p95={results[name]['latency_ms']['p95']:.2f}ms  "
+                      f"p99={results[name]['latency_ms']['p99']:.2f}ms  errors={errors}", flush=True)
+
+    return results
+
+
+async def time_calls(fn, inputs):
+    """Per-call durations of `await fn(x)` over the inputs"""
+    durations = []
+    for item in inputs:
+        start = time.perf_counter()
+        await fn(item)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+async def run_micro(iterations):
+    """Time each workflow node on the state it would see in a real run"""
+    from app.langgraph.claim_agent import (
+        ClaimProcessingAgent, ClaimState, PARALLEL_NODES, merge_analysis_results
+    )
+
+    agent = ClaimProcessingAgent()
+    nodes = agent._nodes()
+    claim = {"id": "bench", "type": "auto", "amount": 120000.0, "description": "Highway accident, total loss of vehicle"}
+
+    # Capture each node's input state by running the workflow once
+    state = ClaimState(claim_data=claim, analysis_results={}, recommendations=[], confidence=0.0, next_action="", errors=[])
+    inputs = {"classify": copy.deepcopy(state)}
+    state = await nodes["classify"](state)
+    for node_name in PARALLEL_NODES:
+        inputs[node_name] = copy.deepcopy(state)
+    for node_name in PARALLEL_NODES:
+        update = await nodes[node_name](copy.deepcopy(inputs[node_name]))
+        state["analysis_results"] = merge_analysis_results(state["analysis_results"], update["analysis_results"])
+    inputs["generate_recommendations"] = copy.deepcopy(state)
+    state = await nodes["generate_recommendations"](state)
+    inputs["finalize"] = copy.deepcopy(state)
+
+    results = {}
+    for node_name, node_input in inputs.items():
+        # Copies are made up front so only the node itself is timed
+        copies = [copy.deepcopy(node_input) for _ in range(iterations)]
+        results[f"node.{node_name}"] = {"iterations": iterations, "latency_us": summarize(await time_calls(nodes[node_name], copies), 1e6)}
+
+    claims = [{**claim, "id": str(i), "amount": float(i * 250)} for i in range(iterations)]
+    for name, batch in (("assess_risk_batch", agent.assess_risk_batch), ("detect_fraud_batch", agent.detect_fraud_batch)):
+        start = time.perf_counter()
+        batch(claims)
+        elapsed = time.perf_counter() - start
+        results[name] = {"claims": len(claims), "per_claim_us": round(elapsed / len(claims) * 1e6, 3)}
+
+    results["classify_document"] = {
+        "iterations": iterations,
+        "document_chars": len(SAMPLE_DOCUMENT),
+        "latency_us": summarize(await time_calls(lambda text: agent.classify_document(text, "estimate"), [SAMPLE_DOCUMENT] * iterations), 1e6)
+    }
+    results["process_claim"] = {
+        "iterations": iterations,
+        "latency_us": summarize(await time_calls(agent.process_claim, [dict(claim) for _ in range(iterations)]), 1e6)
+    }
+
+    for name, result in results.items():
+        summary = result.get("latency_us")
+        print(f"{name:32} " + (f"p50={summary['p50']:.1f}us  p99={summary['p99']:.1f}us" if summary else f"{result['per_claim_us']:.2f}us/claim"))
+    return results
+
+
+def run_cold_starts(runs):
+    """Seconds from first import to imported, started and ready, over fresh interpreters"""
+    timings = {"import": [], "startup": [], "ready": []}
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", COLD_START_SCRIPT],
+            cwd=Path(__file__).parent, capture_output=True, text=True, check=True
+        ).stdout
+        run = json.loads(output.strip().splitlines()[-1])
+        for phase in timings:
+            timings[phase].append(run[phase])
+
+    results = {"runs": runs, **{f"{phase}_ms": summarize(values, 1e3) for phase, values in timings.items()}}
+    print(f"{'cold_start':18} import p50={results['import_ms']['p50']:.0f}ms  "
+          f"startup p50={results['startup_ms']['p50']:.0f}ms  ready p50={results['ready_ms']['p50']:.0f}ms", flush=True)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(current, baseline_path):
+    """Print the change in throughput and latency percentiles against a baseline"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    print(f"\nCompared with {baseline_path} ({baseline.get('meta', {}).get('git_commit') or 'unknown commit'}):")
+    for name, result in current.get("scenarios", {}).items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        changes = [f"throughput {(result['throughput_rps'] / before['throughput_rps'] - 1) * 100:+.1f}%"]
+        for percentile in ("p50", "p95", "p99"):
+            changes.append(f"{percentile} {(result['latency_ms'][percentile] / before['latency_ms'][percentile] - 1) * 100:+.1f}%")
+        print(f"  {name:18} " + "  ".join(changes))
+    for name, result in current.get("micro", {}).items():
+        before = baseline.get("micro", {}).get(name)
+        if not before:
+            continue
+        if "latency_us" in result:
+            change = result["latency_us"]["p50"] / before["latency_us"]["p50"] - 1
+        else:
+            change = result["per_claim_us"] / before["per_claim_us"] - 1
+        print(f"  {name:32} {change * 100:+.1f}%")
+    if current.get("cold_start") and baseline.get("cold_start"):
+        change = current["cold_start"]["ready_ms"]["p50"] / baseline["cold_start"]["ready_ms"]["p50"] - 1
+        print(f"  {'cold_start (import to ready)':32} {change * 100:+.1f}%")
+
+
+async def main(args, scenarios):
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "seed_claims": args.seed_claims
+        },
+        "scenarios": await run_load(args, scenarios) if scenarios else {},
+        "micro": await run_micro(args.micro_iterations) if args.micro_iterations else {},
+        "cold_start": run_cold_starts(args.cold_starts) if args.cold_starts else {}
+    }
+
+    from app.langgraph.claim_agent import LANGGRAPH_AVAILABLE
+    results["meta"]["langgraph_enabled"] = LANGGRAPH_AVAILABLE
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    # Add the current directory to Python path
+    current_dir = Path(__file__).parent
+    sys.path.insert(0, str(current_dir))
+
+    args = parse_args()
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        sys.exit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    # Must be set before the app (and its database client) is imported
+    os.environ["DATABASE_BACKEND"] = "memory"
+    os.environ["MEMORY_DB_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["MEMORY_DB_JITTER_MS"] = str(args.jitter_ms)
+
+    sys.exit(asyncio.run(main(args, scenarios)))
@@ -0,0 +1,86 @@
+"""
+Bulk claim export from the command line
+
+Examples:
+    python export_claims.py claims.ndjson
+    python export_claims.py book.parquet --include history,analysis
+    python export_claims.py - --format csv --status approved | gzip > approved.csv.gz
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Export claims as NDJSON, CSV or Parquet")
+    parser.add_argument("path", help="Output file, or - for stdout")
+    parser.add_argument("--format", choices=["ndjson", "csv", "parquet"], help="Defaults to the file extension")
+    parser.add_argument("--include", default="", help="Comma-separated extras: history, analysis")
+    parser.add_argument("--status", help="Only claims with this status")
+    parser.add_argument("--type", dest="claim_type", help="Only claims of this type")
+    parser.add_argument("--user-id", help="Only claims belonging to this user")
+    parser.add_argument("--limit", type=int, help="Stop after this many claims")
+    parser.add_argument("--page-size", type=int, help="Claims fetched and encoded per round-trip")
+    return parser.parse_args()
+
+
+def detect_format(path: str):
+    suffix = Path(path).suffix.lower()
+    if suffix in (".ndjson", ".jsonl"):
+        return "ndjson"
+    if suffix in (".csv", ".parquet"):
+        return suffix[1:]
+    return None
+
+
+async def main(args, fmt, extras):
+    from app.database import get_supabase, close_db
+    from app.claim_export import export_claims, make_encoder, ExportFormatError, EXPORT_PAGE_SIZE
+
+    try:
+        encoder = make_encoder(fmt, "analysis" in extras, "history" in extras)
+    except ExportFormatError as e:
+        sys.exit(str(e))
+
+    output = sys.stdout.buffer if args.path == "-" else open(args.path, "wb")
+    written = 0
+    try:
+        async for chunk in export_claims(
+            get_supabase(),
+            encoder,
+            status=args.status,
+            claim_type=args.claim_type,
+            user_id=args.user_id,
+            include_analysis="analysis" in extras,
+            include_history="history" in extras,
+            page_size=args.page_size or EXPORT_PAGE_SIZE,
+            limit=args.limit
+        ):
+            await asyncio.to_thread(output.write, chunk)
+            written += len(chunk)
+    finally:
+        await close_db()
+        if output is not sys.stdout.buffer:
+            output.close()
+
+    print(f"wrote {written} bytes", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    # Add the current directory to Python path
+    current_dir = Path(__file__).parent
+    sys.path.insert(0, str(current_dir))
+
+    args = parse_args()
+    fmt = args.format or detect_format(args.path)
+    if fmt is None:
+        sys.exit("Cannot tell the output format; pass --format ndjson, csv or parquet")
+
+    extras = {item.strip() for item in args.include.split(",") if item.strip()}
+    if extras - {"history", "analysis"}:
+        sys.exit(f"Unknown --include: {', '.join(sorted(extras - {'history', 'analysis'}))}")
+
+    sys.exit(asyncio.run(main(args, fmt, extras)))
@@ -0,0 +1,103 @@
+"""
+Bulk claim import from the command line
+
+Examples:
+    python import_claims.py legacy_claims.csv --imported-by <admin id>
+    python import_claims.py claims.ndjson --imported-by <id> --analyze --errors errors.ndjson
+    zcat claims.csv.gz | python import_claims.py - --format csv --imported-by <id>
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Import claims from a CSV or NDJSON file")
+    parser.add_argument("path", help="CSV (with header row) or NDJSON file, or - for stdin")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="Defaults to the file extension")
+    parser.add_argument("--imported-by", required=True, help="Profile id recorded on the history entries")
+    parser.add_argument("--user-id", help="Owner for rows without a user_id column (default: --imported-by)")
+    parser.add_argument("--batch-size", type=int, help="Rows validated and inserted per round-trip")
+    parser.add_argument("--analyze", action="store_true", help="Run AI analysis on each imported batch")
+    parser.add_argument("--concurrency", type=int, help="Workflow runs in flight at once with --analyze")
+    parser.add_argument("--errors", help="Write rejected rows here as NDJSON (default: stderr)")
+    return parser.parse_args()
+
+
+def detect_format(path: str):
+    suffix = Path(path).suffix.lower()
+    if suffix == ".csv":
+        return "csv"
+    if suffix in (".ndjson", ".jsonl"):
+        return "ndjson"
+    return None
+
+
+async def read_chunks(stream):
+    """File contents in fixed-size chunks, read off the event loop"""
+    while chunk := await asyncio.to_thread(stream.read, READ_CHUNK_SIZE):
+        yield chunk
+
+
+async def main(args, fmt):
+    from app.database import get_supabase, close_db
+    from app.langgraph.claim_agent import init_claim_agent, load_agent_config
+    from app.batch_processing import AI_BATCH_CONCURRENCY
+    from app.claim_import import import_claims, IMPORT_BATCH_SIZE
+    from app.log_writer import ai_log_writer
+
+    errors_file = open(args.errors, "w") if args.errors else sys.stderr
+    source = sys.stdin.buffer if args.path == "-" else open(args.path, "rb")
+
+    def on_error(row, message):
+        errors_file.write(json.dumps({"row": row, "error": message}) + "\n")
+
+    def report(summary):
+        print(f"rows={summary['total']} imported={summary['imported']} failed={summary['failed']} analyzed={summary['analyzed']}", flush=True)
+
+    agent = init_claim_agent(await load_agent_config(get_supabase())) if args.analyze else None
+    await ai_log_writer.start()
+    try:
+        summary = await import_claims(
+            get_supabase(),
+            read_chunks(source),
+            fmt,
+            imported_by=args.imported_by,
+            owner_id=args.user_id,
+            batch_size=args.batch_size or IMPORT_BATCH_SIZE,
+            analyze=args.analyze,
+            agent=agent,
+            concurrency=args.concurrency or AI_BATCH_CONCURRENCY,
+            on_error=on_error,
+            on_batch=report
+        )
+    finally:
+        await ai_log_writer.stop()
+        await close_db()
+        if source is not sys.stdin.buffer:
+            source.close()
+        if errors_file is not sys.stderr:
+            errors_file.close()
+
+    summary.pop("errors")
+    summary.pop("errors_truncated")
+    print(json.dumps(summary))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    # Add the current directory to Python path
+    current_dir = Path(__file__).parent
+    sys.path.insert(0, str(current_dir))
+
+    args = parse_args()
+    fmt = args.format or detect_format(args.path)
+    if fmt is None:
+        sys.exit("Cannot tell the file format; pass --format csv or --format ndjson")
+
+    sys.exit(asyncio.run(main(args, fmt)))
@@ -1,22 +1,200 @@
 """
 Entry point for the Insurance Claim System backend
+
+Examples:
+    python run.py                           # development: one process, auto-reload
+    python run.py --prod                    # production: one worker per CPU
+    python run.py --prod --workers 8 --port 8080
+
+In production mode the app and the default AI workflow are imported and
+compiled once in the parent process, which then binds the listening socket and
+forks the workers, so every worker shares those pages copy-on-write and accepts
+from the same socket. Workers run on uvloop/httptools when they are installed
+(uvicorn[standard]). SIGTERM or SIGINT stops accepting connections, lets
+in-flight requests finish (SERVER_GRACEFUL_TIMEOUT) and drains queued AI jobs
+(AI_JOB_DRAIN_TIMEOUT) before the workers exit. A worker that dies is replaced;
+workers that die during startup are restarted with exponential backoff, and
+after SERVER_MAX_FAILED_STARTS in a row the server gives up and exits.
+With more than one worker the AI job store is always the shared SQLite one.
 """
 
 import uvicorn
+import argparse
 import os
+import sys
 from pathlib import Path
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "0")) or os.cpu_count() or 1
+SERVER_BACKLOG = int(os.getenv("SERVER_BACKLOG", "2048"))
+# Longer than the load balancer's idle timeout, so it never reuses a closed connection
+SERVER_KEEPALIVE = int(os.getenv("SERVER_KEEPALIVE", "75"))
+SERVER_GRACEFUL_TIMEOUT = int(os.getenv("SERVER_GRACEFUL_TIMEOUT", "30"))
+# Restart a worker after this many requests (0 = never)
+SERVER_MAX_REQUESTS = int(os.getenv("SERVER_MAX_REQUESTS", "0"))
+# A worker exiting within this many seconds of being started counts as a failed start
+SERVER_MIN_UPTIME = float(os.getenv("SERVER_MIN_UPTIME", "10"))
+SERVER_MAX_FAILED_STARTS = int(os.getenv("SERVER_MAX_FAILED_STARTS", "5"))
+RESTART_BACKOFF_MAX = 30.0
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the API server")
+    parser.add_argument("--prod", action="store_true", help="Pre-forked multi-worker server without reload")
+    parser.add_argument("--host", help="Bind address (production default SERVER_HOST)")
+    parser.add_argument("--port", type=int, default=SERVER_PORT, help="Bind port")
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS, help="Worker processes (default: CPU count)")
+    parser.add_argument("--backlog", type=int, default=SERVER_BACKLOG, help="Listen queue length")
+    parser.add_argument("--keep-alive", type=int, default=SERVER_KEEPALIVE, help="Idle keep-alive timeout, seconds")
+    parser.add_argument("--graceful-timeout", type=int, default=SERVER_GRACEFUL_TIMEOUT,
+                        help="Seconds in-flight requests get to finish on shutdown")
+    parser.add_argument("--max-requests", type=int, default=SERVER_MAX_REQUESTS,
+                        help="Recycle a worker after this many requests (0 = never)")
+    return parser.parse_args()
+
+
+def serve(args):
+    """Preload the app, bind once and supervise forked workers until signalled"""
+    import gc
+    import signal
+    import time
+
+    # Must be settled before app.jobs builds its store during the preload
+    if args.workers > 1 and os.getenv("AI_JOB_BACKEND", "memory") == "memory":
+        # Per-process job records would 404 on every worker but the one that queued the job
+        print("⚠️  AI_JOB_BACKEND=memory cannot be shared by workers; using sqlite", flush=True)
+        os.environ["AI_JOB_BACKEND"] = "sqlite"
+
+    # Preload: imports and the default workflow are built once, before fork
+    from app.main import app
+    from app.langgraph.claim_agent import init_claim_agent
+    from app.jobs import AI_JOB_DRAIN_TIMEOUT
+    init_claim_agent()
+    # Keep preloaded objects out of the collector so its writes don't unshare their pages
+    gc.freeze()
+
+    config = uvicorn.Config(
+        app,
+        host=args.host or SERVER_HOST,
+        port=args.port,
+        loop="auto",
+        http="auto",
+        lifespan="on",
+        backlog=args.backlog,
+        timeout_keep_alive=args.keep_alive,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        limit_max_requests=args.max_requests or None,
+        log_level="info"
+    )
+    sock = config.bind_socket()
+
+    def spawn() -> int:
+        # Held across the fork so a signal cannot reach the child while it
+        # still has the supervisor's handlers
+        signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGINT, signal.SIGTERM})
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGALRM, signal.SIG_DFL)
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGINT, signal.SIGTERM})
+            exit_status = 1
+            try:
+                # uvicorn installs its own handlers: finish requests, then run the lifespan shutdown
+                uvicorn.Server(config).run(sockets=[sock])
+                exit_status = 0
+            except SystemExit as e:
+                # e.g. sys.exit(3) on a failed lifespan startup
+                exit_status = e.code if isinstance(e.code, int) else 1
+            finally:
+                # Never fall back into the supervisor loop in a worker
+                os._exit(exit_status)
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGINT, signal.SIGTERM})
+        return pid
+
+    def signal_workers(signum):
+        for pid in list(workers):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                # Exited, not yet reaped
+                pass
+
+    # pid -> when it was started
+    workers = {}
+    stopping = False
+    failed_starts = 0
+    exit_code = 0
+
+    def stop(signum, frame):
+        nonlocal stopping
+        if stopping:
+            return
+        stopping = True
+        print(f"Shutting down {len(workers)} workers", flush=True)
+        signal_workers(signal.SIGTERM)
+        # Requests, then queued AI jobs, then a margin for the lifespan shutdown
+        signal.alarm(int(args.graceful_timeout + AI_JOB_DRAIN_TIMEOUT) + 10)
+
+    def kill(signum, frame):
+        signal_workers(signal.SIGKILL)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGALRM, kill)
+
+    for _ in range(max(args.workers, 1)):
+        workers[spawn()] = time.monotonic()
+    print(f"Started {len(workers)} workers (pid {os.getpid()})", flush=True)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started = workers.pop(pid, None)
+        if stopping:
+            continue
+
+        if started is not None and time.monotonic() - started < SERVER_MIN_UPTIME:
+            failed_starts += 1
+        else:
+            failed_starts = 0
+        if failed_starts >= SERVER_MAX_FAILED_STARTS:
+            # Bad config or a broken startup: restarting again will not help
+            print(f"Workers failed to start {failed_starts} times in a row; giving up", flush=True)
+            exit_code = 1
+            stop(None, None)
+            continue
+
+        delay = min(0.5 * 2 ** failed_starts, RESTART_BACKOFF_MAX) if failed_starts else 0
+        print(f"Worker {pid} exited with status {status}; starting a replacement in {delay:g}s", flush=True)
+        time.sleep(delay)
+        if not stopping:
+            workers[spawn()] = time.monotonic()
+
+    sock.close()
+    return exit_code
+
 
 if __name__ == "__main__":
     # Add the current directory to Python path
-    import sys
     current_dir = Path(__file__).parent
     sys.path.insert(0, str(current_dir))
-    
-    # Start the server
+
+    args = parse_args()
+    if args.prod:
+        sys.exit(serve(args))
+
+    # Start the development server
     uvicorn.run(
         "app.main:app",
-        host="127.0.0.1",
-        port=8000,
+        host=args.host or "127.0.0.1",
+        port=args.port,
         reload=True,
         log_level="info"
-    )
\ No newline at end of file
+    )
@@ -0,0 +1,78 @@
+"""
+Shared fixtures. Every test runs on the in-memory backend
+(DATABASE_BACKEND=memory), so no Supabase project or network is needed.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# Must be set before app.database is imported
+os.environ["DATABASE_BACKEND"] = "memory"
+os.environ["AI_JOB_BACKEND"] = "memory"
+os.environ["CACHE_BACKEND"] = "memory"
+
+# Make `app` importable however pytest is started
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.testclient import TestClient
+from types import SimpleNamespace
+from typing import Dict, Tuple
+import pytest
+import uuid
+
+from app import database
+from app.memory_database import MemoryClient
+
+
+@pytest.fixture
+def store(monkeypatch) -> MemoryClient:
+    """A fresh in-memory database behind get_supabase() and get_supabase_anon()"""
+    client = MemoryClient()
+    monkeypatch.setattr(database, "_supabase", client)
+    monkeypatch.setattr(database, "_supabase_anon", client)
+    return client
+
+
+@pytest.fixture
+def make_user(store):
+    """Create a user with a profile; returns (user id, Authorization headers)"""
+    def create(role: str = "customer") -> Tuple[str, Dict[str, str]]:
+        user_id = str(uuid.uuid4())
+        email = f"{user_id}@example.com"
+        store.auth.users[user_id] = SimpleNamespace(id=user_id, email=email, user_metadata={})
+        store.tables.setdefault("profiles", []).append({
+            "id": user_id, "full_name": "Test User", "role": role, "phone": None, "address": None
+        })
+        return user_id, {"Authorization": f"Bearer {store.auth.issue_token(user_id)}"}
+    return create
+
+
+@pytest.fixture
+def client(store):
+    """API client with the app lifespan running"""
+    from app.main import app
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def claim_row(user_id: str, **overrides) -> dict:
+    """A claims row as stored by create_claim_with_history"""
+    row = {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "claim_number": f"CLM-TEST-{uuid.uuid4().hex[:8].upper()}",
+        "type": "auto",
+        "status": "submitted",
+        "priority": "medium",
+        "amount": 1000.0,
+        "description": "Rear-ended at a junction",
+        "incident_date": "2024-01-01",
+        "submitted_date": "2024-01-02T00:00:00+00:00",
+        "metadata": {},
+        "ai_analysis": {},
+        "created_at": "2024-01-02T00:00:00+00:00",
+        "updated_at": "2024-01-02T00:00:00+00:00"
+    }
+    row.update(overrides)
+    return row
@@ -0,0 +1,44 @@
+from app.batch_processing import fetch_claims_page, process_claims_batch
+from app.langgraph.claim_agent import AI_CLAIM_COLUMNS, get_claim_agent
+from conftest import claim_row
+import pytest
+import uuid
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_fetch_claims_page_walks_by_id(store):
+    user_id = str(uuid.uuid4())
+    store.tables["claims"] = [claim_row(user_id) for _ in range(7)]
+    expected = sorted(row["id"] for row in store.tables["claims"])
+
+    seen, after_id = [], None
+    # Bounded, so a cursor that does not advance fails instead of spinning
+    for _ in range(5):
+        page = await fetch_claims_page(store, after_id=after_id, limit=3)
+        if not page:
+            break
+        seen.extend(row["id"] for row in page)
+        after_id = page[-1]["id"]
+
+    assert seen == expected
+
+
+async def test_fetch_claims_page_selects_only_requested_columns(store):
+    store.tables["claims"] = [claim_row(str(uuid.uuid4()), metadata={"big": "x" * 1000})]
+
+    page = await fetch_claims_page(store, columns=AI_CLAIM_COLUMNS)
+
+    assert set(page[0]) == set(AI_CLAIM_COLUMNS.split(","))
+
+
+async def test_batch_analyses_every_matching_claim_once(store):
+    user_id = str(uuid.uuid4())
+    store.tables["claims"] = [claim_row(user_id) for _ in range(9)] + [claim_row(user_id, status="approved")]
+
+    summary = await process_claims_batch(store, get_claim_agent(), status="submitted", page_size=4, concurrency=2)
+
+    assert summary["processed"] == 9 and summary["failed"] == 0
+    assert len({result["claim_id"] for result in summary["results"]}) == 9
+    analysed = [row for row in store.tables["claims"] if row["ai_analysis"]]
+    assert len(analysed) == 9 and all(row["status"] == "submitted" for row in analysed)
@@ -0,0 +1,119 @@
+from app.claim_import import ImportFormatError, RecordTooLongError, import_claims, iter_lines
+import pytest
+import uuid
+
+pytestmark = pytest.mark.asyncio
+
+HEADER = "type,amount,description,incident_date\n"
+
+
+async def chunked(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def run_import(store, text: str, fmt: str = "csv", chunk_size: int = 7, **kwargs):
+    return await import_claims(store, chunked(text.encode(), chunk_size), fmt, imported_by=str(uuid.uuid4()), **kwargs)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 5, 4096])
+async def test_iter_lines_splits_on_every_line_ending(chunk_size):
+    data = "a\r\nb\rc\nd\u2028e\r".encode()
+
+    lines = [line async for line in iter_lines(chunked(data, chunk_size))]
+
+    # U+2028 may appear raw inside JSON strings, so it never ends a line
+    assert lines == ["a\r\n", "b\r", "c\n", "d\u2028e\r"]
+
+
+async def test_iter_lines_replaces_overlong_lines():
+    data = b"x" * 100 + b"\nok\n"
+
+    lines = [line async for line in iter_lines(chunked(data, 8), max_length=20)]
+
+    assert isinstance(lines[0], RecordTooLongError)
+    assert lines[1:] == ["ok\n"]
+
+
+async def test_csv_rows_are_imported_and_bad_rows_reported(store):
+    text = (
+        HEADER
+        + "auto,100,Bumper,2024-01-01\n"
+        + "boat,100,Unknown type,2024-01-01\n"
+        + "home,abc,Bad amount,2024-01-01\n"
+        + "health,200,\"Two\nlines, quoted\",2024-01-02\n"
+        + "auto,50\n"
+    )
+
+    summary = await run_import(store, text)
+
+    assert (summary["total"], summary["imported"], summary["failed"]) == (5, 2, 3)
+    assert [error["row"] for error in summary["errors"]] == [2, 3, 5]
+    assert any(claim["description"] == "Two\nlines, quoted" for claim in store.tables["claims"])
+    assert len(store.tables["claim_history"]) == 2
+
+
+async def test_csv_with_cr_line_endings(store):
+    text = HEADER.replace("\n", "\r") + "auto,100,One,2024-01-01\rlife,200,Two,2024-01-01\r"
+
+    summary = await run_import(store, text)
+
+    assert summary["imported"] == 2 and summary["failed"] == 0
+
+
+async def test_stray_quote_in_unquoted_field_does_not_swallow_rows(store):
+    text = HEADER + 'auto,100,Cracked 5" screen,2024-01-01\n' + "auto,200,Next row,2024-01-01\n"
+
+    summary = await run_import(store, text)
+
+    assert summary["imported"] == 2
+    assert {claim["description"] for claim in store.tables["claims"]} == {'Cracked 5" screen', "Next row"}
+
+
+async def test_overlong_record_is_a_row_error(store):
+    # An unterminated quote would otherwise run to the end of the file
+    text = HEADER + 'auto,100,"never closed,2024-01-01\n' + "auto,1,filler,2024-01-01\n" * 5
+
+    summary = await run_import(store, text, max_record_length=64)
+
+    assert summary["errors"][0]["row"] == 1
+    assert "longer than 64" in summary["errors"][0]["error"]
+    assert summary["imported"] >= 1
+
+
+async def test_file_ending_inside_quotes_reports_the_last_row(store):
+    text = HEADER + "auto,100,Fine,2024-01-01\n" + 'auto,100,"open\n'
+
+    summary = await run_import(store, text)
+
+    assert summary["imported"] == 1
+    assert summary["errors"] == [{"row": 2, "error": "File ends inside a quoted CSV field"}]
+
+
+async def test_ndjson_invalid_lines_are_reported(store):
+    text = (
+        '{"type": "auto", "amount": 10, "description": "One", "incident_date": "2024-01-01"}\r\n'
+        '{"type": "auto", "amount": \n'
+        '\n'
+        '["not", "an", "object"]\n'
+        '{"type": "life", "amount": 20, "description": "Two", "incident_date": "2024-01-01"}'
+    )
+
+    summary = await run_import(store, text, fmt="ndjson")
+
+    assert summary["imported"] == 2
+    assert [error["row"] for error in summary["errors"]] == [2, 3]
+
+
+async def test_errors_beyond_the_limit_are_counted(store):
+    text = HEADER + "boat,1,x,2024-01-01\n" * 5
+
+    summary = await run_import(store, text, max_errors=2)
+
+    assert summary["failed"] == 5 and len(summary["errors"]) == 2
+    assert summary["errors_truncated"] is True
+
+
+async def test_unreadable_header_aborts(store):
+    with pytest.raises(ImportFormatError):
+        await run_import(store, HEADER + "auto,1,x,2024-01-01\n", max_record_length=8)
@@ -0,0 +1,93 @@
+from conftest import claim_row
+
+
+def test_create_claim_returns_created_row(client, store, make_user):
+    user_id, headers = make_user()
+
+    response = client.post("/claims/", headers=headers, json={
+        "type": "auto", "amount": 2500, "description": "Hail damage", "incident_date": "2024-03-01"
+    })
+
+    assert response.status_code == 200
+    claim = response.json()
+    assert claim["user_id"] == user_id
+    assert claim["status"] == "submitted"
+    assert claim["claim_number"].startswith("CLM-")
+    history = [entry for entry in store.tables["claim_history"] if entry["claim_id"] == claim["id"]]
+    assert [entry["action"] for entry in history] == ["Claim submitted"]
+
+
+def seed_claims(store, user_id, count):
+    # Pairs share a created_at so the id tie-break is exercised
+    store.tables["claims"] = [
+        claim_row(user_id, created_at=f"2024-01-{1 + i // 2:02d}T00:00:00+00:00", amount=float(i))
+        for i in range(count)
+    ]
+    return sorted(store.tables["claims"], key=lambda row: (row["created_at"], row["id"]), reverse=True)
+
+
+def test_cursor_pages_cover_every_claim_once_in_order(client, store, make_user):
+    user_id, headers = make_user()
+    expected = seed_claims(store, user_id, 25)
+    store.tables["claims"].append(claim_row(make_user()[0]))
+
+    seen, cursor, pages = [], "", 0
+    while cursor is not None:
+        response = client.get("/claims/", headers=headers, params={"per_page": 10, "cursor": cursor})
+        assert response.status_code == 200
+        body = response.json()
+        # Cursor mode skips the count unless asked for
+        assert body.get("total") is None
+        seen.extend(claim["id"] for claim in body["claims"])
+        cursor = body.get("next_cursor")
+        pages += 1
+
+    assert pages == 3
+    assert seen == [row["id"] for row in expected]
+
+
+def test_cursor_pagination_can_still_count(client, store, make_user):
+    user_id, headers = make_user()
+    seed_claims(store, user_id, 5)
+
+    body = client.get("/claims/", headers=headers, params={"cursor": "", "per_page": 2, "count": "exact"}).json()
+
+    assert body["total"] == 5
+    assert len(body["claims"]) == 2
+
+
+def test_malformed_cursor_is_rejected(client, store, make_user):
+    _, headers = make_user()
+
+    response = client.get("/claims/", headers=headers, params={"cursor": "not-a-cursor"})
+
+    assert response.status_code == 400
+
+
+def test_list_omits_large_columns_by_default(client, store, make_user):
+    user_id, headers = make_user()
+    seed_claims(store, user_id, 3)
+
+    claims = client.get("/claims/", headers=headers).json()["claims"]
+
+    assert claims and all("metadata" not in claim and "ai_analysis" not in claim for claim in claims)
+    assert all("claim_number" in claim for claim in claims)
+
+
+def test_fields_limit_the_returned_columns(client, store, make_user):
+    user_id, headers = make_user()
+    seed_claims(store, user_id, 3)
+
+    claims = client.get("/claims/", headers=headers, params={"fields": "amount,ai_analysis"}).json()["claims"]
+
+    # id and created_at are always selected for the cursor
+    assert all(set(claim) == {"id", "created_at", "amount", "ai_analysis"} for claim in claims)
+
+
+def test_unknown_fields_are_rejected(client, store, make_user):
+    _, headers = make_user()
+
+    response = client.get("/claims/", headers=headers, params={"fields": "amount,password"})
+
+    assert response.status_code == 400
+    assert "password" in response.json()["detail"]
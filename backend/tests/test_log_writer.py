@@ -0,0 +1,96 @@
+from app.log_writer import AILogWriter
+from postgrest import APIError
+import pytest
+
+pytestmark = pytest.mark.asyncio
+
+
+class FlakyLogTable:
+    """Insert stand-in: rejects rows for claim "bad" like an FK violation, or
+    fails every request while `down` is set"""
+
+    def __init__(self):
+        self.down = False
+        self.rows = []
+        self.requests = 0
+
+    async def insert(self, rows):
+        self.requests += 1
+        if self.down:
+            raise APIError({"message": "upstream unavailable", "code": "503"})
+        if any(row["claim_id"] == "bad" for row in rows):
+            raise APIError({"message": "violates foreign key constraint", "code": "23503"})
+        self.rows.extend(rows)
+
+
+@pytest.fixture
+def table(monkeypatch):
+    table = FlakyLogTable()
+    monkeypatch.setattr(AILogWriter, "_insert", lambda writer, rows: table.insert(rows))
+    return table
+
+
+def entries(*claim_ids):
+    return [{"claim_id": claim_id, "status": "success"} for claim_id in claim_ids]
+
+
+async def test_flush_writes_in_batches(table):
+    writer = AILogWriter(batch_size=2)
+    writer.write(entries("a", "b", "c"))
+
+    await writer.flush()
+
+    assert [row["claim_id"] for row in table.rows] == ["a", "b", "c"]
+    assert table.requests == 2 and writer.pending == 0
+    assert all(row["processed_at"] for row in table.rows)
+
+
+async def test_rejected_rows_are_dropped_and_the_rest_written(table):
+    writer = AILogWriter(batch_size=10)
+    writer.write(entries("a", "bad", "b"))
+
+    await writer.flush()
+
+    assert [row["claim_id"] for row in table.rows] == ["a", "b"]
+    assert writer.rejected == 1 and writer.pending == 0
+
+    # Later flushes are not blocked by the bad row
+    writer.write(entries("c"))
+    await writer.flush()
+    assert table.rows[-1]["claim_id"] == "c"
+
+
+async def test_entries_are_kept_while_the_database_is_down(table):
+    writer = AILogWriter(batch_size=10)
+    writer.write(entries("a", "b"))
+    table.down = True
+
+    await writer.flush()
+
+    assert writer.pending == 2 and writer.rejected == 0 and table.rows == []
+
+    table.down = False
+    await writer.flush()
+    assert [row["claim_id"] for row in table.rows] == ["a", "b"]
+
+
+async def test_buffer_drops_oldest_entries_beyond_its_cap(table):
+    writer = AILogWriter(batch_size=100, max_buffer=3)
+    table.down = True
+
+    writer.write(entries("a", "b", "c", "d", "e"))
+    await writer.flush()
+
+    assert writer.pending == 3 and writer.dropped == 2
+    table.down = False
+    await writer.flush()
+    assert [row["claim_id"] for row in table.rows] == ["c", "d", "e"]
+
+
+async def test_hash_mode_replaces_input_data(table):
+    writer = AILogWriter(input_mode="hash")
+    writer.write([{"claim_id": "a", "input_data": {"description": "long text"}}])
+
+    await writer.flush()
+
+    assert set(table.rows[0]["input_data"]) == {"sha256"}
@@ -0,0 +1,76 @@
+"""
+The in-memory backend must answer in the shapes postgrest-py produces for the
+real database, or code that passes here breaks against Supabase.
+"""
+
+from conftest import claim_row
+from postgrest import APIError
+from postgrest.base_request_builder import APIResponse
+import pytest
+import uuid
+
+pytestmark = pytest.mark.asyncio
+
+NEW_CLAIM = {
+    "type": "auto", "priority": "high", "amount": 1200.0, "description": "Cracked windscreen",
+    "incident_date": "2024-02-01", "metadata": {}
+}
+
+
+async def test_create_claim_with_history_returns_a_row_list(store):
+    user_id = str(uuid.uuid4())
+
+    response = await store.rpc("create_claim_with_history", {"claim": NEW_CLAIM, "submitted_by": user_id}).execute()
+
+    # RETURNS SETOF public.claims: a list even for one row
+    assert isinstance(response, APIResponse)
+    assert isinstance(response.data, list) and len(response.data) == 1
+    claim = response.data[0]
+    assert claim["user_id"] == user_id and claim["priority"] == "high"
+    assert store.tables["claim_history"][0]["claim_id"] == claim["id"]
+
+
+async def test_bulk_create_returns_the_new_ids(store):
+    user_id = str(uuid.uuid4())
+    rows = [{**NEW_CLAIM, "id": str(uuid.uuid4())} for _ in range(3)]
+
+    response = await store.rpc("bulk_create_claims_with_history", {"claim_rows": rows, "submitted_by": user_id}).execute()
+
+    assert response.data == [row["id"] for row in rows]
+    assert len(store.tables["claim_history"]) == 3
+
+
+async def test_bulk_create_is_all_or_nothing(store):
+    user_id = str(uuid.uuid4())
+    existing = claim_row(user_id)
+    store.tables["claims"] = [existing]
+
+    with pytest.raises(APIError):
+        await store.rpc("bulk_create_claims_with_history", {
+            "claim_rows": [{**NEW_CLAIM, "id": str(uuid.uuid4())}, {**NEW_CLAIM, "id": existing["id"]}],
+            "submitted_by": user_id
+        }).execute()
+
+    assert len(store.tables["claims"]) == 1
+
+
+async def test_bulk_update_ai_analysis_returns_updated_ids(store):
+    rows = [claim_row(str(uuid.uuid4())) for _ in range(2)]
+    store.tables["claims"] = rows
+
+    response = await store.rpc("bulk_update_ai_analysis", {
+        "results": {rows[0]["id"]: {"next_action": "investigate"}, str(uuid.uuid4()): {}}
+    }).execute()
+
+    assert response.data == [rows[0]["id"]]
+    assert rows[0]["ai_analysis"] == {"next_action": "investigate"}
+
+
+async def test_unknown_function_raises(store):
+    with pytest.raises(APIError):
+        await store.rpc("no_such_function", {}).execute()
+
+
+async def test_single_raises_when_no_row_matches(store):
+    with pytest.raises(APIError):
+        await store.table("claims").select("*").eq("id", str(uuid.uuid4())).single().execute()
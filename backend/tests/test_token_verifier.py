@@ -0,0 +1,136 @@
+from app import token_verifier as token_verifier_module
+from app.token_verifier import TokenVerifier
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from jose import JWTError, jwk, jwt
+import asyncio
+import httpx
+import pytest
+import time
+
+pytestmark = pytest.mark.asyncio
+
+JWKS_URL = "https://project.supabase.co/auth/v1/.well-known/jwks.json"
+
+
+def claims(**overrides):
+    return {"sub": "user-1", "aud": "authenticated", "exp": int(time.time()) + 300, **overrides}
+
+
+@pytest.fixture
+def ec_key():
+    """An ES256 signing key and its public JWK, published without an alg"""
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    pem = private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    public_jwk = jwk.construct(public_pem, "ES256").to_dict()
+    public_jwk.pop("alg", None)
+    return pem, {**public_jwk, "kid": "key-1"}
+
+
+@pytest.fixture
+def jwks_server(monkeypatch):
+    """Stands in for the JWKS endpoint; set `keys`, or `down` to fail requests"""
+    server = type("JWKSServer", (), {"keys": [], "down": False, "fetches": 0})()
+
+    class Client:
+        def __init__(self, **kwargs):
+            pass
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc_info):
+            return None
+
+        async def get(self, url):
+            server.fetches += 1
+            await asyncio.sleep(0.01)
+            if server.down:
+                raise httpx.ConnectError("connection refused")
+            return httpx.Response(200, json={"keys": server.keys}, request=httpx.Request("GET", url))
+
+    monkeypatch.setattr(token_verifier_module.httpx, "AsyncClient", Client)
+    return server
+
+
+async def test_hs256_tokens_are_verified_and_cached():
+    verifier = TokenVerifier(jwt_secret="secret", jwks_url=None)
+    token = jwt.encode(claims(email="a@example.com"), "secret", algorithm="HS256")
+
+    user = await verifier.verify(token)
+
+    assert (user.id, user.email) == ("user-1", "a@example.com")
+    assert verifier._cached(verifier._cache_key(token)) is user
+
+
+async def test_expired_and_forged_tokens_raise():
+    verifier = TokenVerifier(jwt_secret="secret", jwks_url=None)
+
+    with pytest.raises(JWTError):
+        await verifier.verify(jwt.encode(claims(exp=int(time.time()) - 10), "secret", algorithm="HS256"))
+    with pytest.raises(JWTError):
+        await verifier.verify(jwt.encode(claims(), "other-secret", algorithm="HS256"))
+
+
+async def test_jwks_key_without_alg_is_pinned_to_its_curve(jwks_server, ec_key):
+    pem, public_jwk = ec_key
+    jwks_server.keys = [public_jwk]
+    verifier = TokenVerifier(jwt_secret=None, jwks_url=JWKS_URL)
+
+    token = jwt.encode(claims(), pem, algorithm="ES256", headers={"kid": "key-1"})
+    assert (await verifier.verify(token)).id == "user-1"
+
+    # The header's alg is never used to pick how the key is applied
+    forged = jwt.encode(claims(), "anything", algorithm="HS384", headers={"kid": "key-1"})
+    with pytest.raises(JWTError):
+        await verifier.verify(forged)
+
+
+async def test_keys_without_a_known_algorithm_are_not_used(jwks_server):
+    jwks_server.keys = [{"kty": "OKP", "crv": "Ed25519", "x": "abc", "kid": "key-1"}]
+    verifier = TokenVerifier(jwt_secret=None, jwks_url=JWKS_URL)
+
+    token = jwt.encode(claims(), "secret", algorithm="HS512", headers={"kid": "key-1"})
+
+    # Left to the auth server
+    assert await verifier.verify(token) is None
+
+
+async def test_jwks_outage_is_fetched_once_per_interval(jwks_server):
+    jwks_server.down = True
+    verifier = TokenVerifier(jwt_secret=None, jwks_url=JWKS_URL)
+
+    keys = await asyncio.gather(*(verifier._signing_key({"alg": "ES256", "kid": f"kid-{i}"}) for i in range(50)))
+    for i in range(50):
+        await verifier._signing_key({"alg": "ES256", "kid": f"other-{i}"})
+
+    assert set(keys) == {None}
+    assert jwks_server.fetches == 1
+
+
+async def test_unknown_kids_do_not_refetch_within_the_interval(jwks_server, ec_key):
+    jwks_server.keys = [ec_key[1]]
+    verifier = TokenVerifier(jwt_secret=None, jwks_url=JWKS_URL)
+
+    assert await verifier._signing_key({"alg": "ES256", "kid": "key-1"}) == ec_key[1]
+    for i in range(20):
+        assert await verifier._signing_key({"alg": "ES256", "kid": f"rotated-{i}"}) is None
+
+    assert jwks_server.fetches == 1
+
+
+async def test_unknown_kid_refetches_after_the_interval(jwks_server, ec_key, monkeypatch):
+    verifier = TokenVerifier(jwt_secret=None, jwks_url=JWKS_URL)
+    assert await verifier._signing_key({"alg": "ES256", "kid": "key-1"}) is None
+
+    # Key rotated in; the next lookup after the interval picks it up
+    jwks_server.keys = [ec_key[1]]
+    monkeypatch.setattr(token_verifier_module, "JWKS_MIN_REFRESH_INTERVAL", 0)
+
+    assert await verifier._signing_key({"alg": "ES256", "kid": "key-1"}) == ec_key[1]
+    assert jwks_server.fetches == 2
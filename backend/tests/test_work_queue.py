@@ -0,0 +1,82 @@
+from app.work_queue import assigned_claims, claim_next, release_claim
+from conftest import claim_row
+from datetime import datetime, timedelta, timezone
+import pytest
+import uuid
+
+
+@pytest.fixture
+def queue(store):
+    owner = str(uuid.uuid4())
+    rows = {
+        "low": claim_row(owner, priority="low"),
+        "old": claim_row(owner, submitted_date="2024-01-01T00:00:00+00:00"),
+        "new": claim_row(owner, submitted_date="2024-03-01T00:00:00+00:00"),
+        "investigate": claim_row(owner, submitted_date="2024-06-01T00:00:00+00:00", ai_analysis={"next_action": "investigate"}),
+        "urgent": claim_row(owner, priority="urgent", submitted_date="2024-09-01T00:00:00+00:00"),
+        "closed": claim_row(owner, priority="urgent", status="approved")
+    }
+    store.tables["claims"] = list(rows.values())
+    return {name: row["id"] for name, row in rows.items()}
+
+
+@pytest.mark.asyncio
+async def test_claims_come_out_in_queue_order(store, queue):
+    claims = await claim_next(store, str(uuid.uuid4()), max_claims=10)
+
+    assert [claim["id"] for claim in claims] == [
+        queue["urgent"], queue["investigate"], queue["old"], queue["new"], queue["low"]
+    ]
+
+
+@pytest.mark.asyncio
+async def test_agents_never_share_a_claim(store, queue):
+    first, second = str(uuid.uuid4()), str(uuid.uuid4())
+
+    taken_first = await claim_next(store, first, max_claims=2)
+    taken_second = await claim_next(store, second, max_claims=10)
+
+    assert {claim["id"] for claim in taken_first}.isdisjoint(claim["id"] for claim in taken_second)
+    assert len(taken_first) + len(taken_second) == 5
+    assert [claim["id"] for claim in await assigned_claims(store, first)] == [queue["urgent"], queue["investigate"]]
+
+
+@pytest.mark.asyncio
+async def test_expired_lease_returns_claim_to_the_queue(store, queue):
+    first, second = str(uuid.uuid4()), str(uuid.uuid4())
+    [claim] = await claim_next(store, first)
+    row = next(row for row in store.tables["claims"] if row["id"] == claim["id"])
+    row["assigned_at"] = (datetime.now(timezone.utc) - timedelta(hours=1)).isoformat()
+
+    [retaken] = await claim_next(store, second, lease_seconds=60)
+
+    assert retaken["id"] == claim["id"] and retaken["assigned_to"] == second
+    assert await assigned_claims(store, first, lease_seconds=60) == []
+
+
+@pytest.mark.asyncio
+async def test_only_the_holder_can_release(store, queue):
+    holder, other = str(uuid.uuid4()), str(uuid.uuid4())
+    [claim] = await claim_next(store, holder)
+
+    assert await release_claim(store, other, claim["id"]) is False
+    assert await release_claim(store, holder, claim["id"]) is True
+
+    # Released claims go back to the head of the queue
+    [again] = await claim_next(store, other)
+    assert again["id"] == claim["id"]
+
+
+def test_queue_endpoints_require_an_agent(client, store, make_user, queue):
+    _, customer = make_user()
+    _, agent = make_user(role="agent")
+
+    assert client.post("/claims/queue/next", headers=customer).status_code == 403
+
+    response = client.post("/claims/queue/next", headers=agent, params={"count": 2})
+    assert response.status_code == 200
+    assert [claim["id"] for claim in response.json()] == [queue["urgent"], queue["investigate"]]
+
+    released = client.post(f"/claims/queue/{queue['urgent']}/release", headers=agent)
+    assert released.status_code == 200
+    assert [claim["id"] for claim in client.get("/claims/queue", headers=agent).json()] == [queue["investigate"]]
@@ -30,6 +30,8 @@ CREATE TABLE IF NOT EXISTS public.claims (
     submitted_date TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     metadata JSONB DEFAULT '{}',
     ai_analysis JSONB DEFAULT '{}',
+    assigned_to UUID REFERENCES public.profiles(id) ON DELETE SET NULL,
+    assigned_at TIMESTAMP WITH TIME ZONE,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
@@ -93,6 +95,11 @@ CREATE TABLE IF NOT EXISTS public.notifications (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Columns added after the first release; CREATE TABLE IF NOT EXISTS leaves
+-- existing tables alone, so add them here for databases set up earlier
+ALTER TABLE public.claims ADD COLUMN IF NOT EXISTS assigned_to UUID REFERENCES public.profiles(id) ON DELETE SET NULL;
+ALTER TABLE public.claims ADD COLUMN IF NOT EXISTS assigned_at TIMESTAMP WITH TIME ZONE;
+
 -- =====================================================
 -- 2. CREATE INDEXES
 -- =====================================================
@@ -103,6 +110,8 @@ CREATE INDEX IF NOT EXISTS idx_claims_status ON public.claims(status);
 CREATE INDEX IF NOT EXISTS idx_claims_type ON public.claims(type);
 CREATE INDEX IF NOT EXISTS idx_claims_created_at ON public.claims(created_at);
 CREATE INDEX IF NOT EXISTS idx_claims_claim_number ON public.claims(claim_number);
+CREATE INDEX IF NOT EXISTS idx_claims_user_created_id ON public.claims(user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_claims_assigned_to ON public.claims(assigned_to) WHERE assigned_to IS NOT NULL;
 
 CREATE INDEX IF NOT EXISTS idx_claim_history_claim_id ON public.claim_history(claim_id);
 CREATE INDEX IF NOT EXISTS idx_claim_history_performed_at ON public.claim_history(performed_at);
@@ -342,6 +351,180 @@ $$ LANGUAGE plpgsql SECURITY DEFINER;
 CREATE TRIGGER log_claim_status_changes AFTER UPDATE ON public.claims
     FOR EACH ROW EXECUTE FUNCTION log_claim_status_change();
 
+-- Function to store AI analysis for many claims in one statement
+-- results: {"<claim uuid>": <ai_analysis json>, ...}
+CREATE OR REPLACE FUNCTION public.bulk_update_ai_analysis(results JSONB)
+RETURNS SETOF UUID AS $$
+    UPDATE public.claims AS c
+    SET ai_analysis = r.value,
+        updated_at = NOW()
+    FROM jsonb_each(results) AS r
+    WHERE c.id = r.key::uuid
+    RETURNING c.id;
+$$ LANGUAGE sql;
+
+-- Function to create a claim together with its "Claim submitted" history entry
+-- in one transaction and round-trip; claim_number comes from set_claim_number.
+-- SETOF so PostgREST answers with a one-row array, like the other RPCs
+-- (dropped first: CREATE OR REPLACE cannot change an existing return type)
+DROP FUNCTION IF EXISTS public.create_claim_with_history(JSONB, UUID);
+CREATE OR REPLACE FUNCTION public.create_claim_with_history(claim JSONB, submitted_by UUID)
+RETURNS SETOF public.claims AS $$
+DECLARE
+    new_claim public.claims;
+BEGIN
+    INSERT INTO public.claims (user_id, claim_number, type, status, priority, amount, description, incident_date, metadata)
+    SELECT submitted_by, '', c.type, 'submitted', COALESCE(c.priority, 'medium'), c.amount,
+           c.description, c.incident_date, COALESCE(c.metadata, '{}')
+    FROM jsonb_populate_record(NULL::public.claims, claim) AS c
+    RETURNING * INTO new_claim;
+
+    INSERT INTO public.claim_history (claim_id, action, new_status, performed_by)
+    VALUES (new_claim.id, 'Claim submitted', new_claim.status, submitted_by);
+
+    RETURN NEXT new_claim;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function to bulk-insert imported claims and their history entries in one
+-- transaction; rows carry their own id and may name an owner in user_id
+CREATE OR REPLACE FUNCTION public.bulk_create_claims_with_history(claim_rows JSONB, submitted_by UUID)
+RETURNS SETOF UUID AS $$
+    WITH inserted AS (
+        INSERT INTO public.claims (id, user_id, claim_number, type, status, priority, amount, description, incident_date, metadata)
+        SELECT COALESCE(c.id, gen_random_uuid()), COALESCE(c.user_id, submitted_by), '', c.type, 'submitted',
+               COALESCE(c.priority, 'medium'), c.amount, c.description, c.incident_date, COALESCE(c.metadata, '{}')
+        FROM jsonb_populate_recordset(NULL::public.claims, claim_rows) AS c
+        RETURNING id, status
+    ), history AS (
+        INSERT INTO public.claim_history (claim_id, action, new_status, performed_by)
+        SELECT inserted.id, 'Claim imported', inserted.status, submitted_by FROM inserted
+    )
+    SELECT id FROM inserted;
+$$ LANGUAGE sql;
+
+-- Agent work queue ordering: priority, then the AI's next_action, then age
+CREATE OR REPLACE FUNCTION public.priority_rank(priority TEXT)
+RETURNS INT AS $$
+    SELECT CASE priority WHEN 'urgent' THEN 0 WHEN 'high' THEN 1 WHEN 'medium' THEN 2 WHEN 'low' THEN 3 ELSE 4 END;
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION public.next_action_rank(next_action TEXT)
+RETURNS INT AS $$
+    -- Claims not yet analysed sit between standard reviews and auto-approvals
+    SELECT CASE next_action WHEN 'investigate' THEN 0 WHEN 'manual_review' THEN 1
+                            WHEN 'standard_review' THEN 2 WHEN 'auto_approve' THEN 4 ELSE 3 END;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Same expressions as the ORDER BY below, so the queue is read in index order
+CREATE INDEX IF NOT EXISTS idx_claims_work_queue ON public.claims (
+    public.priority_rank(priority),
+    public.next_action_rank(ai_analysis->>'next_action'),
+    submitted_date
+) WHERE status IN ('submitted', 'under_review');
+
+-- Function to hand the next open claims to an agent. Claims assigned to
+-- someone else are skipped until their lease runs out; SKIP LOCKED lets
+-- concurrent agents pass over rows another agent is claiming right now
+CREATE OR REPLACE FUNCTION public.claim_work_queue(agent_id UUID, max_claims INT, lease_seconds INT, claim_types TEXT[] DEFAULT NULL)
+RETURNS SETOF public.claims AS $$
+    WITH next_claims AS (
+        SELECT id
+        FROM public.claims
+        WHERE status IN ('submitted', 'under_review')
+          AND (assigned_to IS NULL OR assigned_at < NOW() - make_interval(secs => lease_seconds))
+          AND (claim_types IS NULL OR type = ANY(claim_types))
+        ORDER BY public.priority_rank(priority),
+                 public.next_action_rank(ai_analysis->>'next_action'),
+                 submitted_date
+        LIMIT max_claims
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE public.claims AS c
+    SET assigned_to = agent_id,
+        assigned_at = NOW()
+    FROM next_claims
+    WHERE c.id = next_claims.id
+    RETURNING c.*;
+$$ LANGUAGE sql;
+
+-- Claim counts and amount totals per (status, type, priority), kept current by
+-- statement-level triggers so dashboards never scan the claims table
+CREATE TABLE IF NOT EXISTS public.claims_rollup (
+    status TEXT NOT NULL,
+    type TEXT NOT NULL,
+    priority TEXT NOT NULL,
+    claim_count BIGINT NOT NULL DEFAULT 0,
+    total_amount DECIMAL(16,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (status, type, priority)
+);
+
+-- Service role only (no policies)
+ALTER TABLE public.claims_rollup ENABLE ROW LEVEL SECURITY;
+
+CREATE OR REPLACE FUNCTION public.update_claims_rollup()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO public.claims_rollup AS r (status, type, priority, claim_count, total_amount)
+        SELECT status, type, COALESCE(priority, 'none'), COUNT(*), COALESCE(SUM(amount), 0)
+        FROM new_rows
+        GROUP BY status, type, COALESCE(priority, 'none')
+        ON CONFLICT (status, type, priority) DO UPDATE
+        SET claim_count = r.claim_count + EXCLUDED.claim_count,
+            total_amount = r.total_amount + EXCLUDED.total_amount;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE public.claims_rollup AS r
+        SET claim_count = r.claim_count - d.claim_count,
+            total_amount = r.total_amount - d.total_amount
+        FROM (
+            SELECT status, type, COALESCE(priority, 'none') AS priority,
+                   COUNT(*) AS claim_count, COALESCE(SUM(amount), 0) AS total_amount
+            FROM old_rows
+            GROUP BY status, type, COALESCE(priority, 'none')
+        ) AS d
+        WHERE r.status = d.status AND r.type = d.type AND r.priority = d.priority;
+    ELSE
+        -- Net change only, so updates that leave status/type/priority/amount
+        -- alone (e.g. AI analysis writes) do not touch the rollup rows
+        INSERT INTO public.claims_rollup AS r (status, type, priority, claim_count, total_amount)
+        SELECT status, type, priority, SUM(delta), SUM(amount)
+        FROM (
+            SELECT status, type, COALESCE(priority, 'none') AS priority, 1 AS delta, COALESCE(amount, 0) AS amount FROM new_rows
+            UNION ALL
+            SELECT status, type, COALESCE(priority, 'none'), -1, -COALESCE(amount, 0) FROM old_rows
+        ) AS d
+        GROUP BY status, type, priority
+        HAVING SUM(delta) <> 0 OR SUM(amount) <> 0
+        ON CONFLICT (status, type, priority) DO UPDATE
+        SET claim_count = r.claim_count + EXCLUDED.claim_count,
+            total_amount = r.total_amount + EXCLUDED.total_amount;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+CREATE TRIGGER claims_rollup_insert AFTER INSERT ON public.claims
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.update_claims_rollup();
+
+CREATE TRIGGER claims_rollup_update AFTER UPDATE ON public.claims
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.update_claims_rollup();
+
+CREATE TRIGGER claims_rollup_delete AFTER DELETE ON public.claims
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.update_claims_rollup();
+
+-- Backfill for databases that already hold claims
+INSERT INTO public.claims_rollup (status, type, priority, claim_count, total_amount)
+SELECT status, type, COALESCE(priority, 'none'), COUNT(*), COALESCE(SUM(amount), 0)
+FROM public.claims
+GROUP BY status, type, COALESCE(priority, 'none')
+ON CONFLICT (status, type, priority) DO UPDATE
+SET claim_count = EXCLUDED.claim_count,
+    total_amount = EXCLUDED.total_amount;
+
 -- =====================================================
 -- 6. INSERT DEFAULT DATA
 -- =====================================================
@@ -433,6 +616,18 @@ GRANT USAGE ON ALL SEQUENCES IN SCHEMA public TO anon;
 GRANT ALL ON ALL TABLES IN SCHEMA public TO authenticated;
 GRANT SELECT ON ALL TABLES IN SCHEMA public TO anon;
 
+-- Backend-only functions: they take the acting user as a parameter or write
+-- any claim, so only the service role (which the API uses) may call them.
+-- Functions are executable by PUBLIC unless revoked.
+REVOKE EXECUTE ON FUNCTION public.bulk_update_ai_analysis(JSONB) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.create_claim_with_history(JSONB, UUID) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.bulk_create_claims_with_history(JSONB, UUID) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.claim_work_queue(UUID, INT, INT, TEXT[]) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.bulk_update_ai_analysis(JSONB) TO service_role;
+GRANT EXECUTE ON FUNCTION public.create_claim_with_history(JSONB, UUID) TO service_role;
+GRANT EXECUTE ON FUNCTION public.bulk_create_claims_with_history(JSONB, UUID) TO service_role;
+GRANT EXECUTE ON FUNCTION public.claim_work_queue(UUID, INT, INT, TEXT[]) TO service_role;
+
 -- =====================================================
 -- VERIFICATION QUERIES
 -- =====================================================